@@ -0,0 +1,103 @@
+from typing import List, Dict, Set, Tuple
+from .regex_thompson import NFA, _is_symbol
+
+# nullable/firstpos/lastpos de la raíz, símbolo por posición y followpos.
+# Cada ocurrencia de símbolo en la ER es una posición (1..n); 'ε' no ocupa posición.
+def _positions_from_postfix(post: str) -> Tuple[bool, Set[int], Set[int], List[str], Dict[int, Set[int]]]:
+    stack: List[Tuple[bool, Set[int], Set[int]]] = []
+    sym_at: List[str] = ['']  # posición 0 reservada para el estado inicial
+    follow: Dict[int, Set[int]] = {}
+
+    for c in post:
+        if _is_symbol(c):
+            if c == 'ε':
+                stack.append((True, set(), set()))
+                continue
+            p = len(sym_at)
+            sym_at.append(c)
+            follow[p] = set()
+            stack.append((False, {p}, {p}))
+        elif c == '.':
+            b = stack.pop(); a = stack.pop()
+            for q in a[2]:
+                follow[q] |= b[1]
+            first = a[1] | b[1] if a[0] else set(a[1])
+            last = a[2] | b[2] if b[0] else set(b[2])
+            stack.append((a[0] and b[0], first, last))
+        elif c == '|':
+            b = stack.pop(); a = stack.pop()
+            stack.append((a[0] or b[0], a[1] | b[1], a[2] | b[2]))
+        elif c in '*+':
+            a = stack.pop()
+            for q in a[2]:
+                follow[q] |= a[1]
+            stack.append((a[0] or c == '*', set(a[1]), set(a[2])))
+        elif c == '?':
+            a = stack.pop()
+            stack.append((True, set(a[1]), set(a[2])))
+        else:
+            raise ValueError(f"Operador no soportado: {c}")
+
+    if len(stack) != 1:
+        raise ValueError('ER inválida')
+    nullable, first, last = stack.pop()
+    return nullable, first, last, sym_at, follow
+
+# AFN sin transiciones ε: un estado por ocurrencia de símbolo más el inicial (0)
+def glushkov_from_postfix(post: str) -> NFA:
+    nullable, first, last, sym_at, follow = _positions_from_postfix(post)
+    nfa = NFA()
+    nfa.next_id = len(sym_at)
+    for p in first:
+        nfa.add_edge(0, sym_at[p], p)
+    for q, ps in follow.items():
+        for p in ps:
+            nfa.add_edge(q, sym_at[p], p)
+    nfa.start = 0
+    nfa.finals = set(last) | ({0} if nullable else set())
+    return nfa
+
+# Construcción directa del AFD por followpos (Aho), sin pasar por un AFN.
+# Devuelve (estados como conjuntos de posiciones, delta, inicial, finales).
+def dfa_from_postfix(post: str) -> Tuple[List[Set[int]], Dict[Tuple[int, str], int], int, Set[int]]:
+    nullable, first, last, sym_at, follow = _positions_from_postfix(post)
+    # r# : posición extra de fin; un estado es final si la contiene
+    end_p = len(sym_at)
+    for q in last:
+        follow[q].add(end_p)
+    start_set = set(first) | ({end_p} if nullable else set())
+
+    states: List[Set[int]] = []
+    index: Dict[Tuple[int, ...], int] = {}
+    def idx(S: Set[int]) -> int:
+        key = tuple(sorted(S))
+        if key not in index:
+            index[key] = len(states)
+            states.append(set(S))
+        return index[key]
+
+    delta: Dict[Tuple[int, str], int] = {}
+    start_i = idx(start_set)
+    front = 0
+    while front < len(states):
+        i = front; front += 1
+        by_sym: Dict[str, Set[int]] = {}
+        for p in states[i]:
+            if p != end_p:
+                by_sym.setdefault(sym_at[p], set()).update(follow[p])
+        for a in sorted(by_sym):
+            delta[(i, a)] = idx(by_sym[a])
+
+    finals = {i for i, S in enumerate(states) if end_p in S}
+    return states, delta, start_i, finals
+
+# AFD directo con la misma forma que un AFN (transiciones con un solo destino)
+def dfa_as_nfa(post: str) -> NFA:
+    states, delta, start_i, finals = dfa_from_postfix(post)
+    nfa = NFA()
+    nfa.next_id = len(states)
+    for (i, a), j in delta.items():
+        nfa.add_edge(i, a, j)
+    nfa.start = start_i
+    nfa.finals = finals
+    return nfa
@@ -1,6 +1,7 @@
-﻿from fastapi import FastAPI
+﻿from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from .models import (
     GrammarRequest,
@@ -9,25 +10,53 @@ from .models import (
     NFATransition,
     DFAResponse,
     LR1Response,
+    PageResponse,
     ParseRequest,
+    NamedParseRequest,
+    ParseResult,
+    BatchParseRequest,
+    BatchParseResponse,
+    CheckRequest,
+    CheckResponse,
+    GrammarInfo,
     TraceStep,
     ParseTraceResponse,
 )
 from .utils.tables import action_to_dict, goto_to_dict
-
-from lr1.grammar_io import GrammarSpec
-from lr1.builder import LR1Builder
-from lr1.tables import Tables
+from .utils.http import EncodedPayload, LRUCache, dumps, json_response, text_key
+from .registry import registry, RegisteredGrammar, clear_adhoc, pack_adhoc
+
+from lr1.grammar_io import GrammarSpec, parse_action_line, is_precedence_line, parse_precedence_line, add_alternative
+from lr1.compiled import CompiledGrammar
+from lr1.cost import Budget, BudgetExceeded, estimate_cost
+from lr1.methods import METHODS, build_tables
+from lr1.check import check_grammar
 from lr1.grammar import EPS as G_EPS
 from lr1.items import LR1Item
 from lr1.lexer import Lexer
+from lr1.parser import ParseError
+from lr1.parallel import BatchParser
+from lr1.ast import Node
 
 from .lex.regex_thompson import to_postfix, thompson_from_postfix, EPS as RE_EPS, epsilon_closure
+from .lex.regex_glushkov import glushkov_from_postfix, dfa_as_nfa
 from .lex.dfa_subset import nfa_to_dfa
 
+import os
 import re
+import threading
+
+# Las gramáticas del registro se compilan (si hace falta) y se abren con mmap al arrancar cada worker
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry.load(load_grammar_from_text)
+    yield
+    registry.close()
+    _batch.close()
+    clear_adhoc()
+
 
-app = FastAPI(title="LR(1) Fullstack API", root_path="/api")
+app = FastAPI(title="LR(1) Fullstack API", root_path="/api", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -40,7 +69,7 @@ app.add_middleware(
 def ok():
     return {"ok": True}
 
-_SECTION_RE = re.compile(r"^(START|NONTERMINALS|TERMINALS|PRODUCTIONS|LEXER):\s*(.*)$")
+_SECTION_RE = re.compile(r"^(START|NONTERMINALS|TERMINALS|PRODUCTIONS|LEXER|ACTIONS):\s*(.*)$")
 _LEXER_LINE_RE = re.compile(r"^(.+?):\s*/(.+?)/\s*(skip)?$")
 
 
@@ -57,11 +86,17 @@ def load_grammar_from_text(text: str) -> GrammarSpec:
         for raw in lines:
             if not raw.strip():
                 continue
+            if is_precedence_line(raw):
+                spec.precedence.append(parse_precedence_line(raw))
+                continue
             prod_lines.append(raw.strip())
     else:
         for raw in lines:
             if not raw.strip():
                 continue
+            if is_precedence_line(raw):
+                spec.precedence.append(parse_precedence_line(raw))
+                continue
             m = _SECTION_RE.match(raw)
             if m:
                 current = m.group(1)
@@ -74,7 +109,7 @@ def load_grammar_from_text(text: str) -> GrammarSpec:
                     spec.terms = [t for t in rest.split() if t]
                 elif current == 'PRODUCTIONS':
                     prod_lines.clear()
-                elif current == 'LEXER':
+                elif current in ('LEXER', 'ACTIONS'):
                     pass
                 continue
             if current == 'PRODUCTIONS':
@@ -88,6 +123,9 @@ def load_grammar_from_text(text: str) -> GrammarSpec:
                 regex = mm.group(2)
                 skip = bool(mm.group(3))
                 spec.lex_rules.append((term, regex, skip))
+            elif current == 'ACTIONS':
+                # Sólo se registran; el backend nunca evalúa código de la gramática
+                spec.actions.append(parse_action_line(raw))
             else:
                 raise ValueError(f"Línea fuera de sección: {raw}")
 
@@ -103,8 +141,7 @@ def load_grammar_from_text(text: str) -> GrammarSpec:
             if alt == '' or alt.lower() == 'ε' or alt == 'ε':
                 spec.prods.append((A, []))
             else:
-                symbols = [s for s in alt.split() if s]
-                spec.prods.append((A, symbols))
+                add_alternative(spec, A, alt)
 
     # Si no hubo encabezados, inferir START/NONTERMINALS/TERMINALS
     if not saw_header:
@@ -123,53 +160,130 @@ def load_grammar_from_text(text: str) -> GrammarSpec:
     return spec
 
 
-@app.post('/lr1/build', response_model=LR1Response)
-def lr1_build(req: GrammarRequest):
-    spec = load_grammar_from_text(req.text)
-    G = spec.to_grammar()
-    builder = LR1Builder(G)
-    states, trans = builder.build_canonical_collection()
-    tables = Tables(G, states, trans, builder.aug_start)
-
-    states_out: List[Dict[str, Any]] = []
-    for i, I in enumerate(states):
-        items = []
-        for it in sorted(I, key=lambda z: (z.lhs, z.rhs, z.dot, z.la)):
-            items.append({'lhs': it.lhs, 'rhs': list(it.rhs), 'dot': it.dot, 'la': it.la})
-        states_out.append({'state': i, 'items': items})
-
-    trans_out = [{'from': i, 'symbol': X, 'to': j} for (i, X), j in trans.items()]
+# Con más estados que esto, /lr1/build responde sin tablas/estados/imágenes (modo lite)
+# y el cliente pide las páginas que muestra a /lr1/built/{grammar_hash}/...
+LITE_STATES = 500
+MAX_PAGE = 1000
+
+
+# Admisión de gramáticas pegadas por el usuario: antes de construir se estima el costo
+# (lr1.cost.estimate_cost). Por encima de MAX_ESTIMATED_STATES se rechaza (413); por encima de
+# SLOW_ESTIMATED_STATES la construcción pasa por un carril lento de a una por worker, y toda
+# construcción corre con presupuesto (si se pasa, 422 con las estadísticas parciales).
+MAX_ESTIMATED_STATES = 20000
+SLOW_ESTIMATED_STATES = 2000
+FAST_BUDGET = Budget(max_states=10000, max_items=2_000_000, deadline=10.0, max_memory=512 << 20)
+SLOW_BUDGET = Budget(max_states=50000, max_items=10_000_000, deadline=60.0, max_memory=1 << 30)
+SLOW_LANE_WAIT = 30.0
+_slow_lane = threading.BoundedSemaphore(1)
+
+
+class _BuiltGrammar:
+    # La gramática es una CompiledGrammar (inmutable): los hilos del threadpool que sirven
+    # la misma gramática cacheada leen FIRST/FOLLOW sin carreras
+    # `method`: ver lr1.methods.build_tables (el AFN de ítems sólo existe con LR(1))
+    def __init__(self, spec: GrammarSpec, G: CompiledGrammar, budget: Optional[Budget] = None,
+                 estimate: Optional[Dict[str, Any]] = None, method: str = 'lr1'):
+        self.spec = spec
+        built = build_tables(G, method, budget=budget, track_items=True)
+        self.method = built.method
+        self.builder = built.builder
+        self.G = self.builder.G  # aumentada
+        self.states, self.trans = built.states, built.trans
+        self.stats = {'estimate': estimate, 'build': self.builder.stats,
+                      'methods': [{'method': m, 'conflicts': n} for m, n in built.tried]}
+        self.tables = built.tables
+        self.action_rows = action_to_dict(self.tables.ACTION)
+        self.goto_rows = goto_to_dict(self.tables.GOTO)
+        self.conflicted = sorted({c[1] for c in self.tables.conflicts})
+        self.trans_list = sorted(self.trans.items(), key=lambda kv: kv[0][0])
+
+    def state_items(self, i: int) -> List[Dict[str, Any]]:
+        return [
+            {'lhs': it.lhs, 'rhs': list(it.rhs), 'dot': it.dot, 'la': it.la}
+            for it in sorted(self.states[i], key=lambda z: (z.lhs, z.rhs, z.dot, z.la))
+        ]
+
+
+# Gramáticas construidas y respuestas de /lr1/build ya serializadas, por hash del texto
+_grammar_cache = LRUCache(16)
+_build_cache = LRUCache()
+
+
+# Con otro método que no sea lr1 la clave lleva el método (también en las URLs de páginas)
+def _built(text: str, method: str = 'lr1') -> tuple[str, _BuiltGrammar]:
+    key = text_key(text) if method == 'lr1' else f"{text_key(text)}-{method}"
+    built = _grammar_cache.get(key)
+    if built is None:
+        built = _grammar_cache.put(key, _admit_and_build(load_grammar_from_text(text), method))
+    return key, built
+
+
+def _admit_and_build(spec: GrammarSpec, method: str = 'lr1') -> _BuiltGrammar:
+    G = spec.to_grammar().compile()
+    estimate = estimate_cost(G).as_dict()
+    if estimate['truncated'] or estimate['states_estimate'] > MAX_ESTIMATED_STATES:
+        raise HTTPException(status_code=413, detail={
+            'message': 'Gramática demasiado grande para construir en línea', 'estimate': estimate})
+    try:
+        if estimate['states_estimate'] <= SLOW_ESTIMATED_STATES:
+            return _BuiltGrammar(spec, G, FAST_BUDGET, estimate, method)
+        if not _slow_lane.acquire(timeout=SLOW_LANE_WAIT):
+            raise HTTPException(status_code=503, headers={'Retry-After': str(int(SLOW_LANE_WAIT))}, detail={
+                'message': 'Carril de construcción lenta ocupado; reintentar', 'estimate': estimate})
+        try:
+            return _BuiltGrammar(spec, G, SLOW_BUDGET, estimate, method)
+        finally:
+            _slow_lane.release()
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=422, detail={
+            'message': str(e), 'reason': e.reason, 'stats': e.stats, 'estimate': estimate})
 
-    # GramÃ¡tica aumentada como lista de strings
-    grammar_augmented = []
-    for lhs, rhs in G.productions:
-        if len(rhs) == 1 and (rhs[0] == G_EPS or rhs[0] == 'ε'):
-            rhs_str = 'ε'
-        else:
-            rhs_str = ' '.join(rhs)
-        grammar_augmented.append(f"{lhs} -> {rhs_str}")
 
-    # SÃ­mbolos, FIRST y FOLLOW (de la gramÃ¡tica aumentada)
-    nonterminals = sorted(list(G.nonterminals))
-    terminals = sorted([t for t in G.terminals if t != '$'])
-    show_syms = nonterminals + terminals
-    first_map = {X: sorted(list(G.first(X))) for X in show_syms}
-    follow_sets = G.follow_sets()
-    # Asegurar que el sÃ­mbolo inicial aumentado tenga $ en FOLLOW
+@app.post('/lr1/estimate')
+def lr1_estimate(req: GrammarRequest):
+    return estimate_cost(load_grammar_from_text(req.text).to_grammar()).as_dict()
+
+
+# Lint de conflictos (lr1.check): no construye Tables ni entra en la cache de gramáticas.
+# El autómata LR(0) y la confirmación LR(1) corren con FAST_BUDGET; si la confirmación se
+# pasa, se responden los conflictos LALR(1) con confirmed=false.
+@app.post('/lr1/check', response_model=CheckResponse)
+def lr1_check(req: CheckRequest):
+    G = load_grammar_from_text(req.text).to_grammar()
     try:
-        aug = builder.aug_start
-        if aug not in follow_sets:
-            follow_sets[aug] = set()
-        follow_sets[aug].add('$')
-    except Exception:
-        pass
-    follow_map = {A: sorted(list(follow_sets.get(A, set()))) for A in nonterminals}
+        return check_grammar(G, req.max_conflicts, confirm=req.confirm, budget=FAST_BUDGET).as_dict()
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=422, detail={'message': str(e), 'reason': e.reason, 'stats': e.stats})
+
+
+def _built_by_hash(grammar_hash: str) -> _BuiltGrammar:
+    built = _grammar_cache.get(grammar_hash)
+    if built is None:
+        raise HTTPException(status_code=404, detail='Gramática no construida (o expirada); llamar a /lr1/build')
+    return built
 
-    # Construir AFN de Ã­tems LR(1) (estados = Ã­tems, transiciones por sÃ­mbolo o epsilon por cierre)
-    def item_key(it: LR1Item) -> str:
-        rhs = ' '.join(it.rhs)
-        return f"{it.lhs}|{rhs}|{it.dot}|{it.la}"
 
+@app.post('/lr1/build', response_model=LR1Response)
+def lr1_build(req: GrammarRequest, request: Request):
+    if req.method != 'auto' and req.method not in METHODS:
+        raise HTTPException(status_code=422, detail=f"Método desconocido: {req.method} (opciones: auto, {', '.join(METHODS)})")
+    key = f"{text_key(req.text)}:{req.lite}:{req.method}"
+    hit = _build_cache.get(key)
+    if hit is None:
+        out = _build_payload(req.text, req.lite, req.method)
+        hit = _build_cache.put(key, (EncodedPayload(dumps(out)), out['grammar_hash'], out['lite']))
+    payload, grammar_hash, lite = hit
+    # La respuesta puede sobrevivir a la gramática en _grammar_cache (16 entradas): en modo
+    # lite el cliente va a pedir páginas con grammar_hash, así que se reconstruye aquí (también
+    # si se responde 304) y el cliente puede reintentar un 404 llamando a /lr1/build.
+    if lite and _grammar_cache.get(grammar_hash) is None:
+        _built(req.text, req.method)
+    return json_response(request, payload)
+
+
+# AFN de ítems LR(1): lo arma el builder en la misma pasada que la colección canónica
+def _items_nfa(graph) -> Dict[str, Any]:
     def item_label(it: LR1Item) -> str:
         def filt(xs):
             return [x for x in xs if x not in (G_EPS, 'ε', 'eps') and ('ε' not in str(x))]
@@ -185,66 +299,19 @@ def lr1_build(req: GrammarRequest):
         body = ' '.join(parts)
         return f"{it.lhs} -> {body}, {it.la}"
 
-    start_item = LR1Item(builder.aug_start, (G.start,), 0, '$')
-    queue: list[LR1Item] = [start_item]
-    seen: dict[str, LR1Item] = {item_key(start_item): start_item}
-    labels: dict[str, str] = {item_key(start_item): item_label(start_item)}
-    transitions: dict[str, dict[str, set[str]]] = {}
-    finals: set[str] = set()
-
-    while queue:
-        it = queue.pop(0)
-        k = item_key(it)
-        transitions.setdefault(k, {})
-        # final si S' -> S Â· , $
-        if it.lhs == builder.aug_start and it.dot == len(it.rhs) and it.la == '$':
-            finals.add(k)
-        X = it.rhs[it.dot] if it.dot < len(it.rhs) else None
-        if X is None:
-            continue
-        # avance (consumo de sÃ­mbolo)
-        it2 = it.advance()
-        k2 = item_key(it2)
-        if k2 not in seen:
-            seen[k2] = it2
-            labels[k2] = item_label(it2)
-            queue.append(it2)
-        # Skip epsilon-labeled advances
-        if str(X) not in (G_EPS, 'ε', 'eps'):
-            transitions[k].setdefault(str(X), set()).add(k2)
-        # cierre si X es no terminal
-        if X in G.nonterminals:
-            beta = it.rhs[it.dot + 1:]
-            first_beta = G.first_of_sequence(beta)
-            lks = {x for x in first_beta if x != G_EPS}
-            if G_EPS in first_beta:
-                lks.add(it.la)
-            for gamma in G.by_lhs.get(X, []):
-                if len(gamma) == 1 and gamma[0] == G_EPS:
-                    gamma = tuple()
-                for b in lks:
-                    dest = LR1Item(X, gamma, 0, b)
-                    kd = item_key(dest)
-                    if kd not in seen:
-                        seen[kd] = dest
-                        labels[kd] = item_label(dest)
-                        queue.append(dest)
-                    transitions[k].setdefault('eps', set()).add(kd)
-
-    # Armar DOT e imagen usando util existente
-    state_ids = list(seen.keys())
-    state_labels = {k: labels[k] for k in state_ids}
+    reachable = graph.reachable()
+    state_labels = {k: item_label(graph.items[k]) for k in reachable}
     # Convertir transiciones a formato requerido por graphviz util (con labels de estados)
     trans_for_dot: dict[str, dict[str, list[str]]] = {}
-    for src_k, mp in transitions.items():
+    for src_k in reachable:
         src_label = state_labels[src_k]
-        for sym, dests in mp.items():
+        for sym, dests in graph.successors(src_k).items():
+            label = 'eps' if sym == G_EPS else str(sym)
             for dk in dests:
-                dst_label = state_labels[dk]
-                trans_for_dot.setdefault(src_label, {}).setdefault(sym, []).append(dst_label)
-    states_for_dot = list(state_labels.values())
-    start_label = state_labels[item_key(start_item)]
-    finals_labels = [state_labels[k] for k in finals]
+                trans_for_dot.setdefault(src_label, {}).setdefault(label, []).append(state_labels[dk])
+    states_for_dot = [state_labels[k] for k in reachable]
+    start_label = state_labels[graph.start]
+    finals_labels = [state_labels[k] for k in sorted(graph.finals) if k in state_labels]
     # Render image (optional if graphviz installed)
     try:
         from .utils.graphviz import automaton_to_dot, automaton_to_base64
@@ -259,6 +326,68 @@ def lr1_build(req: GrammarRequest):
         'transitions': trans_for_dot,
         'image': img_nfa,
     }
+    return items_nfa
+
+
+# Payload de /lr1/build como dict plano (mismo esquema que LR1Response, sin validarlo campo a campo)
+def _build_payload(text: str, lite: Optional[bool] = None, method: str = 'lr1') -> Dict[str, Any]:
+    grammar_hash, built = _built(text, method)
+    G, builder, states, trans, tables = built.G, built.builder, built.states, built.trans, built.tables
+    if lite is None:
+        lite = len(states) > LITE_STATES
+
+    # GramÃ¡tica aumentada como lista de strings
+    grammar_augmented = []
+    for lhs, rhs in G.productions:
+        if len(rhs) == 1 and (rhs[0] == G_EPS or rhs[0] == 'ε'):
+            rhs_str = 'ε'
+        else:
+            rhs_str = ' '.join(rhs)
+        grammar_augmented.append(f"{lhs} -> {rhs_str}")
+
+    # SÃ­mbolos, FIRST y FOLLOW (de la gramÃ¡tica aumentada)
+    nonterminals = sorted(list(G.nonterminals))
+    terminals = sorted([t for t in G.terminals if t != '$'])
+    show_syms = nonterminals + terminals
+    first_map = {X: sorted(list(G.first(X))) for X in show_syms}
+    follow_sets = G.follow_sets()
+    # Asegurar que el sÃ­mbolo inicial aumentado tenga $ en FOLLOW
+    try:
+        aug = builder.aug_start
+        if aug not in follow_sets:
+            follow_sets[aug] = set()
+        follow_sets[aug].add('$')
+    except Exception:
+        pass
+    follow_map = {A: sorted(list(follow_sets.get(A, set()))) for A in nonterminals}
+
+    out: Dict[str, Any] = {
+        'grammar_hash': grammar_hash,
+        'lite': lite,
+        'method': built.method,
+        'n_states': len(states),
+        'conflicted_states': built.conflicted,
+        'build_stats': built.stats,
+        'action': {},
+        'goto': {},
+        'conflicts': [{'type': c[0], 'state': c[1], 'symbol': c[2]} for c in tables.conflicts],
+        'resolved': [{'state': r[0], 'symbol': r[1], 'chosen': r[2]} for r in tables.resolved],
+        'states': [],
+        'transitions': [],
+        'grammar_augmented': grammar_augmented,
+        'terminals': terminals,
+        'nonterminals': nonterminals,
+        'first': first_map,
+        'follow': follow_map,
+        'items_nfa': None,
+        'items_dfa': None,
+    }
+    if lite:
+        return out
+
+    # AFN de ítems LR(1) (sólo con la colección canónica: los otros métodos no arman el grafo)
+    graph = builder.item_graph
+    items_nfa = None if graph is None else _items_nfa(graph)
 
     # DFA de estados LR(1) (colecciÃ³n canÃ³nica)
     try:
@@ -308,32 +437,98 @@ def lr1_build(req: GrammarRequest):
     except Exception:
         items_dfa = None
 
-    return LR1Response(
-        action=action_to_dict(tables.ACTION),
-        goto=goto_to_dict(tables.GOTO),
-        conflicts=[{'type': c[0], 'state': c[1], 'symbol': c[2]} for c in tables.conflicts],
-        states=states_out,
-        transitions=trans_out,
-        grammar_augmented=grammar_augmented,
-        terminals=terminals,
-        nonterminals=nonterminals,
-        first=first_map,
-        follow=follow_map,
+    out.update(
+        action=built.action_rows,
+        goto=built.goto_rows,
+        states=[{'state': i, 'items': built.state_items(i)} for i in range(len(states))],
+        transitions=[{'from': i, 'symbol': X, 'to': j} for (i, X), j in trans.items()],
         items_nfa=items_nfa,
         items_dfa=items_dfa,
     )
+    return out
+
+
+# Estados en [start, end) (opcionalmente sólo los que tienen conflictos)
+def _state_window(built: _BuiltGrammar, start: int, end: Optional[int], conflicted: bool) -> List[int]:
+    end = len(built.states) if end is None else min(end, len(built.states))
+    start = max(0, start)
+    if conflicted:
+        return [i for i in built.conflicted if start <= i < end]
+    return list(range(start, end))
+
+
+def _symbol_set(symbols: Optional[str]) -> Optional[set]:
+    if not symbols:
+        return None
+    return {s for s in symbols.split(',') if s}
+
+
+def _page(request: Request, rows: List[Any], total: int, offset: int) -> Any:
+    return json_response(request, EncodedPayload(dumps({'total': total, 'offset': offset, 'items': rows})))
+
+
+@app.get('/lr1/built/{grammar_hash}/table', response_model=PageResponse)
+def lr1_table_page(grammar_hash: str, request: Request, start: int = 0, end: Optional[int] = None,
+                   offset: int = 0, limit: int = 100, symbols: Optional[str] = None, conflicted: bool = False):
+    built = _built_by_hash(grammar_hash)
+    window = _state_window(built, start, end, conflicted)
+    syms = _symbol_set(symbols)
+    limit = max(0, min(limit, MAX_PAGE))
+    rows = []
+    for i in window[offset:offset + limit]:
+        arow = built.action_rows.get(str(i), {})
+        grow = built.goto_rows.get(str(i), {})
+        if syms is not None:
+            arow = {a: v for a, v in arow.items() if a in syms}
+            grow = {A: v for A, v in grow.items() if A in syms}
+        rows.append({'state': i, 'action': arow, 'goto': grow})
+    return _page(request, rows, len(window), offset)
+
+
+@app.get('/lr1/built/{grammar_hash}/states', response_model=PageResponse)
+def lr1_states_page(grammar_hash: str, request: Request, start: int = 0, end: Optional[int] = None,
+                    offset: int = 0, limit: int = 100, conflicted: bool = False):
+    built = _built_by_hash(grammar_hash)
+    window = _state_window(built, start, end, conflicted)
+    limit = max(0, min(limit, MAX_PAGE))
+    rows = [{'state': i, 'items': built.state_items(i)} for i in window[offset:offset + limit]]
+    return _page(request, rows, len(window), offset)
+
+
+@app.get('/lr1/built/{grammar_hash}/transitions', response_model=PageResponse)
+def lr1_transitions_page(grammar_hash: str, request: Request, start: int = 0, end: Optional[int] = None,
+                         offset: int = 0, limit: int = 100, symbols: Optional[str] = None):
+    built = _built_by_hash(grammar_hash)
+    end = len(built.states) if end is None else end
+    syms = _symbol_set(symbols)
+    matches = [
+        {'from': i, 'symbol': X, 'to': j}
+        for (i, X), j in built.trans_list
+        if start <= i < end and (syms is None or X in syms)
+    ]
+    limit = max(0, min(limit, MAX_PAGE))
+    return _page(request, matches[offset:offset + limit], len(matches), offset)
 
 
 @app.post('/lex/regex2nfa', response_model=NFAResponse)
 def regex_to_nfa(req: RegexRequest):
     post = to_postfix(req.pattern)
-    nfa = thompson_from_postfix(post)
+    if req.method == 'thompson':
+        nfa = thompson_from_postfix(post)
+    elif req.method == 'glushkov':
+        nfa = glushkov_from_postfix(post)
+    else:
+        nfa = dfa_as_nfa(post)
     all_states = set(nfa.trans.keys()) | {nfa.start}
     for m in nfa.trans.values():
         for dests in m.values():
             all_states |= set(dests)
     states = sorted(all_states)
-    ecl = {i: sorted(list(epsilon_closure(nfa.trans, {i}))) for i in states}
+    # Glushkov / AFD directo no tienen aristas ε: la clausura de cada estado es él mismo
+    if any(RE_EPS in m for m in nfa.trans.values()):
+        ecl = {i: sorted(list(epsilon_closure(nfa.trans, {i}))) for i in states}
+    else:
+        ecl = {i: [i] for i in states}
     transitions = []
     for u, m in nfa.trans.items():
         for a, dests in m.items():
@@ -374,24 +569,26 @@ def nfa_to_dfa_endpoint(nfa: NFAResponse):
 
 @app.post('/lr1/trace', response_model=ParseTraceResponse)
 def lr1_trace(req: ParseRequest):
-    spec = load_grammar_from_text(req.text)
-    G = spec.to_grammar()
-    builder = LR1Builder(G)
-    states, trans = builder.build_canonical_collection()
-    tables = Tables(G, states, trans, builder.aug_start)
-
-    # Build token sequence
-    if req.tokens is not None:
-        token_types = list(req.tokens)
-    elif req.program is not None:
-        if not spec.lex_rules:
+    _, built = _built(req.text)
+    spec, tables = built.spec, built.tables
+    lexer = Lexer(spec.lex_rules) if spec.lex_rules else None
+    return _trace(tables, _token_types(lexer, req.program, req.tokens))
+
+
+# Tipos de token a partir de `tokens` explícitos o de `program` pasado por el lexer
+def _token_types(lexer: Optional[Lexer], program: Optional[str], tokens: Optional[List[str]]) -> List[str]:
+    if tokens is not None:
+        return list(tokens)
+    if program is not None:
+        if lexer is None:
             raise ValueError('No LEXER rules in grammar; provide tokens instead of program.')
-        L = Lexer(spec.lex_rules)
-        token_types = [t for (t, lx) in L.tokenize(req.program)]
-    else:
-        raise ValueError('Provide either tokens or program to parse.')
+        return [t for (t, lx) in lexer.tokenize(program)]
+    raise ValueError('Provide either tokens or program to parse.')
+
 
-    token_types.append('$')
+# Traza del autómata de pila; sirve con Tables y con PackedTables (sólo usa ACTION/GOTO/expected)
+def _trace(tables, token_types: List[str]) -> ParseTraceResponse:
+    token_types = token_types + ['$']
 
     trace: list[TraceStep] = []
     st: list[int] = [0]
@@ -402,7 +599,7 @@ def lr1_trace(req: ParseRequest):
         a = token_types[i]
         act = tables.ACTION.get((s, a))
         if not act:
-            exp = sorted({sym for (stt, sym) in tables.ACTION.keys() if stt == s})
+            exp = tables.expected(s)
             raise ValueError(f"Unexpected token {a} at input pos {i}; expected {exp}")
         if act.kind == 'shift':
             action_str = f'shift {act.value}'
@@ -431,3 +628,93 @@ def lr1_trace(req: ParseRequest):
             break
 
     return ParseTraceResponse(steps=trace, tokens=token_types[:-1], accepted=accepted, message='ok')
+
+# ---------------------------------------------------------------------------
+# Gramáticas registradas (registry.py): tablas precompiladas y compartidas vía mmap
+
+def _registered(name: str) -> RegisteredGrammar:
+    g = registry.get(name)
+    if g is None:
+        raise HTTPException(status_code=404, detail=f'Gramática no registrada: {name}')
+    return g
+
+
+# Node -> {"sym", "lexeme", "children"} sin recursión (los árboles pueden ser muy profundos)
+def _tree_obj(root: Node) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    stack = [(root, out)]
+    while stack:
+        node, obj = stack.pop()
+        obj.update(sym=node.sym, lexeme=node.lexeme, children=[])
+        for ch in node.children:
+            child: Dict[str, Any] = {}
+            obj['children'].append(child)
+            stack.append((ch, child))
+    return out
+
+
+# Resultado compacto (ParseResult) de una entrada parseada por BatchParser
+def _result(node: Optional[Node], err: Optional[SyntaxError], tree: bool) -> Dict[str, Any]:
+    if isinstance(err, ParseError):
+        return {'accepted': False, 'pos': err.pos, 'token': err.token, 'expected': err.expected, 'message': str(err)}
+    if err is not None:
+        return {'accepted': False, 'message': str(err)}
+    return {'accepted': True, 'tree': _tree_obj(node) if (tree and node is not None) else None}
+
+
+# Un programa pasa por el lexer de la gramática (conserva lexemas); `tokens` son sólo tipos
+def _parse_one(g: RegisteredGrammar, program: Optional[str], tokens: Optional[List[str]], tree: bool) -> Dict[str, Any]:
+    inp = tokens if tokens is not None else program
+    if inp is None:
+        return {'accepted': False, 'message': 'Provide either tokens or program to parse.'}
+    node, err = _batch.parse_many(g.tables.path, [inp], tree)[0]
+    return _result(node, err, tree)
+
+
+@app.get('/lr1/grammars', response_model=List[GrammarInfo])
+def lr1_grammars():
+    return [g.info() for g in registry.grammars.values()]
+
+
+@app.get('/lr1/grammars/{name}', response_model=GrammarInfo)
+def lr1_grammar_info(name: str):
+    return _registered(name).info()
+
+
+@app.post('/lr1/grammars/{name}/trace', response_model=ParseTraceResponse)
+def lr1_grammar_trace(name: str, req: NamedParseRequest):
+    g = _registered(name)
+    return _trace(g.tables, _token_types(g.lexer, req.program, req.tokens))
+
+
+@app.post('/lr1/grammars/{name}/parse', response_model=ParseResult)
+def lr1_grammar_parse(name: str, req: NamedParseRequest):
+    return _parse_one(_registered(name), req.program, req.tokens, req.tree)
+# ---------------------------------------------------------------------------
+# Validación en lote: una gramática (texto o nombre registrado) y N entradas por request.
+# Las tablas se construyen/obtienen una vez y BatchParser reparte las entradas en su pool.
+MAX_BATCH = 5000
+_batch = BatchParser(workers=int(os.environ.get('LR1_BATCH_WORKERS', '0')) or None)
+
+
+@app.post('/lr1/parse/batch', response_model=BatchParseResponse)
+def lr1_parse_batch(req: BatchParseRequest, request: Request):
+    inputs: Optional[List[Any]] = req.programs if req.programs is not None else req.tokens
+    if inputs is None:
+        raise HTTPException(status_code=422, detail='Provide either programs or tokens to parse.')
+    if len(inputs) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f'A lo sumo {MAX_BATCH} entradas por lote')
+    if req.name is not None:
+        g = _registered(req.name)
+        grammar_hash, path = g.grammar_hash, g.tables.path
+    elif req.text is not None:
+        grammar_hash, built = _built(req.text)
+        path = str(pack_adhoc(grammar_hash, built.tables, built.spec.lex_rules))
+    else:
+        raise HTTPException(status_code=422, detail='Provide either text or name.')
+    results = [_result(node, err, req.tree) for node, err in _batch.parse_many(path, inputs, req.tree)]
+    return json_response(request, EncodedPayload(dumps({
+        'grammar_hash': grammar_hash,
+        'accepted': sum(1 for r in results if r['accepted']),
+        'results': results,
+    })))
@@ -1,12 +1,16 @@
 
 from pydantic import BaseModel
-from typing import List, Dict, Tuple, Any, Optional
+from typing import List, Dict, Tuple, Any, Literal, Optional
 
 class GrammarRequest(BaseModel):
     text: str  # archivo de gramática estilo labs
+    lite: Optional[bool] = None  # sin tablas/estados/imágenes (se piden paginados); None = según tamaño
+    method: str = 'lr1'  # 'lr1' (colección canónica) | 'lalr' | 'slr' | 'lr0' | 'auto' (el más barato sin conflictos)
 
 class RegexRequest(BaseModel):
     pattern: str  # expresión regular
+    # 'thompson' (AFN-ε) | 'glushkov' (AFN sin ε) | 'dfa' (AFD directo por followpos); otro valor: 422
+    method: Literal['thompson', 'glushkov', 'dfa'] = 'thompson'
 
 class NFATransition(BaseModel):
     src: int
@@ -29,9 +33,18 @@ class DFAResponse(BaseModel):
     subset_table: List[Dict[str, Any]]
 
 class LR1Response(BaseModel):
+    # Clave para /lr1/built/{grammar_hash}/table|states|transitions
+    grammar_hash: str = ''
+    lite: bool = False
+    method: str = 'lr1'  # método con el que se construyeron las tablas (con 'auto', el elegido)
+    n_states: int = 0
+    conflicted_states: List[int] = []
+    build_stats: Dict[str, Any] = {}  # {"estimate": estimate_cost, "build": LR1Builder.stats, "methods": probados}
     action: Dict[str, Dict[str, str]]
     goto: Dict[str, Dict[str, int]]
     conflicts: List[Dict[str, Any]]
+    # Conflictos shift/reduce resueltos por %left/%right/%nonassoc (no son conflictos reales)
+    resolved: List[Dict[str, Any]] = []
     states: List[Dict[str, Any]]
     transitions: List[Dict[str, Any]]
     grammar_augmented: List[str]
@@ -45,11 +58,71 @@ class LR1Response(BaseModel):
     # Optional visualization of LR(1) states DFA (canonical collection)
     items_dfa: Dict[str, Any] | None = None
 
+class PageResponse(BaseModel):
+    total: int  # filas que cumplen el filtro (sin paginar)
+    offset: int
+    items: List[Dict[str, Any]]
+
 class ParseRequest(BaseModel):
     text: str
     program: Optional[str] = None  # raw source to tokenize (requires LEXER)
     tokens: Optional[List[str]] = None  # explicit token types (spaces-separated in UI)
 
+class NamedParseRequest(BaseModel):
+    program: Optional[str] = None  # código fuente (la gramática registrada debe tener LEXER)
+    tokens: Optional[List[str]] = None
+    tree: bool = False  # incluir el AST en la respuesta
+
+class ParseResult(BaseModel):
+    accepted: bool
+    pos: Optional[int] = None  # índice del token inesperado
+    token: Optional[str] = None
+    expected: List[str] = []
+    message: Optional[str] = None
+    tree: Optional[Dict[str, Any]] = None  # {"sym", "lexeme", "children"}
+
+class BatchParseRequest(BaseModel):
+    text: Optional[str] = None  # gramática pegada (como en /lr1/build) ...
+    name: Optional[str] = None  # ... o una gramática registrada
+    programs: Optional[List[str]] = None  # código fuente por entrada (requiere LEXER)
+    tokens: Optional[List[List[str]]] = None  # o tipos de token por entrada
+    tree: bool = False
+
+class BatchParseResponse(BaseModel):
+    grammar_hash: str
+    accepted: int  # cuántas entradas se aceptaron
+    results: List[ParseResult]  # en el orden de las entradas
+
+class CheckRequest(BaseModel):
+    text: str
+    max_conflicts: int = 10  # cortar al encontrar K conflictos
+    confirm: bool = True  # confirmar con LR(1) los conflictos LALR(1)
+
+class CheckConflict(BaseModel):
+    kind: str
+    state: int
+    symbol: str
+    actions: List[str]
+
+class CheckResponse(BaseModel):
+    ok: bool
+    method: str  # análisis que decidió: 'slr' | 'lalr' | 'lr1'
+    conflicts: List[CheckConflict]
+    truncated: bool  # se cortó en max_conflicts (puede haber más)
+    confirmed: bool  # False: conflictos LALR(1) sin confirmar con LR(1) (confirm=false o presupuesto)
+    states: int
+    elapsed: float
+
+class GrammarInfo(BaseModel):
+    name: str
+    grammar_hash: str
+    start: str
+    n_states: int
+    terminals: List[str]
+    nonterminals: List[str]
+    has_lexer: bool
+    conflicts: int
+
 class TraceStep(BaseModel):
     stack: List[int]
     lookahead: str
@@ -0,0 +1,129 @@
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import fcntl
+import json
+import os
+import shutil
+import threading
+
+from lr1.builder import LR1Builder
+from lr1.lexer import Lexer
+from lr1.packed import PackedTables, pack_tables
+from lr1.tables import Tables
+
+from .utils.http import text_key
+
+# Registro de gramáticas con nombre. La configuración es un JSON {"nombre": "ruta/gramatica.txt"}
+# (rutas relativas al archivo); cada gramática se compila una sola vez a tablas empaquetadas
+# en PACKED_DIR y cada worker de uvicorn las abre con mmap de sólo lectura, así que la memoria
+# de las tablas se comparte entre workers y nada se reconstruye por request.
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+CONFIG = Path(os.environ.get('LR1_GRAMMARS', BACKEND_DIR / 'grammars.json'))
+PACKED_DIR = Path(os.environ.get('LR1_PACKED_DIR', BACKEND_DIR / '.packed'))
+
+
+class RegisteredGrammar:
+    def __init__(self, name: str, grammar_hash: str, tables: PackedTables):
+        self.name = name
+        self.grammar_hash = grammar_hash
+        self.tables = tables
+        self.lexer = Lexer(tables.lex_rules) if tables.lex_rules else None
+
+    def info(self) -> Dict:
+        T = self.tables
+        return {
+            'name': self.name,
+            'grammar_hash': self.grammar_hash,
+            'start': T.start,
+            'n_states': T.n_states,
+            'terminals': [t for t in T.terminals if t != '$'],
+            'nonterminals': [A for A in T.nonterminals if A not in T.aug_symbols],
+            'has_lexer': self.lexer is not None,
+            'conflicts': len(T.conflicts),
+        }
+
+
+def _read_config(config: Path) -> Dict[str, Path]:
+    if not config.exists():
+        return {}
+    with open(config, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    return {name: (config.parent / path).resolve() for name, path in raw.items()}
+
+
+# Compila `source` a PACKED_DIR/<nombre>-<hash>.lr1p si todavía no existe. El lock evita que
+# los workers que arrancan a la vez compilen la misma gramática en paralelo.
+def compile_grammar(name: str, source: Path, load: Callable, packed_dir: Path = PACKED_DIR) -> tuple[str, Path]:
+    text = source.read_text(encoding='utf-8')
+    grammar_hash = text_key(text)
+    target = packed_dir / f"{name}-{grammar_hash[:16]}.lr1p"
+    if target.exists():
+        return grammar_hash, target
+    packed_dir.mkdir(parents=True, exist_ok=True)
+    with open(packed_dir / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not target.exists():
+            spec = load(text)
+            G = spec.to_grammar()
+            builder = LR1Builder(G)
+            states, trans = builder.build_canonical_collection()
+            tables = Tables(G, states, trans, builder.aug_start)
+            pack_tables(tables, str(target), spec.lex_rules,
+                        meta={'name': name, 'grammar_hash': grammar_hash, 'source': str(source)})
+    return grammar_hash, target
+
+
+# Tablas de gramáticas pegadas por el usuario, empaquetadas para BatchParser. Cada proceso usa
+# su propio directorio y sólo conserva los ADHOC_KEEP archivos usados más recientemente.
+ADHOC_KEEP = 32
+_adhoc_lock = threading.Lock()
+
+
+def pack_adhoc(grammar_hash: str, tables: Tables, lex_rules, packed_dir: Path = PACKED_DIR) -> Path:
+    adhoc = packed_dir / f"adhoc-{os.getpid()}"
+    target = adhoc / f"{grammar_hash[:16]}.lr1p"
+    with _adhoc_lock:
+        if target.exists():
+            target.touch()
+            return target
+        adhoc.mkdir(parents=True, exist_ok=True)
+        pack_tables(tables, str(target), lex_rules, meta={'grammar_hash': grammar_hash})
+        files = sorted(adhoc.glob('*.lr1p'), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in files[ADHOC_KEEP:]:
+            old.unlink(missing_ok=True)
+    return target
+
+
+def clear_adhoc(packed_dir: Path = PACKED_DIR):
+    shutil.rmtree(packed_dir / f"adhoc-{os.getpid()}", ignore_errors=True)
+
+
+class GrammarRegistry:
+    def __init__(self):
+        self.grammars: Dict[str, RegisteredGrammar] = {}
+
+    def load(self, load: Callable, config: Path = CONFIG, packed_dir: Path = PACKED_DIR):
+        self.close()
+        for name, source in _read_config(config).items():
+            grammar_hash, path = compile_grammar(name, source, load, packed_dir)
+            self.grammars[name] = RegisteredGrammar(name, grammar_hash, PackedTables(str(path)))
+
+    def get(self, name: str) -> Optional[RegisteredGrammar]:
+        return self.grammars.get(name)
+
+    def close(self):
+        for g in self.grammars.values():
+            g.tables.close()
+        self.grammars = {}
+
+
+registry = GrammarRegistry()
+
+
+# Compila todas las gramáticas de la configuración (p. ej. al construir la imagen):
+#   python -m app.registry
+if __name__ == '__main__':
+    from .main import load_grammar_from_text
+    for name, source in _read_config(CONFIG).items():
+        grammar_hash, path = compile_grammar(name, source, load_grammar_from_text)
+        print(f"{name}: {path}")
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import gzip
+import hashlib
+import json
+import threading
+
+from fastapi import Request, Response
+
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # Se usa json estándar si no está instalado
+
+try:
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover
+    brotli = None  # Sin brotli sólo se ofrece gzip
+
+# Debajo de este tamaño comprimir no compensa
+MIN_COMPRESS = 1024
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# JSON ya serializado con su ETag; las variantes comprimidas se calculan una sola vez
+class EncodedPayload:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding not in self._encoded:
+            if encoding == 'br':
+                self._encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self._encoded[encoding]
+
+
+# LRU simple (respuestas pre-codificadas, gramáticas construidas) con clave = hash del texto.
+# FastAPI corre los endpoints síncronos en un threadpool: sin el lock, un get que cruza un
+# desalojo falla en move_to_end con KeyError.
+class LRUCache:
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            p = self._data.get(key)
+            if p is not None:
+                self._data.move_to_end(key)
+            return p
+
+    def put(self, key: str, payload: Any) -> Any:
+        with self._lock:
+            self._data[key] = payload
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return payload
+
+
+def _pick_encoding(accept: str) -> Optional[str]:
+    accepted = set()
+    for part in accept.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or ('W/' + etag) in tags
+
+
+# 304 si el cliente ya tiene esta versión; si no, el cuerpo comprimido según Accept-Encoding
+def json_response(request: Request, payload: EncodedPayload) -> Response:
+    headers = {
+        'ETag': payload.etag,
+        'Vary': 'Accept-Encoding',
+        'Cache-Control': 'no-cache',
+    }
+    inm = request.headers.get('if-none-match')
+    if inm and _etag_matches(inm, payload.etag):
+        return Response(status_code=304, headers=headers)
+    body = payload.body
+    if len(body) >= MIN_COMPRESS:
+        encoding = _pick_encoding(request.headers.get('accept-encoding', ''))
+        if encoding:
+            body = payload.encoded(encoding)
+            headers['Content-Encoding'] = encoding
+    return Response(content=body, media_type='application/json', headers=headers)
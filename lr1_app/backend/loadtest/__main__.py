@@ -0,0 +1,89 @@
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+from .runner import Server, environment, format_compare, format_report, post_json, run, summarize
+from .workload import generate, nfa_patterns, parse_mix
+
+# python -m loadtest [opciones]   (desde lr1_app/backend)
+# Levanta uvicorn con la app del árbol actual (o usa --url), reproduce a tasa fija una mezcla
+# determinista de requests y reporta percentiles de latencia, throughput y memoria de los
+# workers. Con --out se guarda el resultado en JSON y con --compare se compara contra uno previo.
+
+
+def _sizes(text: str) -> List[int]:
+    return [int(x) for x in text.split(',') if x.strip()]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog='python -m loadtest', description='Prueba de carga del backend LR(1)')
+    ap.add_argument('--mix', default='build=3,trace=4,regex2nfa=2,nfa2dfa=1',
+                    help='pesos por endpoint (build, trace, regex2nfa, nfa2dfa)')
+    ap.add_argument('--sizes', default='4,16,48', help='tamaños de gramática / regex, separados por coma')
+    ap.add_argument('--rate', type=float, default=20.0, help='requests por segundo (0: lazo cerrado, lo más rápido posible)')
+    ap.add_argument('--duration', type=float, default=30.0, help='segundos de carga (requests = rate * duration)')
+    ap.add_argument('--requests', type=int, default=None, help='cantidad de requests (reemplaza a --duration)')
+    ap.add_argument('--clients', type=int, default=16, help='conexiones concurrentes')
+    ap.add_argument('--workers', type=int, default=2, help='workers de uvicorn')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--variants', type=int, default=4,
+                    help='textos distintos por tamaño de gramática (1: todo pega en la cache de /lr1/build)')
+    ap.add_argument('--program-tokens', type=int, default=60, help='tokens por programa de /lr1/trace')
+    ap.add_argument('--url', default=None, help='servidor ya levantado (no se mide memoria)')
+    ap.add_argument('--port', type=int, default=0, help='puerto para uvicorn (por omisión uno libre)')
+    ap.add_argument('--out', default=None, help='guarda el resultado en este JSON')
+    ap.add_argument('--compare', default=None, help='JSON de una corrida anterior para comparar')
+    args = ap.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        sizes = _sizes(args.sizes)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    n = args.requests if args.requests is not None else int(args.rate * args.duration)
+    if n <= 0 or not sizes:
+        print("Error: no hay requests para enviar (revisar --rate/--duration/--requests/--sizes)", file=sys.stderr)
+        return 2
+    # Lo que define la carga: dos corridas con la misma config son comparables
+    config: Dict[str, Any] = {
+        'mix': mix, 'sizes': sizes, 'rate': args.rate, 'requests': n, 'clients': args.clients,
+        'workers': None if args.url else args.workers, 'seed': args.seed, 'variants': args.variants,
+        'program_tokens': args.program_tokens,
+    }
+
+    server = None if args.url else Server(workers=args.workers, port=args.port)
+    try:
+        if server is not None:
+            server.start()
+        url = args.url or server.url
+        nfas: Dict[int, List[Dict[str, Any]]] = {}
+        if 'nfa2dfa' in mix:
+            for size, pattern in nfa_patterns(sizes, seed=args.seed):
+                nfas.setdefault(size, []).append(post_json(url, '/lex/regex2nfa', {'pattern': pattern}))
+        requests = generate(mix, sizes, n, args.seed, args.variants, args.program_tokens, nfas)
+        print(f">>> {len(requests)} requests a {url} ({'lazo cerrado' if args.rate <= 0 else f'{args.rate:g} req/s'}, "
+              f"{args.clients} clientes)", file=sys.stderr)
+        result = run(url, requests, args.rate, args.clients, server)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {'environment': environment(), 'config': config, 'summary': summarize(result)}
+    print(format_report(report))
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print()
+            print(format_compare(json.load(f), report))
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0 if report['summary']['total']['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,352 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from .workload import Request
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = BACKEND_DIR.parent.parent
+
+
+# ---------------------------------------------------------------------------
+# Servidor: uvicorn en un subproceso, con la app del árbol actual
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _rss(pid: int) -> Optional[int]:
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# El proceso y sus descendientes (con --workers N uvicorn lanza un proceso por worker)
+def _tree(pid: int) -> List[int]:
+    parent: Dict[int, int] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'rb') as f:
+                # el nombre del proceso va entre paréntesis y puede tener espacios
+                fields = f.read().rsplit(b')', 1)[1].split()
+            parent[int(entry)] = int(fields[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    out = [pid]
+    for p in out:
+        out.extend(c for c, pp in parent.items() if pp == p)
+    return out
+
+
+class Server:
+    def __init__(self, workers: int = 1, port: int = 0, env: Optional[Dict[str, str]] = None):
+        self.workers = workers
+        self.port = port or _free_port()
+        self.env = env
+        self.proc: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60.0):
+        env = dict(os.environ, **(self.env or {}))
+        # lr1 desde el árbol actual aunque no esté instalado en el venv
+        src = str(REPO_DIR / 'lr1_project' / 'src')
+        env['PYTHONPATH'] = os.pathsep.join(p for p in (src, env.get('PYTHONPATH')) if p)
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:app', '--host', '127.0.0.1', '--port', str(self.port),
+             '--workers', str(self.workers), '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=env,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {self.proc.returncode}")
+            try:
+                if _request(self.url, 'GET', '/healthz', None)[0] == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"uvicorn no respondió en {timeout:.0f}s")
+
+    def pids(self) -> List[int]:
+        return _tree(self.proc.pid) if self.proc is not None else []
+
+    def stop(self):
+        if self.proc is not None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------------------------------------------------------------------
+# Cliente: una conexión keep-alive por hilo
+
+_local = threading.local()
+
+
+def _connection(url: str) -> http.client.HTTPConnection:
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        u = urlsplit(url)
+        conn = _local.conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=120)
+    return conn
+
+
+def _request(url: str, method: str, path: str, body: Optional[bytes]) -> tuple:
+    conn = _connection(url)
+    headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'identity'}
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        _local.conn = None
+        raise
+    return resp.status, data
+
+
+def post_json(url: str, path: str, body: Dict[str, Any]) -> Any:
+    status, data = _request(url, 'POST', path, json.dumps(body).encode('utf-8'))
+    if status != 200:
+        raise RuntimeError(f"{path}: HTTP {status}: {data[:200]!r}")
+    return json.loads(data)
+
+
+# ---------------------------------------------------------------------------
+# Corrida a tasa fija (lazo abierto): el request k se agenda en t0 + k / rate y la latencia
+# se mide desde ese instante, no desde que un cliente quedó libre. Así un servidor saturado
+# se ve como latencia creciente en vez de como menos requests (coordinated omission).
+# Con rate=0 cada cliente manda el siguiente apenas recibe la respuesta (máximo throughput).
+
+@dataclass
+class Sample:
+    endpoint: str
+    size: int
+    status: int  # 0: error de conexión / timeout
+    latency: float  # segundos desde el instante agendado
+    service: float  # segundos desde que se envió
+    nbytes: int
+
+
+class _MemorySampler(threading.Thread):
+    def __init__(self, server: Optional[Server], every: float = 0.5):
+        super().__init__(daemon=True)
+        self.server = server
+        self.every = every
+        self.peak: Dict[int, int] = {}
+        self.last: Dict[int, int] = {}
+        self._done = threading.Event()
+
+    def sample(self):
+        if self.server is None:
+            return
+        for pid in self.server.pids():
+            rss = _rss(pid)
+            if rss is not None:
+                self.last[pid] = rss
+                self.peak[pid] = max(self.peak.get(pid, 0), rss)
+
+    def run(self):
+        while not self._done.wait(self.every):
+            self.sample()
+
+    def stop(self) -> Dict[str, Any]:
+        self._done.set()
+        self.join()
+        self.sample()
+        mb = 1024 * 1024
+        return {
+            'processes': len(self.last),
+            'peak_mb': {str(pid): round(v / mb, 1) for pid, v in sorted(self.peak.items())},
+            'peak_total_mb': round(sum(self.peak.values()) / mb, 1),
+            'final_total_mb': round(sum(self.last.values()) / mb, 1),
+        }
+
+
+def run(url: str, requests: Sequence[Request], rate: float, clients: int,
+        server: Optional[Server] = None) -> Dict[str, Any]:
+    bodies = [json.dumps(r.body).encode('utf-8') for r in requests]
+    samples: List[Optional[Sample]] = [None] * len(requests)
+
+    def one(k: int, scheduled: float):
+        r = requests[k]
+        sent = time.monotonic()
+        try:
+            status, data = _request(url, 'POST', r.path, bodies[k])
+            n = len(data)
+        except (OSError, http.client.HTTPException):
+            status, n = 0, 0
+        done = time.monotonic()
+        samples[k] = Sample(r.endpoint, r.size, status, done - scheduled, done - sent, n)
+
+    mem = _MemorySampler(server)
+    mem.sample()
+    mem.start()
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        if rate > 0:
+            for k in range(len(requests)):
+                at = t0 + k / rate
+                delay = at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(one, k, at)
+        else:
+            counter = iter(range(len(requests)))
+            lock = threading.Lock()
+
+            def loop():
+                while True:
+                    with lock:
+                        k = next(counter, None)
+                    if k is None:
+                        return
+                    one(k, time.monotonic())
+
+            for _ in range(clients):
+                pool.submit(loop)
+    elapsed = time.monotonic() - t0
+    return {
+        'elapsed': round(elapsed, 3),
+        'memory': mem.stop(),
+        'samples': [s for s in samples if s is not None],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Resumen y comparación
+
+def _percentile(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    k = max(0, min(len(xs) - 1, int(round(p / 100.0 * len(xs) + 0.5)) - 1))
+    return xs[k]
+
+
+def _stats(samples: List[Sample]) -> Dict[str, Any]:
+    ok = sorted(s.latency for s in samples if s.status == 200)
+    ms = lambda x: round(x * 1000, 2)
+    return {
+        'n': len(samples),
+        'errors': sum(1 for s in samples if s.status != 200),
+        'p50_ms': ms(_percentile(ok, 50)),
+        'p90_ms': ms(_percentile(ok, 90)),
+        'p99_ms': ms(_percentile(ok, 99)),
+        'max_ms': ms(ok[-1]) if ok else 0.0,
+        'mean_ms': ms(sum(ok) / len(ok)) if ok else 0.0,
+        'kb': round(sum(s.nbytes for s in samples) / max(1, len(samples)) / 1024, 1),
+    }
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    samples: List[Sample] = result['samples']
+    groups: Dict[str, List[Sample]] = {}
+    for s in samples:
+        groups.setdefault(f"{s.endpoint}/{s.size}", []).append(s)
+    ok = sum(1 for s in samples if s.status == 200)
+    return {
+        'elapsed': result['elapsed'],
+        'throughput': round(ok / result['elapsed'], 2) if result['elapsed'] else 0.0,
+        'total': _stats(samples),
+        'by_key': {k: _stats(v) for k, v in sorted(groups.items(), key=lambda kv: _key_order(kv[0]))},
+        'memory': result['memory'],
+    }
+
+
+def _key_order(key: str):
+    endpoint, size = key.rsplit('/', 1)
+    return endpoint, int(size)
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Datos para saber si dos corridas son comparables (mismo config, misma máquina)
+def environment() -> Dict[str, Any]:
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    s = report['summary']
+    env = report['environment']
+    lines = [
+        f"commit {env['commit']}{' (dirty)' if env['dirty'] else ''}  python {env['python']}  cpus {env['cpus']}",
+        f"{s['total']['n']} requests en {s['elapsed']}s, {s['throughput']} req/s ok, {s['total']['errors']} errores",
+        '',
+        f"{'endpoint/size':<18}{'n':>6}{'err':>5}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}{'KB':>8}",
+    ]
+    for key, st in list(s['by_key'].items()) + [('total', s['total'])]:
+        lines.append(f"{key:<18}{st['n']:>6}{st['errors']:>5}{st['p50_ms']:>10}{st['p90_ms']:>10}"
+                     f"{st['p99_ms']:>10}{st['max_ms']:>10}{st['kb']:>8}")
+    mem = s['memory']
+    if mem['processes']:
+        lines += ['', f"memoria: {mem['processes']} procesos, pico {mem['peak_total_mb']} MB "
+                      f"(final {mem['final_total_mb']} MB); por proceso {mem['peak_mb']}"]
+    return "\n".join(lines)
+
+
+# Diferencias de p50/p99 y throughput contra una corrida anterior (JSON de --out)
+def format_compare(old: Dict[str, Any], new: Dict[str, Any]) -> str:
+    lines = [f"comparación con {old['environment']['commit']} ({old['environment']['time']})"]
+    if old['config'] != new['config']:
+        lines.append('  ¡atención: configuración distinta, los números no son comparables!')
+
+    def delta(a: float, b: float) -> str:
+        return f"{(b - a) / a * 100:+.1f}%" if a else 'n/a'
+
+    so, sn = old['summary'], new['summary']
+    lines.append(f"  throughput: {so['throughput']} -> {sn['throughput']} req/s ({delta(so['throughput'], sn['throughput'])})")
+    for key, st in sn['by_key'].items():
+        prev = so['by_key'].get(key)
+        if prev is None:
+            continue
+        lines.append(f"  {key:<18} p50 {prev['p50_ms']} -> {st['p50_ms']} ({delta(prev['p50_ms'], st['p50_ms'])})"
+                     f"   p99 {prev['p99_ms']} -> {st['p99_ms']} ({delta(prev['p99_ms'], st['p99_ms'])})")
+    mo, mn = so['memory'], sn['memory']
+    if mo['processes'] and mn['processes']:
+        lines.append(f"  memoria pico: {mo['peak_total_mb']} -> {mn['peak_total_mb']} MB")
+    return "\n".join(lines)
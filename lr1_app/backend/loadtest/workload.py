@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from random import Random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Cargas sintéticas deterministas: con el mismo seed se generan los mismos requests en el
+# mismo orden, así que dos corridas (p. ej. en commits distintos) miden lo mismo.
+
+ENDPOINTS = ('build', 'trace', 'regex2nfa', 'nfa2dfa')
+PATHS = {
+    'build': '/lr1/build',
+    'trace': '/lr1/trace',
+    'regex2nfa': '/lex/regex2nfa',
+    'nfa2dfa': '/lex/nfa2dfa',
+}
+
+
+# Gramática de expresiones con `size` niveles de precedencia (un operador por nivel):
+#   N0 -> N0 op0 N1 | N1   ...   N{size} -> ( N0 ) | id | num
+# Los estados crecen linealmente con `size`. `variant` sólo renombra los no terminales: mismo
+# autómata pero otro texto, así que no pega en la cache de /lr1/build.
+def grammar_text(size: int, variant: int = 0) -> str:
+    nts = [f"V{variant}L{i}" for i in range(size + 1)]
+    ops = [f"op{i}" for i in range(size)]
+    lines = [
+        f"START: {nts[0]}",
+        f"NONTERMINALS: {' '.join(nts)}",
+        f"TERMINALS: id num ( ) {' '.join(ops)}",
+        "PRODUCTIONS:",
+    ]
+    for i in range(size):
+        lines.append(f"  {nts[i]} -> {nts[i]} {ops[i]} {nts[i + 1]} | {nts[i + 1]}")
+    lines.append(f"  {nts[size]} -> ( {nts[0]} ) | id | num")
+    lines.append("LEXER:")
+    for op in ops:
+        lines.append(f"  {op}: /{op}\\b/")
+    lines += [
+        "  id: /[a-z_]\\w*/",
+        "  num: /\\d+/",
+        "  '(': /\\(/",
+        "  ')': /\\)/",
+        "  WS: /\\s+/ skip",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+# Programa válido para grammar_text(size) con ~n_tokens tokens: cualquier secuencia
+# operando (op operando)* es válida; algunos operandos son subexpresiones entre paréntesis.
+def program(rng: Random, size: int, n_tokens: int) -> str:
+    out: List[str] = []
+    depth = 0
+    while True:
+        if depth < 8 and len(out) < n_tokens - 4 and rng.random() < 0.15:
+            out.append('(')
+            depth += 1
+            continue
+        out.append(rng.choice(('x', 'y', 'z', str(rng.randrange(100)))))
+        while depth and rng.random() < 0.3:
+            out.append(')')
+            depth -= 1
+        if len(out) >= n_tokens:
+            break
+        out.append(f"op{rng.randrange(size)}")
+    out += [')'] * depth
+    return ' '.join(out)
+
+
+# Expresión regular sobre {a, b, c, d} con ~n_atoms átomos (|, *, +, ?, agrupación)
+def regex(rng: Random, n_atoms: int) -> str:
+    def expr(n: int) -> str:
+        if n <= 1:
+            s = rng.choice('abcd')
+        elif rng.random() < 0.3:
+            k = rng.randint(1, n - 1)
+            s = f"({expr(k)}|{expr(n - k)})"
+        else:
+            k = rng.randint(1, n - 1)
+            s = expr(k) + expr(n - k)
+        r = rng.random()
+        if r < 0.15:
+            s = f"({s})*" if len(s) > 1 else s + '*'
+        elif r < 0.2:
+            s = f"({s})+" if len(s) > 1 else s + '+'
+        return s
+    return expr(max(1, n_atoms))
+
+
+@dataclass
+class Request:
+    endpoint: str
+    size: int
+    body: Dict[str, Any]
+
+    @property
+    def path(self) -> str:
+        return PATHS[self.endpoint]
+
+
+# Mezcla "build=4,trace=3,regex2nfa=2,nfa2dfa=1" -> pesos por endpoint
+def parse_mix(text: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in PATHS:
+            raise ValueError(f"Endpoint desconocido en la mezcla: {name} (opciones: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight) if weight else 1.0
+    if not mix:
+        raise ValueError('Mezcla vacía')
+    return mix
+
+
+# `nfas`: cuerpos de /lex/nfa2dfa (respuestas de /lex/regex2nfa) por tamaño; los obtiene el
+# runner antes de medir porque el endpoint recibe un AFN, no una regex
+def generate(mix: Dict[str, float], sizes: Sequence[int], n: int, seed: int = 0, variants: int = 4,
+             program_tokens: int = 60, nfas: Optional[Dict[int, List[Dict[str, Any]]]] = None) -> List[Request]:
+    rng = Random(seed)
+    names = list(mix)
+    weights = [mix[k] for k in names]
+    out: List[Request] = []
+    for _ in range(n):
+        endpoint = rng.choices(names, weights)[0]
+        size = rng.choice(list(sizes))
+        if endpoint == 'build':
+            body: Dict[str, Any] = {'text': grammar_text(size, rng.randrange(variants))}
+        elif endpoint == 'trace':
+            body = {'text': grammar_text(size, rng.randrange(variants)), 'program': program(rng, size, program_tokens)}
+        elif endpoint == 'regex2nfa':
+            body = {'pattern': regex(rng, size * 2), 'method': rng.choice(('thompson', 'glushkov'))}
+        else:
+            pool = (nfas or {}).get(size)
+            if not pool:
+                continue
+            body = rng.choice(pool)
+        out.append(Request(endpoint, size, body))
+    return out
+
+
+# Patrones para precalcular los AFN de nfa2dfa (mismo seed -> mismos AFN)
+def nfa_patterns(sizes: Sequence[int], per_size: int = 4, seed: int = 0) -> List[Tuple[int, str]]:
+    rng = Random(seed + 1)
+    return [(size, regex(rng, size * 2)) for size in sizes for _ in range(per_size)]
@@ -1,10 +1,13 @@
-import React, { useState } from 'react'
-import { buildLR1, traceParse } from '../lib/api'
+import React, { useEffect, useState } from 'react'
+import { buildLR1, traceParse, fetchStatesPage, fetchTablePage, GrammarExpired } from '../lib/api'
 import DataTable from './DataTable'
 
 const EXPR = `A -> A ( A )
 A -> ε`;
 
+// Estados por página en las tablas de clausura y ACTION/GOTO
+const PAGE = 50
+
 export default function GrammarPanel(){
   const [text, setText] = useState(EXPR)
   const [loading, setLoading] = useState(false)
@@ -15,16 +18,39 @@ export default function GrammarPanel(){
   const [traceErr, setTraceErr] = useState<string|undefined>()
   const [nfaZoom, setNfaZoom] = useState(1)
   const [dfaZoom, setDfaZoom] = useState(1)
+  const [page, setPage] = useState(0)
+  const [conflictedOnly, setConflictedOnly] = useState(false)
+  // En modo lite (gramáticas grandes) sólo se trae del servidor la página visible
+  const [remote, setRemote] = useState<{total: number, items: any[]}|null>(null)
+  // Texto con el que se construyó `data` (para reconstruir si el servidor expiró la gramática)
+  const [builtText, setBuiltText] = useState('')
 
   async function onBuild(){
     setLoading(true)
     try{
       const res = await buildLR1(text)
       setData(res)
+      setBuiltText(text)
       setNfaZoom(1); setDfaZoom(1)
+      setPage(0); setRemote(null)
     }finally{ setLoading(false) }
   }
 
+  useEffect(()=>{
+    if(!data?.lite) return
+    let live = true
+    const params = { offset: page*PAGE, limit: PAGE, conflicted: conflictedOnly }
+    const load = () => tab==='closure' ? fetchStatesPage(data.grammar_hash, params) : fetchTablePage(data.grammar_hash, params)
+    // Si el servidor desalojó la gramática de su cache, se reconstruye una vez y se reintenta
+    const req = load().catch(async (e)=>{
+      if(!(e instanceof GrammarExpired)) throw e
+      await buildLR1(builtText)
+      return load()
+    })
+    req.then(res=>{ if(live) setRemote(res) }).catch(()=>{ if(live) setRemote({total: 0, items: []}) })
+    return ()=>{ live = false }
+  }, [data, builtText, tab, page, conflictedOnly])
+
   async function onTrace(){
     setTraceErr(undefined)
     setTrace(null)
@@ -37,7 +63,7 @@ export default function GrammarPanel(){
 
   const closureCols = ['state','items']
   const isEps = (t: string) => t === 'ε' || t === 'eps' || (typeof t === 'string' && t.indexOf('�') >= 0)
-  const closureRows = (data?.states||[]).map((s:any)=>({
+  const closureRow = (s:any)=>({
     state: s.state,
     items: s.items.map((it:any)=>{
       const rhs = (it.rhs||[]).filter((t:string)=>!isEps(t))
@@ -50,10 +76,21 @@ export default function GrammarPanel(){
       const body = parts.join(' ')
       return `[${it.lhs} -> ${body}, ${it.la}]`
     }).join('\n')
-  }))
+  })
 
-  const actionTerms = Array.from(new Set(Object.values(data?.action||{}).flatMap((r:any)=>Object.keys(r)))).sort()
-  const gotoNonterms = Array.from(new Set(Object.values(data?.goto||{}).flatMap((r:any)=>Object.keys(r)))).sort()
+  const conflicted = new Set<number>((data?.conflicted_states||[]).map(Number))
+  const keepState = (st:any) => !conflictedOnly || conflicted.has(Number(st))
+  const localStates = (data?.states||[]).filter((s:any)=>keepState(s.state))
+  const closureRows = data?.lite
+    ? (tab==='closure' ? (remote?.items||[]).map(closureRow) : [])
+    : localStates.slice(page*PAGE, (page+1)*PAGE).map(closureRow)
+
+  const actionTerms = data?.lite
+    ? [...(data.terminals||[]), '$'].sort()
+    : Array.from(new Set(Object.values(data?.action||{}).flatMap((r:any)=>Object.keys(r)))).sort()
+  const gotoNonterms = data?.lite
+    ? [...(data.nonterminals||[])].sort()
+    : Array.from(new Set(Object.values(data?.goto||{}).flatMap((r:any)=>Object.keys(r)))).sort()
   const actionCols = ['state', ...actionTerms]
   const gotoCols = ['state', ...gotoNonterms]
   const fixEps = (val: any) => (typeof val === 'string' ? val.replace(/r\[(.+?)\-\>\s*\]/g, (_m, p1) => `r[${p1}-> ε]`) : val)
@@ -65,15 +102,18 @@ export default function GrammarPanel(){
   const gotoRows = Object.entries(data?.goto||{}).map(([st,row]:any)=>({state: st, ...row}))
   // Combined ACTION + GOTO
   const combinedCols = ['state', ...actionTerms.map((t:string)=>`ACTION:${t}`), '||', ...gotoNonterms.map((A:string)=>`GOTO:${A}`)]
-  const stateKeys = Array.from(new Set([...Object.keys(data?.action||{}), ...Object.keys(data?.goto||{})])).sort((a:any,b:any)=>Number(a)-Number(b))
-  const combinedRows = stateKeys.map((st:any)=>{
-    const arow = (data?.action||{})[st] || {}
-    const grow = (data?.goto||{})[st] || {}
+  const stateKeys = Array.from(new Set([...Object.keys(data?.action||{}), ...Object.keys(data?.goto||{})])).sort((a:any,b:any)=>Number(a)-Number(b)).filter(keepState)
+  const combinedRow = (st:any, arow:any, grow:any)=>{
     const row:any = { state: st, '||': '' }
     for(const t of actionTerms){ row[`ACTION:${t}`] = fixEps(arow[t]||'') }
     for(const A of gotoNonterms){ row[`GOTO:${A}`] = (grow[A]!==undefined? grow[A] : '') }
     return row
-  })
+  }
+  const combinedRows = data?.lite
+    ? (tab==='action' ? (remote?.items||[]).map((r:any)=>combinedRow(r.state, r.action||{}, r.goto||{})) : [])
+    : stateKeys.slice(page*PAGE, (page+1)*PAGE).map((st:any)=>combinedRow(st, (data?.action||{})[st] || {}, (data?.goto||{})[st] || {}))
+  const totalRows = data?.lite ? (remote?.total ?? 0) : (tab==='closure' ? localStates.length : stateKeys.length)
+  const pages = Math.max(1, Math.ceil(totalRows / PAGE))
 
   const traceCols = ['Stack','Lookahead','Remaining','Action']
   const fixEpsAction = (val: string) => (typeof val==='string' ? val.replace(/(reduce\s+[^>]+->)\s*$/,'$1 ε') : val)
@@ -164,8 +204,17 @@ export default function GrammarPanel(){
           )}
 
           <div className="tabs">
-            <div className={`tab ${tab==='closure'?'active':''}`} onClick={()=>setTab('closure')}>Tabla de clausura (estados/ítems)</div>
-            <div className={`tab ${tab==='action'?'active':''}`} onClick={()=>setTab('action')}>Tabla de sintaxis (ACTION/GOTO)</div>
+            <div className={`tab ${tab==='closure'?'active':''}`} onClick={()=>{ setTab('closure'); setPage(0) }}>Tabla de clausura (estados/ítems)</div>
+            <div className={`tab ${tab==='action'?'active':''}`} onClick={()=>{ setTab('action'); setPage(0) }}>Tabla de sintaxis (ACTION/GOTO)</div>
+          </div>
+          <div className="flex gap-2 items-center my-2 text-sm">
+            <button className="btn" onClick={()=>setPage(p=>Math.max(0, p-1))} disabled={page===0}>‹</button>
+            <span>Página {page+1} / {pages} ({totalRows} estados)</span>
+            <button className="btn" onClick={()=>setPage(p=>Math.min(pages-1, p+1))} disabled={page>=pages-1}>›</button>
+            <label className="ml-4 flex items-center gap-1">
+              <input type="checkbox" checked={conflictedOnly} onChange={e=>{ setConflictedOnly(e.target.checked); setPage(0) }} />
+              Sólo estados con conflictos
+            </label>
           </div>
           {tab==='closure' && (<DataTable columns={closureCols} rows={closureRows} />)}
           {tab==='action' && (
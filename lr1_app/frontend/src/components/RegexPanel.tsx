@@ -1,13 +1,21 @@
 import React, { useState } from 'react'
 import { regex2nfa, nfa2dfa } from '../lib/api'
 import DataTable from './DataTable'
+
+// Qué autómata devuelve /lex/regex2nfa según el método
+const AUTOMATON: Record<string, string> = { thompson: 'AFN-ε', glushkov: 'AFN', dfa: 'AFD' }
+
 export default function RegexPanel(){
   const [pattern, setPattern] = useState('a(b|c)*')
+  const [method, setMethod] = useState('thompson')
   const [nfa, setNfa] = useState<any|null>(null)
+  // Método con el que se construyó `nfa` (el select puede haber cambiado después)
+  const [nfaMethod, setNfaMethod] = useState('thompson')
   const [dfa, setDfa] = useState<any|null>(null)
   async function onAFN(){
-    const res = await regex2nfa(pattern)
+    const res = await regex2nfa(pattern, method)
     setNfa(res)
+    setNfaMethod(method)
     setDfa(null)
   }
   async function onAFD(){
@@ -29,16 +37,21 @@ export default function RegexPanel(){
   const dfaRows = dfa?.transitions||[]
   return (
     <div className="card">
-      <h2 className="text-xl font-bold mb-2">Regex → AFN-ε → AFD</h2>
+      <h2 className="text-xl font-bold mb-2">{method === 'dfa' ? 'Regex → AFD' : `Regex → ${AUTOMATON[method]} → AFD`}</h2>
       <div className="flex gap-2 items-center">
         <input className="input" value={pattern} onChange={e=>setPattern(e.target.value)} placeholder="ER: a(b|c)*"/>
-        <button className="btn" onClick={onAFN}>Construir AFN-ε</button>
-        <button className="btn" onClick={onAFD} disabled={!nfa}>AFN→AFD</button>
+        <select className="input" value={method} onChange={e=>setMethod(e.target.value)}>
+          <option value="thompson">Thompson (AFN-ε)</option>
+          <option value="glushkov">Glushkov (AFN sin ε)</option>
+          <option value="dfa">followpos (AFD directo)</option>
+        </select>
+        <button className="btn" onClick={onAFN}>Construir {AUTOMATON[method]}</button>
+        <button className="btn" onClick={onAFD} disabled={!nfa}>{AUTOMATON[nfaMethod]}→AFD</button>
       </div>
       {nfa && (
         <div className="mt-4 grid md:grid-cols-2 gap-4">
           <div>
-            <h3 className="font-semibold mb-1">AFN-ε (transiciones)</h3>
+            <h3 className="font-semibold mb-1">{AUTOMATON[nfaMethod]} (transiciones)</h3>
             <DataTable columns={nfaCols} rows={nfaRows}/>
           </div>
           <div>
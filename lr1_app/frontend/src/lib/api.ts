@@ -2,14 +2,53 @@
 const BASE = (import.meta.env.VITE_API_BASE ?? "/api").replace(/\/+$/,"");
 const API = (path: string) => `${BASE}${path}`;
 
-export async function buildLR1(text: string){
-  const r = await fetch(API('/lr1/build'),{method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({text})})
+// Última respuesta de /lr1/build por texto de gramática; se revalida con If-None-Match (304 = sin cambios)
+const buildCache = new Map<string, {etag: string, data: any}>()
+
+export async function buildLR1(text: string, lite?: boolean){
+  const headers: Record<string, string> = {'Content-Type':'application/json'}
+  const key = `${lite}\u0000${text}`
+  const cached = buildCache.get(key)
+  if(cached) headers['If-None-Match'] = cached.etag
+  const r = await fetch(API('/lr1/build'),{method:'POST', headers, body: JSON.stringify({text, lite})})
+  if(r.status === 304 && cached) return cached.data
   if(!r.ok) throw new Error('LR1 build failed');
+  const data = await r.json()
+  const etag = r.headers.get('ETag')
+  if(etag){
+    buildCache.delete(key)
+    buildCache.set(key, {etag, data})
+    if(buildCache.size > 8) buildCache.delete(buildCache.keys().next().value as string)
+  }
+  return data
+}
+
+// Páginas de tablas/estados/transiciones de una gramática ya construida (clave: grammar_hash de buildLR1)
+// 404: el servidor ya no la tiene en cache; volver a llamar a buildLR1 con el mismo texto la reconstruye
+export class GrammarExpired extends Error {}
+
+export type PageParams = { start?: number, end?: number, offset?: number, limit?: number, symbols?: string[], conflicted?: boolean }
+
+async function getPage(hash: string, kind: 'table'|'states'|'transitions', params: PageParams = {}){
+  const q = new URLSearchParams()
+  if(params.start !== undefined) q.set('start', String(params.start))
+  if(params.end !== undefined) q.set('end', String(params.end))
+  if(params.offset !== undefined) q.set('offset', String(params.offset))
+  if(params.limit !== undefined) q.set('limit', String(params.limit))
+  if(params.symbols && params.symbols.length) q.set('symbols', params.symbols.join(','))
+  if(params.conflicted) q.set('conflicted', 'true')
+  const r = await fetch(API(`/lr1/built/${encodeURIComponent(hash)}/${kind}?${q.toString()}`))
+  if(r.status === 404) throw new GrammarExpired(`${kind} page: grammar expired`)
+  if(!r.ok) throw new Error(`${kind} page failed`);
   return r.json()
 }
 
-export async function regex2nfa(pattern: string){
-  const r = await fetch(API('/lex/regex2nfa'),{method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({pattern})})
+export const fetchTablePage = (hash: string, params?: PageParams) => getPage(hash, 'table', params)
+export const fetchStatesPage = (hash: string, params?: PageParams) => getPage(hash, 'states', params)
+export const fetchTransitionsPage = (hash: string, params?: PageParams) => getPage(hash, 'transitions', params)
+
+export async function regex2nfa(pattern: string, method: string = 'thompson'){
+  const r = await fetch(API('/lex/regex2nfa'),{method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({pattern, method})})
   if(!r.ok) throw new Error('regex2nfa failed');
   return r.json()
 }
@@ -1,6 +1,18 @@
 
 from .ast import Node
 from .grammar import Grammar, EPS, END
+from .compiled import CompiledGrammar
 from .builder import LR1Builder
+from .methods import LALRBuilder, MethodBuild, build_tables
+from .check import CheckResult, Conflict, check_grammar
+from .differential import DiffResult, Mismatch, register_engine, run_difftest
+from .cost import Budget, BudgetExceeded, CostEstimate, estimate_cost
+from .store import StateStore
+from .packed import PackedTables, pack_tables
+from .item_graph import ItemGraph
 from .tables import Tables, Action
-from .parser import Parser
\ No newline at end of file
+from .parser import Parser, ParseError, ParserCheckpoint
+from .optimize import optimize_grammar, OptimizedGrammar
+from .actions import SemanticActions
+from .incremental import IncrementalDocument
+from .parallel import ParallelParser, ParseErrors, BatchParser
\ No newline at end of file
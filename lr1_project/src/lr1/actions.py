@@ -0,0 +1,93 @@
+
+from __future__ import annotations
+import builtins
+import re
+from typing import Any, Callable, Dict, Iterable, Optional
+from .grammar import Symbol, Prod, EPS
+
+SemanticAction = Callable[..., Any]
+
+_DOLLAR_RE = re.compile(r"\$(\d+)")
+
+# Builtins disponibles en las acciones declaradas en el archivo de gramática
+_SAFE_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in ('abs', 'all', 'any', 'bool', 'dict', 'float', 'int', 'len', 'list',
+                 'max', 'min', 'round', 'str', 'sum', 'tuple')
+}
+
+def parse_rule(rule: str) -> Prod:
+    if '->' not in rule:
+        raise ValueError(f"Regla inválida: {rule}")
+    lhs, rhs = rule.split('->', 1)
+    syms = tuple(s for s in rhs.split() if s not in ('ε', 'eps', 'epsilon'))
+    return (lhs.strip(), syms if syms else (EPS,))
+
+# "$1 + $3" -> callable(*valores); $n es el valor del n-ésimo símbolo del RHS
+def compile_action(expr: str) -> SemanticAction:
+    body = _DOLLAR_RE.sub(lambda m: f"_[{int(m.group(1)) - 1}]", expr.strip())
+    code = compile(f"lambda *_: ({body})", f"<acción {expr.strip()!r}>", 'eval')
+    return eval(code, {'__builtins__': _SAFE_BUILTINS})
+
+# Clave de by_prod: las producciones que reducen Tables/Parser tienen el RHS vacío para ε
+# (el builder no guarda el EPS de Grammar), así que ε se normaliza a ()
+def _key(lhs: Symbol, rhs: Iterable[Symbol]) -> Prod:
+    return (lhs, tuple(s for s in rhs if s != EPS))
+
+class SemanticActions:
+    def __init__(self):
+        self.by_prod: Dict[Prod, SemanticAction] = {}
+
+    def register(self, lhs: Symbol, rhs: Iterable[Symbol], fn: SemanticAction):
+        self.by_prod[_key(lhs, rhs)] = fn
+
+    # @actions.on('E -> E + T')
+    def on(self, rule: str):
+        lhs, rhs = parse_rule(rule)
+        def deco(fn: SemanticAction) -> SemanticAction:
+            self.register(lhs, rhs, fn)
+            return fn
+        return deco
+
+    def get(self, prod: Prod) -> Optional[SemanticAction]:
+        return self.by_prod.get(_key(*prod))
+
+    def __contains__(self, prod: Prod) -> bool:
+        return _key(*prod) in self.by_prod
+
+    def __len__(self) -> int:
+        return len(self.by_prod)
+
+    def keys(self):
+        return self.by_prod.keys()
+
+def actions_from_spec(spec) -> SemanticActions:
+    acts = SemanticActions()
+    for lhs, rhs, expr in spec.actions:
+        acts.register(lhs, rhs, compile_action(expr))
+    return acts
+
+# Evalúa las acciones sobre un árbol ya construido, con la misma regla que Parser.evaluate:
+# las hojas aportan su lexema y, sin acción, el valor es el del primer hijo (o None). Sirve
+# cuando las reducciones no son las de la gramática de las acciones (p. ej. con --optimize,
+# sobre el árbol de OptimizedGrammar.restore_tree). Iterativo: los árboles de listas son hondos.
+def evaluate_tree(root, actions: SemanticActions) -> Any:
+    if root is None:
+        return None
+    values: list = []
+    stack = [(root, False)]
+    while stack:
+        node, done = stack.pop()
+        if not node.children and node.lexeme is not None:
+            values.append(node.lexeme)
+        elif not done:
+            stack.append((node, True))
+            stack.extend((ch, False) for ch in reversed(node.children))
+        else:
+            k = len(node.children)
+            args = values[len(values) - k:] if k else []
+            if k:
+                del values[-k:]
+            fn = actions.get((node.sym, tuple(ch.sym for ch in node.children)))
+            values.append(fn(*args) if fn else (args[0] if args else None))
+    return values[0]
@@ -1,5 +1,6 @@
 
-from dataclasses import dataclass
+import io
+from dataclasses import dataclass, field
 from typing import List, Optional
 
 @dataclass
@@ -7,10 +8,13 @@ class Node:
     sym: str
     children: List['Node']
     lexeme: Optional[str] = None
+    # Instantánea para reparseo incremental: estado LR bajo el nodo y cantidad de tokens que cubre
+    state: Optional[int] = field(default=None, compare=False, repr=False)
+    ntok: int = field(default=0, compare=False, repr=False)
 
     def pretty(self, indent: str = '') -> str:
-        here = f"{indent}{self.sym}" + (f":{self.lexeme}" if self.lexeme else '')
-        lines = [here]
-        for ch in self.children:
-            lines.append(ch.pretty(indent + '  '))
-        return "\n".join(lines)
\ No newline at end of file
+        from .serialize import write_pretty
+        buf = io.StringIO()
+        write_pretty(self, buf)
+        text = buf.getvalue()
+        return indent + text.replace("\n", "\n" + indent) if indent else text
\ No newline at end of file
@@ -1,86 +1,214 @@
 
 from __future__ import annotations
-from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
 from collections import deque
 from .grammar import Grammar, Symbol, RHS, Prod, EPS, END
 from .items import LR1Item
+from .store import StateStore
+from .item_graph import ItemGraph
+from .cost import Budget, BudgetExceeded, BuildMeter
+from .compiled import CompiledGrammar
 
 class LR1Builder:
-    def __init__(self, G: Grammar):
-        self.G = G
-        self.aug_start = self._augment_start()
+    # Una CompiledGrammar no se modifica: self.G pasa a ser su versión aumentada (usarla para
+    # Tables). Una Grammar mutable se aumenta en el lugar, una sola vez aunque se reconstruya.
+    # `starts`: puntos de entrada (por omisión sólo G.start). Todos comparten un autómata; cada
+    # uno tiene su S' -> E y su estado inicial, que es el k-ésimo para starts[k] (ver entries).
+    def __init__(self, G: Grammar | CompiledGrammar, track_items: bool = False, budget: Optional[Budget] = None,
+                 starts: Optional[Sequence[Symbol]] = None):
+        # Con presupuesto, build_canonical_collection corta con BudgetExceeded (ver cost.py)
+        self.budget = budget
+        self.meter = BuildMeter(budget)
+        self.starts: List[Symbol] = list(dict.fromkeys(starts)) if starts else [G.start]
+        for E in self.starts:
+            if E not in G.nonterminals:
+                raise ValueError(f"No terminal desconocido: {E}")
+        if isinstance(G, CompiledGrammar):
+            self.G = G.augment(self.starts)
+            self.aug_starts = {E: self.G.aug_starts[E] for E in self.starts}
+        else:
+            self.G = G
+            self.aug_starts = {E: self._augment_start(E) for E in self.starts}
+        self.aug_start = self.aug_starts[self.starts[0]]
+        self.entries: Dict[Symbol, int] = {E: k for k, E in enumerate(self.starts)}
+        # FIRST(beta) sin ε y si beta es anulable, por (lhs, rhs, punto) del ítem
+        self._first_beta: Dict[Tuple[Symbol, RHS, int], Tuple[FrozenSet[Symbol], bool]] = {}
+        # RHS de cada no terminal en la forma de los ítems (ε como secuencia vacía)
+        self._item_rhs: Dict[Symbol, List[RHS]] = {}
+        self.item_graph: Optional[ItemGraph] = ItemGraph() if track_items else None
+        # Se llama con (índice, ítems) de cada estado nuevo; puede cortar la construcción
+        # lanzando una excepción (p. ej. lr1 check al juntar K conflictos)
+        self.on_state: Optional[Callable[[int, FrozenSet[LR1Item]], None]] = None
 
-    def _augment_start(self) -> Symbol:
-        aug = self.G.start + "'"
-        while aug in self.G.nonterminals or aug in self.G.terminals:
+    def _augment_start(self, E: Symbol) -> Symbol:
+        G = self.G
+        if E in G.aug_starts:
+            return G.aug_starts[E]
+        aug = E + "'"
+        while aug in G.nonterminals or aug in G.terminals:
             aug += "'"
-        self.G.nonterminals.add(aug)
-        self.G.by_lhs[aug] = [(self.G.start,)]
-        self.G.productions.insert(0, (aug, (self.G.start,)))
+        G.nonterminals.add(aug)
+        G.by_lhs[aug] = [(E,)]
+        G.productions.insert(len(G.aug_starts), (aug, (E,)))
+        G.aug_starts[E] = aug
         return aug
 
+    def _first_after_dot(self, it: LR1Item) -> Tuple[FrozenSet[Symbol], bool]:
+        key = (it.lhs, it.rhs, it.dot)
+        hit = self._first_beta.get(key)
+        if hit is None:
+            first_beta = self.G.first_of_sequence(it.rhs[it.dot + 1:])
+            hit = (frozenset(x for x in first_beta if x != EPS), EPS in first_beta)
+            self._first_beta[key] = hit
+        return hit
+
+    def _rhs_of(self, B: Symbol) -> List[RHS]:
+        alts = self._item_rhs.get(B)
+        if alts is None:
+            # Treat epsilon-production RHS as empty sequence for items
+            alts = [tuple() if (len(g) == 1 and g[0] == EPS) else g for g in self.G.by_lhs.get(B, [])]
+            self._item_rhs[B] = alts
+        return alts
+
+    # Cierre con lista de trabajo: cada ítem se expande una sola vez
     def closure(self, I: Iterable[LR1Item]) -> Set[LR1Item]:
         G = self.G
+        graph = self.item_graph
         Iset: Set[LR1Item] = set(I)
-        changed = True
-        while changed:
-            changed = False
-            new_items: Set[LR1Item] = set()
-            for it in Iset:
-                B = it.at_dot()
-                if B and B != EPS and B in G.nonterminals:
-                    beta = it.rhs[it.dot + 1:]
-                    first_beta = G.first_of_sequence(beta)
-                    lookaheads: Set[Symbol] = {x for x in first_beta if x != EPS}
-                    if EPS in first_beta:
-                        lookaheads.add(it.la)
-                    for gamma in G.by_lhs.get(B, []):
-                        # Treat epsilon-production RHS as empty sequence for items
-                        if len(gamma) == 1 and gamma[0] == EPS:
-                            gamma = tuple()
-                        for b in lookaheads:
-                            new_items.add(LR1Item(B, gamma, 0, b))
-            before = len(Iset)
-            Iset |= new_items
-            changed = len(Iset) > before
+        work = deque(Iset)
+        while work:
+            it = work.popleft()
+            B = it.at_dot()
+            if B and B != EPS and B in G.nonterminals:
+                firsts, nullable = self._first_after_dot(it)
+                lookaheads = firsts | {it.la} if nullable else firsts
+                for gamma in self._rhs_of(B):
+                    for b in lookaheads:
+                        new = LR1Item(B, gamma, 0, b)
+                        if graph is not None:
+                            graph.add_edge(it, EPS, new)
+                        if new not in Iset:
+                            Iset.add(new)
+                            work.append(new)
         return Iset
 
     def goto(self, I: Iterable[LR1Item], X: Symbol) -> Set[LR1Item]:
         if X == EPS:
             return set()
         moved = [it.advance() for it in I if it.at_dot() == X]
+        if self.item_graph is not None:
+            for it in moved:
+                self.item_graph.add_edge(LR1Item(it.lhs, it.rhs, it.dot - 1, it.la), X, it)
         return self.closure(moved) if moved else set()
 
-    def build_canonical_collection(self) -> Tuple[List[Set[LR1Item]], Dict[Tuple[int, Symbol], int]]:
-        start_item = LR1Item(self.aug_start, (self.G.start,), 0, END)
-        I0 = self.closure({start_item})
+    def _finish_item_graph(self, start_item: LR1Item):
+        g = self.item_graph
+        if g is None:
+            return
+        g.start = g.intern(start_item)
+        augs = set(self.aug_starts.values())
+        g.finals = {k for k, it in enumerate(g.items) if it.lhs in augs and it.is_complete() and it.la == END}
+
+    # Estados, ítems y transiciones de la última construcción (parciales si se cortó)
+    @property
+    def stats(self) -> Dict:
+        return self.meter.stats()
+
+    # Con `store` los estados y transiciones van a disco (StateStore) y se devuelven
+    # (store, store.trans); si no, listas/dicts en memoria. Ojo: Tables sigue armando
+    # ACTION/GOTO como dicts en memoria (lee la colección estado por estado, pero las
+    # tablas completas tienen que entrar en RAM).
+    def build_canonical_collection(self, store: Optional[StateStore] = None) -> Tuple[List[Set[LR1Item]], Dict[Tuple[int, Symbol], int]]:
+        self.meter = meter = BuildMeter(self.budget)
+        # Un ítem inicial por punto de entrada; el grafo de ítems arranca en el del primero
+        start_items = [LR1Item(self.aug_starts[E], (E,), 0, END) for E in self.starts]
+        start_item = start_items[0]
+        if self.item_graph is not None:
+            self.item_graph.intern(start_item)
+        initial = [self.closure({it}) for it in start_items]
+        if store is not None:
+            result = self._build_into(store, initial)
+            self._finish_item_graph(start_item)
+            return result
 
         states: List[Set[LR1Item]] = []
         trans: Dict[Tuple[int, Symbol], int] = {}
         index_of: Dict[FrozenSet[LR1Item], int] = {}
 
+        # El frozenset sirve de clave y de estado a la vez (una sola copia por estado)
         def idx(s: Set[LR1Item]) -> int:
             key = frozenset(s)
             if key not in index_of:
                 index_of[key] = len(states)
-                states.append(set(s))
+                states.append(key)  # type: ignore
+                meter.add_state(len(key), len(q))
+                if self.on_state is not None:
+                    self.on_state(index_of[key], key)
             return index_of[key]
 
-        q = deque()
-        i0 = idx(I0)
-        q.append(i0)
+        q: deque = deque()
+        for I0 in initial:
+            q.append(idx(I0))
         while q:
             i = q.popleft()
             I = states[i]
             # Exclude epsilon from transitions in canonical collection
             next_syms = {X for it in I for X in ([it.at_dot()] if it.at_dot() is not None else []) if X != EPS}
-            for X in next_syms:
+            # En orden: la numeración de estados no depende del hash seed (un checkpoint de
+            # Parser.stream se puede retomar en otro proceso que reconstruya las tablas)
+            for X in sorted(next_syms):
                 J = self.goto(I, X)
                 if not J:
                     continue
+                n = len(states)
                 j = idx(J)
                 if (i, X) not in trans:
                     trans[(i, X)] = j
-                if j == len(states) - 1:
+                    meter.transitions += 1
+                # Sólo los estados nuevos (antes: también el último creado, y un lazo sobre
+                # él lo reencolaba para siempre, p. ej. S -> S S | id | ε)
+                if len(states) > n:
                     q.append(j)
+        self._finish_item_graph(start_item)
         return states, trans
+
+    def _build_into(self, store: StateStore, initial: List[Set[LR1Item]]):
+        store.attach(self.G)
+        meter = self.meter
+        q: deque = deque()
+        for I0 in initial:
+            i0, new = store.add(I0)
+            if new:
+                meter.add_state(len(I0), len(q))
+                if self.on_state is not None:
+                    self.on_state(i0, frozenset(I0))
+                q.append(i0)
+        # Las transiciones se cuentan al insertarlas (INSERT OR IGNORE): sólo las nuevas
+        inserted = store.trans.inserted
+        try:
+            self._explore_into(store, q)
+        except BudgetExceeded as e:
+            store.trans.flush()
+            meter.transitions = e.stats['transitions'] = store.trans.inserted - inserted
+            raise
+        store.commit()
+        meter.transitions = store.trans.inserted - inserted
+        return store, store.trans
+
+    def _explore_into(self, store: StateStore, q: deque):
+        meter = self.meter
+        while q:
+            i = q.popleft()
+            I = store[i]
+            next_syms = {X for it in I for X in ([it.at_dot()] if it.at_dot() is not None else []) if X != EPS}
+            for X in sorted(next_syms):
+                J = self.goto(I, X)
+                if not J:
+                    continue
+                j, new = store.add(J)
+                store.trans.add(i, X, j)
+                if new:
+                    meter.add_state(len(J), len(q))
+                    if self.on_state is not None:
+                        self.on_state(j, frozenset(J))
+                    q.append(j)
@@ -0,0 +1,129 @@
+
+from __future__ import annotations
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+from .grammar import Grammar, Symbol, Prod, END
+from .items import LR1Item
+from .builder import LR1Builder
+from .compiled import CompiledGrammar
+from .cost import Budget, BudgetExceeded
+from .methods import LALRBuilder
+
+# Chequeo de conflictos sin construir Tables: cada estado se revisa por separado (shifts por
+# el símbolo tras el punto, reducciones por lookahead) y se usa el análisis más barato que
+# sea correcto. Los lookaheads LR(1) de un núcleo están contenidos en los LALR(1), y éstos
+# en los SLR(1), así que si SLR(1) o LALR(1) no tienen conflictos LR(1) tampoco. Si LALR(1)
+# los tiene, pueden venir de fusionar estados: se confirman con la colección canónica,
+# cortando al juntar max_conflicts.
+
+@dataclass
+class Conflict:
+    kind: str  # 'shift/reduce' | 'reduce/reduce' (accept cuenta como reducción, igual que en Tables)
+    state: int  # número de estado del autómata del método que lo encontró
+    symbol: Symbol
+    actions: Tuple[str, ...]  # p. ej. ('shift', 'E -> E + E') o ('accept', 'T -> ε')
+
+    def __str__(self) -> str:
+        return f"{self.kind} at state {self.state}, on '{self.symbol}': {' vs '.join(self.actions)}"
+
+@dataclass
+class CheckResult:
+    ok: bool
+    method: str  # análisis que decidió: 'slr', 'lalr' o 'lr1'
+    conflicts: List[Conflict] = field(default_factory=list)
+    truncated: bool = False  # se cortó al llegar a max_conflicts (puede haber más)
+    confirmed: bool = True  # False: conflictos LALR(1) sin confirmar con LR(1) (confirm=False o presupuesto)
+    states: int = 0  # estados revisados en el último análisis
+    elapsed: float = 0.0
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+class _Enough(Exception):
+    pass
+
+def _fmt(prod: Prod) -> str:
+    lhs, rhs = prod
+    return f"{lhs} -> {' '.join(rhs) if rhs else 'ε'}"
+
+# Misma regla que Tables._resolve: el shift/reduce se resuelve si el token y la producción
+# tienen precedencia (incluido %nonassoc, que deja la celda en error)
+def _resolved(G, a: Symbol, prod: Prod) -> bool:
+    return a in G.prec and G.production_precedence(prod) is not None
+
+def state_conflicts(G: Grammar | CompiledGrammar, i: int, I: Iterable[LR1Item], augs: Set[Symbol]) -> List[Conflict]:
+    shifts: Set[Symbol] = set()
+    reduces: Dict[Symbol, Set[Prod]] = {}
+    accept = False
+    for it in I:
+        X = it.at_dot()
+        if X is None:
+            if it.lhs in augs and it.la == END:
+                accept = True
+            else:
+                reduces.setdefault(it.la, set()).add((it.lhs, it.rhs))
+        elif X in G.terminals:
+            shifts.add(X)
+    out: List[Conflict] = []
+    for a in sorted(reduces):
+        R = sorted(reduces[a])
+        if len(R) > 1:
+            out.append(Conflict('reduce/reduce', i, a, tuple(_fmt(p) for p in R)))
+        if accept and a == END:
+            # [S' -> S·, $] es la acción sobre $: Tables._set_action lo reporta como conflicto
+            out.extend(Conflict('reduce/reduce', i, a, ('accept', _fmt(p))) for p in R)
+        if a in shifts:
+            for p in R:
+                if not _resolved(G, a, p):
+                    out.append(Conflict('shift/reduce', i, a, ('shift', _fmt(p))))
+    return out
+
+def _scan(G, states: Sequence[Iterable[LR1Item]], augs: Set[Symbol], limit: int) -> Tuple[List[Conflict], bool]:
+    found: List[Conflict] = []
+    for i, I in enumerate(states):
+        found.extend(state_conflicts(G, i, I, augs))
+        if len(found) >= limit:
+            return found[:limit], True
+    return found, False
+
+# `confirm=False` se queda con los conflictos LALR(1) (más rápido; puede incluir conflictos
+# que LR(1) no tiene). `budget` limita la confirmación LR(1); si se pasa se devuelven los
+# conflictos LALR(1) con confirmed=False.
+def check_grammar(G: Grammar | CompiledGrammar, max_conflicts: int = 10, confirm: bool = True,
+                  starts: Optional[Sequence[Symbol]] = None, budget: Optional[Budget] = None) -> CheckResult:
+    t0 = time.monotonic()
+    limit = max(1, max_conflicts)
+    lb = LALRBuilder(G, budget=budget, starts=starts)
+    augs = set(lb.aug_starts.values())
+    result = None
+    for method in ('slr', 'lalr'):
+        states = getattr(lb, f"{method}_states")()
+        found, truncated = _scan(lb.G, states, augs, limit)
+        result = CheckResult(not found, method, found, truncated, states=len(states))
+        if not found:
+            break
+    assert result is not None
+    if result.ok or not confirm:
+        result.confirmed = result.ok
+        result.elapsed = round(time.monotonic() - t0, 4)
+        return result
+
+    builder = LR1Builder(lb.G, budget=budget, starts=starts)
+    found: List[Conflict] = []
+
+    def on_state(i: int, I: FrozenSet[LR1Item]):
+        found.extend(state_conflicts(builder.G, i, I, augs))
+        if len(found) >= limit:
+            raise _Enough()
+
+    builder.on_state = on_state
+    try:
+        builder.build_canonical_collection()
+        result = CheckResult(not found, 'lr1', found, False, states=builder.meter.states)
+    except _Enough:
+        result = CheckResult(False, 'lr1', found[:limit], True, states=builder.meter.states)
+    except BudgetExceeded:
+        result.confirmed = False
+    result.elapsed = round(time.monotonic() - t0, 4)
+    return result
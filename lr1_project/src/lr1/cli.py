@@ -1,58 +1,315 @@
 
 from __future__ import annotations
-import argparse, json, sys
+import argparse, copy, json, os, sys
+from collections import OrderedDict
 from .grammar_io import load_grammar_file
-from .builder import LR1Builder
-from .tables import Tables
-from .parser import Parser
+from .methods import METHODS, METHOD_NAMES, build_tables
+from .parser import Parser, ParserCheckpoint
 from .lexer import Lexer
+from .optimize import DEFAULT_PASSES, PASSES, optimize_grammar
+from .actions import actions_from_spec, evaluate_tree
+from .store import StateStore
+from .packed import pack_tables
+from .cost import Budget, BudgetExceeded, estimate_cost
+from .check import check_grammar
+from .differential import ENGINES, LAYERS, REFERENCE, run_difftest
+from .parallel import ParallelParser, tokenize_file
+from .serialize import TREE_FORMATS, TABLE_FORMATS, JSONStringWriter, write_json, write_tables, write_tree
 
-def _build_tables(grammar_path: str):
+# `starts`: puntos de entrada además del símbolo inicial (un solo autómata para todos);
+# `method`: lr1 (canónico), lalr, slr, lr0 o auto (el más barato sin conflictos, ver methods.py)
+# `passes`: pasadas de optimize_grammar (vacío: sin optimizar)
+def _build_tables(grammar_path: str, passes: tuple = (), store: StateStore | None = None,
+                  budget: Budget | None = None, starts: tuple = (), method: str = 'lr1'):
     spec, G = load_grammar_file(grammar_path)
-    builder = LR1Builder(G)
-    states, trans = builder.build_canonical_collection()
-    tables = Tables(G, states, trans, builder.aug_start)
-    return spec, G, builder, tables
+    opt = None
+    if passes:
+        opt = optimize_grammar(G, passes)
+        G = opt.grammar
+    built = build_tables(G, method, starts=[G.start, *starts], budget=budget, store=store)
+    return spec, G, built.builder, built.tables, opt
+
+def _starts(value: str | None) -> tuple:
+    return tuple(s for s in value.split(',') if s) if value else ()
+
+def _pass_list(value: str) -> tuple:
+    passes = _starts(value)
+    unknown = [p for p in passes if p not in PASSES]
+    if unknown or not passes:
+        raise argparse.ArgumentTypeError(f"pasadas inválidas: {value} (opciones: {', '.join(PASSES)})")
+    return passes
+
+# --passes implica --optimize; --optimize solo usa DEFAULT_PASSES
+def _passes(args) -> tuple:
+    return args.passes or (DEFAULT_PASSES if args.optimize else ())
+
+# Cache de tablas compiladas, activa sólo en el daemon (`lr1 serve`):
+# (ruta absoluta, mtime, tamaño, passes, starts, method) -> resultado de _build_tables
+_table_cache: OrderedDict | None = None
+TABLE_CACHE_SIZE = 32
+
+def enable_table_cache():
+    global _table_cache
+    _table_cache = OrderedDict()
+
+def _get_tables(grammar_path: str, passes: tuple = (), starts: tuple = (), method: str = 'lr1'):
+    if _table_cache is None:
+        return _build_tables(grammar_path, passes, starts=starts, method=method)
+    st = os.stat(grammar_path)
+    key = (os.path.abspath(grammar_path), st.st_mtime_ns, st.st_size, passes, starts, method)
+    hit = _table_cache.get(key)
+    if hit is None:
+        hit = _build_tables(grammar_path, passes, starts=starts, method=method)
+        _table_cache[key] = hit
+        while len(_table_cache) > TABLE_CACHE_SIZE:
+            _table_cache.popitem(last=False)
+    _table_cache.move_to_end(key)
+    return hit
+
+def _budget(args) -> Budget | None:
+    if args.max_states is None and args.max_items is None and args.timeout is None and args.max_memory is None:
+        return None
+    return Budget(max_states=args.max_states, max_items=args.max_items, deadline=args.timeout,
+                  max_memory=None if args.max_memory is None else args.max_memory * 1024 * 1024)
 
 def cmd_build(args):
-    spec, G, builder, tables = _build_tables(args.grammar)
+    if args.estimate:
+        spec, G = load_grammar_file(args.grammar)
+        for key, value in estimate_cost(G).as_dict().items():
+            print(f"{key:>16}: {value}")
+        return
+    store = StateStore(args.store, memory_items=args.memory_items) if args.store is not None else None
+    try:
+        _cmd_build(args, store)
+    except BudgetExceeded as e:
+        print('ERROR:', e, file=sys.stderr)
+        print(json.dumps(e.stats), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if store is not None:
+            store.close()
+
+def _cmd_build(args, store):
+    budget = _budget(args)
+    starts = _starts(args.starts)
+    if store is not None or budget is not None:
+        spec, G, builder, tables, opt = _build_tables(args.grammar, _passes(args), store, budget, starts, args.method)
+    else:
+        spec, G, builder, tables, opt = _get_tables(args.grammar, _passes(args), starts, args.method)
+    if args.method != 'lr1':
+        print(f"Método: {METHOD_NAMES[tables.method]} ({len(tables.states)} estados)")
+    if starts:
+        print('Entradas:', ', '.join(f"{E} -> estado {s}" for E, s in tables.entries.items()))
     if args.tables:
-        print(tables.dump_tables())
+        write_tables(tables, sys.stdout, args.format)
+        print()
         print()
     if args.conflicts:
         print(tables.dump_conflicts())
+    if opt:
+        if opt.duplicates:
+            print('Duplicadas:', ', '.join(f"{A} -> {' '.join(rhs)}" for A, rhs in opt.duplicates))
+        if opt.removed:
+            print('Eliminados:', ' '.join(sorted(opt.removed)))
+        if opt.inlined:
+            print('Expandidos:', ' '.join(sorted(opt.inlined)))
+        for key, (before, after) in opt.report().items():
+            print(f"{key:>12}: {before} -> {after} ({after - before:+d})")
+
+# Guarda el checkpoint de forma atómica: si el proceso muere a mitad de la escritura queda el anterior
+def _save_checkpoint(path: str, cp: ParserCheckpoint):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(cp.to_bytes())
+    os.replace(tmp, path)
 
 def cmd_parse(args):
-    spec, G, builder, tables = _build_tables(args.grammar)
-    L = Lexer(spec.lex_rules)
-    with open(args.input, 'r', encoding='utf-8') as f:
-        program = f.read()
-    tokens = L.tokenize(program)
-    P = Parser(tables, build_tree=args.tree)
+    if args.sync:
+        # ParallelParser arma sus propias tablas LR(1) desde el símbolo inicial y cose
+        # árboles completos: no hay punto de entrada, acciones ni tablas modificadas
+        unsupported = [flag for flag, on in (('--start', args.start), ('--unit-elim', args.unit_elim),
+                                             ('--collapse', args.collapse), ('--eval', args.eval),
+                                             ('--method', args.method != 'lr1')) if on]
+        if unsupported:
+            print(f"ERROR: --sync no se combina con {', '.join(unsupported)}", file=sys.stderr)
+            sys.exit(2)
+        if not args.sub_start:
+            print('ERROR: --sync requiere --sub-start', file=sys.stderr)
+            sys.exit(2)
+    # Con --sync las tablas llevan sub_start como punto de entrada y las usa ParallelParser
+    # (así también quedan en la cache del daemon)
+    starts = (args.sub_start,) if args.sync else _starts(args.start)
+    spec, G, builder, tables, opt = _get_tables(args.grammar, _passes(args), starts, args.method)
+    L = Lexer(spec.lex_rules, keyword_table=args.keyword_table)
+    if args.checkpoint or args.resume:
+        if args.sync or args.lex_jobs or args.justtypes:
+            print('ERROR: --checkpoint/--resume no se combinan con --sync, --lex-jobs ni --justtypes', file=sys.stderr)
+            sys.exit(2)
+        with open(args.input, 'r', encoding='utf-8') as f:
+            program = f.read()
+        resume = None
+        if args.resume:
+            with open(args.resume, 'rb') as f:
+                resume = ParserCheckpoint.from_bytes(f.read())
+            if resume.offset is None:
+                print(f"ERROR: {args.resume} no guarda el offset en el texto", file=sys.stderr)
+                sys.exit(2)
+        tokens = L.scan(program, resume.offset if resume else 0)
+    elif args.lex_jobs:
+        tokens = tokenize_file(L, args.input, workers=args.lex_jobs)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            program = f.read()
+        tokens = L.tokenize(program)
+    actions = actions_from_spec(spec) if args.eval else None
+    # Con --optimize las acciones (de la gramática original) no corresponden a las reducciones:
+    # se arma el árbol, se lleva a la original y se evalúa sobre él
+    eval_tree = bool(actions) and opt is not None
+    if args.unit_elim:
+        # Copia superficial: las tablas pueden estar compartidas en la cache del daemon
+        tables = copy.copy(tables)
+        tables.eliminate_unit_reductions(keep=actions.keys() if actions and not eval_tree else ())
+    if args.sync:
+        P = ParallelParser(G, args.sync.split(','), args.sub_start, workers=args.jobs, build_tree=args.tree,
+                           tables=tables)
+    else:
+        P = Parser(tables, build_tree=args.tree or eval_tree, collapse_units=args.collapse and not eval_tree,
+                   actions=actions)
+    run = None
+    if args.checkpoint or args.resume:
+        on_cp = (lambda cp: _save_checkpoint(args.checkpoint, cp)) if args.checkpoint else None
+
+        def run(evaluate: bool):
+            return P.stream(tokens, start=args.start, evaluate=evaluate, checkpoint_every=args.checkpoint_every,
+                            on_checkpoint=on_cp, resume=resume)
     try:
-        root = P.parse(tokens if not args.justtypes else [t for (t, lx) in tokens])
+        if args.eval:
+            if eval_tree:
+                root = run(False) if run else P.parse(tokens, start=args.start)
+                value = evaluate_tree(opt.restore_tree(root), actions)
+            else:
+                value = run(True) if run else P.evaluate(tokens, start=args.start)
+            if args.envelope:
+                print(json.dumps({'ok': True, 'message': 'Parseo exitoso', 'value': value}, ensure_ascii=False, default=str))
+            else:
+                print(value)
+            return
+        if run:
+            root = run(False)
+        else:
+            toks = tokens if not args.justtypes else [t for (t, lx) in tokens]
+            root = P.parse(toks, start=args.start) if args.start else P.parse(toks)
+        if opt and root:
+            root = opt.restore_tree(root)
         if args.envelope:
-            print(json.dumps({
-                'ok': True, 'message': 'Parseo exitoso',
-                'conflicts': [
-                    {'type': c[0], 'state': c[1], 'symbol': c[2]}
-                    for c in tables.conflicts
-                ],
-                'ast': (root.pretty() if root else None)
-            }, ensure_ascii=False))
+            _write_envelope(sys.stdout, tables, root, args.format)
+        elif args.format == 'binary':
+            if root:
+                write_tree(root, sys.stdout.buffer, 'binary')
         else:
             print('Parseo exitoso')
             if args.tree and root:
                 print('\nÁrbol:')
-                print(root.pretty())
+                write_tree(root, sys.stdout, args.format)
+                print()
     except Exception as e:
         if args.envelope:
             print(json.dumps({'ok': False, 'message': str(e)}, ensure_ascii=False))
         else:
             print('ERROR:', e, file=sys.stderr)
             sys.exit(1)
+    finally:
+        if isinstance(P, ParallelParser):
+            P.close()
 
-def main(argv=None):
+# El árbol se escribe en streaming dentro del sobre JSON: como objeto con --format json,
+# como string (texto pretty/sexpr) en otro caso.
+def _write_envelope(out, tables, root, fmt: str):
+    if fmt == 'binary':
+        raise ValueError('--format binary no se puede usar con --envelope')
+    head = json.dumps({
+        'ok': True, 'message': 'Parseo exitoso',
+        'conflicts': [
+            {'type': c[0], 'state': c[1], 'symbol': c[2]}
+            for c in tables.conflicts
+        ],
+    }, ensure_ascii=False)
+    out.write(head[:-1] + ', "ast": ')
+    if root is None:
+        out.write('null')
+    elif fmt == 'json':
+        write_json(root, out)
+    else:
+        out.write('"')
+        write_tree(root, JSONStringWriter(out), fmt)
+        out.write('"')
+    out.write('}\n')
+
+# Lint de conflictos: sale con 1 si hay conflictos (ver check.py); no usa la cache del daemon
+def cmd_check(args):
+    spec, G = load_grammar_file(args.grammar)
+    budget = Budget(deadline=args.timeout) if args.timeout is not None else None
+    result = check_grammar(G, args.max_conflicts, confirm=not args.fast,
+                           starts=[G.start, *_starts(args.starts)], budget=budget)
+    if args.json:
+        print(json.dumps(result.as_dict(), ensure_ascii=False))
+    elif result.ok:
+        print(f"{args.grammar}: sin conflictos ({METHOD_NAMES[result.method]}, {result.states} estados, {result.elapsed:.3f}s)")
+    else:
+        note = '' if result.confirmed else ', sin confirmar con LR(1)'
+        print(f"{args.grammar}: conflictos ({METHOD_NAMES[result.method]}{note}):")
+        for c in result.conflicts:
+            print(f"  • {c}")
+        if result.truncated:
+            print(f"  (se cortó en {len(result.conflicts)}; puede haber más)")
+    if not result.ok:
+        sys.exit(1)
+
+# Pruebas diferenciales de las variantes registradas contra la referencia (ver differential.py)
+def cmd_difftest(args):
+    if args.list:
+        for layer in LAYERS:
+            for e in ENGINES[layer].values():
+                if e.name != REFERENCE:
+                    print(f"{layer:<8} {e.name:<14} {'' if e.default else '(opcional) '}{e.note}")
+        return
+    try:
+        result = run_difftest(args.cases, args.seed, _starts(args.layers) or LAYERS, _starts(args.engines) or None,
+                              size=args.size, inputs=args.inputs, do_shrink=not args.no_shrink)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    if args.json:
+        print(json.dumps({
+            'ok': result.ok, 'cases': result.cases, 'checks': result.checks, 'skipped': result.skipped,
+            'engines': result.engines, 'elapsed': result.elapsed,
+            'mismatches': [{'layer': m.layer, 'engine': m.engine, 'case': m.case.describe(),
+                            'expected': repr(m.expected), 'got': repr(m.got)} for m in result.mismatches],
+        }, ensure_ascii=False))
+    else:
+        engines = ', '.join(f"{layer}: {'/'.join(names) or '-'}" for layer, names in result.engines.items())
+        print(f"{result.cases} casos, {result.checks} comparaciones ({engines}) en {result.elapsed:.2f}s")
+        for m in result.mismatches:
+            print()
+            print(m)
+        if result.ok:
+            print("Sin diferencias con la referencia.")
+    if not result.ok:
+        sys.exit(1)
+
+def cmd_pack(args):
+    spec, G, builder, tables, opt = _build_tables(args.grammar, starts=_starts(args.starts), method=args.method)
+    pack_tables(tables, args.output, spec.lex_rules, meta={'source': os.path.abspath(args.grammar)})
+    print(f"{args.output}: {METHOD_NAMES[tables.method]}, {len(tables.states)} estados, {len(tables.conflicts)} conflictos")
+
+def cmd_serve(args):
+    from . import daemon
+    if args.stop:
+        daemon.stop(args.socket)
+        return
+    daemon.serve(args.socket)
+
+def run_command(argv=None):
     p = argparse.ArgumentParser(prog='lr1', description='LR(1) labs-style')
     sub = p.add_subparsers(dest='cmd', required=True)
 
@@ -60,6 +317,21 @@ def main(argv=None):
     b.add_argument('grammar')
     b.add_argument('--tables', action='store_true')
     b.add_argument('--conflicts', action='store_true')
+    b.add_argument('--format', choices=TABLE_FORMATS, default='text', help='Formato de --tables')
+    b.add_argument('--optimize', action='store_true', help='Optimizar la gramática y reportar el ahorro')
+    b.add_argument('--passes', type=_pass_list, default=None, metavar='P,Q',
+                   help=f"Pasadas de --optimize ({', '.join(PASSES)}; por omisión {','.join(DEFAULT_PASSES)})")
+    b.add_argument('--store', nargs='?', const='', default=None, metavar='PATH',
+                   help='Guardar la colección canónica en SQLite (PATH, o un temporal) en vez de en memoria')
+    b.add_argument('--memory-items', type=int, default=1_000_000, help='Ítems decodificados a mantener en memoria con --store')
+    b.add_argument('--estimate', action='store_true', help='Sólo estimar el costo (núcleos LR(0), lookaheads) sin construir')
+    b.add_argument('--max-states', type=int, default=None, help='Cortar la construcción al pasar N estados')
+    b.add_argument('--max-items', type=int, default=None, help='Cortar la construcción al pasar N ítems LR(1) en total')
+    b.add_argument('--timeout', type=float, default=None, help='Cortar la construcción después de N segundos')
+    b.add_argument('--max-memory', type=int, default=None, metavar='MB', help='Cortar la construcción al crecer la memoria en MB')
+    b.add_argument('--starts', default=None, metavar='A,B', help='Puntos de entrada adicionales (no terminales separados por coma)')
+    b.add_argument('--method', choices=('auto',) + METHODS, default='lr1',
+                   help='Método de construcción; auto elige el más barato sin conflictos (LR(0) -> SLR(1) -> LALR(1) -> LR(1))')
     b.set_defaults(func=cmd_build)
 
     r = sub.add_parser('parse', help='Parsear un input con la gramática dada')
@@ -68,10 +340,69 @@ def main(argv=None):
     r.add_argument('--tree', action='store_true')
     r.add_argument('--envelope', action='store_true')
     r.add_argument('--justtypes', action='store_true', help='Usar sólo tipos de token')
+    r.add_argument('--format', choices=TREE_FORMATS, default='pretty', help='Formato del árbol (binary escribe sólo el árbol en stdout)')
+    r.add_argument('--optimize', action='store_true', help='Parsear con la gramática optimizada (árbol en términos de la original)')
+    r.add_argument('--passes', type=_pass_list, default=None, metavar='P,Q', help='Pasadas de --optimize (ver build --passes)')
+    r.add_argument('--unit-elim', action='store_true', help='Saltar cadenas de reducciones unitarias (A -> B) en las tablas')
+    r.add_argument('--collapse', action='store_true', help='Colapsar en el árbol los nodos de reducciones unitarias')
+    r.add_argument('--eval', action='store_true', help='Evaluar las acciones semánticas (ACTIONS) sin construir el árbol')
+    r.add_argument('--start', default=None, help='Parsear desde este no terminal en lugar del símbolo inicial')
+    r.add_argument('--method', choices=('auto',) + METHODS, default='lr1', help='Método de construcción de las tablas (ver build --method)')
+    r.add_argument('--sync', help='Terminales de sincronización separados por coma (parseo paralelo por unidades)')
+    r.add_argument('--sub-start', help='No terminal que deriva cada unidad terminada en un terminal de sincronización')
+    r.add_argument('--jobs', type=int, default=None, help='Procesos para el parseo paralelo (por defecto: CPUs)')
+    r.add_argument('--keyword-table', action='store_true',
+                   help='Reconocer el identificador una vez y reclasificar las palabras clave declaradas antes que él con un dict')
+    r.add_argument('--lex-jobs', type=int, default=None, help='Lexear el input en paralelo (mmap por trozos) con N procesos')
+    r.add_argument('--checkpoint', default=None, metavar='FILE', help='Guardar en FILE el estado del parseo cada --checkpoint-every tokens')
+    r.add_argument('--checkpoint-every', type=int, default=100_000, metavar='N', help='Tokens entre checkpoints')
+    r.add_argument('--resume', default=None, metavar='FILE', help='Retomar el parseo desde un checkpoint (mismas tablas y opciones)')
     r.set_defaults(func=cmd_parse)
 
+    c = sub.add_parser('check', help='Buscar conflictos con el análisis más barato (sale con 1 si hay)')
+    c.add_argument('grammar')
+    c.add_argument('--max-conflicts', type=int, default=10, metavar='K', help='Cortar al encontrar K conflictos')
+    c.add_argument('--fast', action='store_true', help='No confirmar con LR(1) los conflictos LALR(1) (pueden ser sólo de LALR)')
+    c.add_argument('--starts', default=None, metavar='A,B', help='Puntos de entrada adicionales (ver build --starts)')
+    c.add_argument('--timeout', type=float, default=None, help='Presupuesto en segundos; al pasarse quedan los conflictos LALR(1)')
+    c.add_argument('--json', action='store_true', help='Resultado como JSON')
+    c.set_defaults(func=cmd_check)
+
+    d = sub.add_parser('difftest', help='Comparar las variantes registradas (builder, tables, lexer, parser) con la referencia')
+    d.add_argument('--cases', type=int, default=100, help='Gramáticas (o textos, en lexer) a generar por capa')
+    d.add_argument('--seed', type=int, default=0)
+    d.add_argument('--layers', default=None, metavar='A,B', help=f"Capas a probar (por omisión todas: {','.join(LAYERS)})")
+    d.add_argument('--engines', default=None, metavar='A,B', help='Variantes a correr, incluidas las opcionales (ver --list)')
+    d.add_argument('--size', type=int, default=5, help='Tamaño máximo de las gramáticas al azar (no terminales)')
+    d.add_argument('--inputs', type=int, default=6, help='Entradas por gramática en la capa parser (la mitad mutadas)')
+    d.add_argument('--no-shrink', action='store_true', help='Reportar la diferencia sin achicar el caso')
+    d.add_argument('--list', action='store_true', help='Listar las variantes registradas')
+    d.add_argument('--json', action='store_true', help='Resultado como JSON')
+    d.set_defaults(func=cmd_difftest)
+
+    k = sub.add_parser('pack', help='Compilar las tablas a un archivo empaquetado (se abre con mmap, lr1.packed)')
+    k.add_argument('grammar')
+    k.add_argument('output')
+    k.add_argument('--starts', default=None, metavar='A,B', help='Puntos de entrada adicionales (ver build --starts)')
+    k.add_argument('--method', choices=('auto',) + METHODS, default='lr1', help='Método de construcción de las tablas (ver build --method)')
+    k.set_defaults(func=cmd_pack)
+
+    s = sub.add_parser('serve', help='Daemon que mantiene tablas compiladas; el CLI lo usa si está corriendo')
+    s.add_argument('--socket', default=None, help='Socket Unix (por defecto $LR1_SOCKET o /tmp/lr1-UID.sock)')
+    s.add_argument('--stop', action='store_true', help='Detener el daemon')
+    s.set_defaults(func=cmd_serve)
+
     args = p.parse_args(argv)
     args.func(args)
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] != 'serve':
+        from .daemon import try_remote
+        code = try_remote(argv)
+        if code is not None:
+            sys.exit(code)
+    run_command(argv)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
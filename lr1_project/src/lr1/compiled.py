@@ -0,0 +1,156 @@
+
+from __future__ import annotations
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+from .grammar import Grammar, Symbol, RHS, Prod, EPS, END
+
+# Gramática congelada: producciones en tuplas y FIRST/FOLLOW (ε en FIRST marca los
+# anulables) calculados una vez en el constructor. Nada se calcula ni se cachea después, así que
+# varios hilos pueden construir, parsear y servir desde la misma instancia sin locks (también
+# en CPython sin GIL). LR1Builder no la modifica: trabaja sobre una copia aumentada.
+# `entries`: no terminales que reciben su propio S' -> E (puntos de entrada del autómata).
+class CompiledGrammar:
+    def __init__(self, G: Grammar, entries: Sequence[Symbol] = ()):
+        productions: List[Prod] = list(G.productions)
+        nonterminals = set(G.nonterminals)
+        aug_starts = dict(G.aug_starts)  # ya aumentada en el lugar por un LR1Builder
+        for E in entries:
+            if E in aug_starts:
+                continue
+            if E not in nonterminals:
+                raise ValueError(f"No terminal desconocido: {E}")
+            aug = E + "'"
+            while aug in nonterminals or aug in G.terminals:
+                aug += "'"
+            productions.insert(len(aug_starts), (aug, (E,)))
+            nonterminals.add(aug)
+            aug_starts[E] = aug
+        by_lhs: Dict[Symbol, List[RHS]] = {}
+        for A, rhs in productions:
+            by_lhs.setdefault(A, []).append(tuple(rhs))
+        terminals = frozenset(G.terminals) | {END}
+
+        s = object.__setattr__
+        s(self, 'start', G.start)
+        s(self, 'aug_starts', MappingProxyType(aug_starts))
+        s(self, 'aug_start', aug_starts.get(G.start))
+        s(self, 'terminals', terminals)
+        s(self, 'nonterminals', frozenset(nonterminals))
+        s(self, 'productions', tuple(productions))
+        s(self, 'by_lhs', MappingProxyType({A: tuple(alts) for A, alts in by_lhs.items()}))
+        s(self, 'prec', MappingProxyType(dict(G.prec)))
+        s(self, 'prod_prec', MappingProxyType(dict(G.prod_prec)))
+        s(self, '_first', MappingProxyType(self._compute_first()))
+        s(self, '_follow', MappingProxyType(self._compute_follow()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CompiledGrammar es inmutable (no se puede asignar {name})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"CompiledGrammar es inmutable (no se puede borrar {name})")
+
+    def _compute_first(self) -> Dict[Symbol, FrozenSet[Symbol]]:
+        firsts: Dict[Symbol, Set[Symbol]] = {A: set() for A in self.nonterminals}
+        changed = True
+        while changed:
+            changed = False
+            for A, rhs in self.productions:
+                before = len(firsts[A])
+                for Y in rhs:
+                    if Y == EPS:
+                        firsts[A].add(EPS)
+                        break
+                    Fy = firsts[Y] if Y in firsts else {Y}
+                    firsts[A] |= Fy - {EPS}
+                    if EPS not in Fy:
+                        break
+                else:
+                    firsts[A].add(EPS)
+                if len(firsts[A]) != before:
+                    changed = True
+        out: Dict[Symbol, FrozenSet[Symbol]] = {t: frozenset((t,)) for t in self.terminals}
+        out.update({A: frozenset(f) for A, f in firsts.items()})
+        return out
+
+    def _compute_follow(self) -> Dict[Symbol, FrozenSet[Symbol]]:
+        follow: Dict[Symbol, Set[Symbol]] = {A: set() for A in self.nonterminals}
+        follow[self.start].add(END)
+        for E, aug in self.aug_starts.items():
+            follow[E].add(END)
+            follow[aug].add(END)
+        changed = True
+        while changed:
+            changed = False
+            for A, rhs in self.productions:
+                for i, B in enumerate(rhs):
+                    if B not in self.nonterminals:
+                        continue
+                    first_beta = self.first_of_sequence(rhs[i + 1:])
+                    before = len(follow[B])
+                    follow[B] |= first_beta - {EPS}
+                    if EPS in first_beta:
+                        follow[B] |= follow[A]
+                    if len(follow[B]) != before:
+                        changed = True
+        return {A: frozenset(f) for A, f in follow.items()}
+
+    # Misma interfaz que Grammar (FIRST/FOLLOW con ε como símbolo), pero sin estado mutable
+    def first(self, X: Symbol) -> FrozenSet[Symbol]:
+        if X == EPS:
+            return frozenset((EPS,))
+        return self._first.get(X, frozenset())
+
+    def first_of_sequence(self, seq: Iterable[Symbol]) -> FrozenSet[Symbol]:
+        out: Set[Symbol] = set()
+        for sym in seq:
+            f = self.first(sym)
+            out |= f - {EPS}
+            if EPS not in f:
+                return frozenset(out)
+        out.add(EPS)
+        return frozenset(out)
+
+    def follow(self, A: Symbol) -> FrozenSet[Symbol]:
+        return self._follow.get(A, frozenset())
+
+    # Copia mutable, como Grammar.follow_sets
+    def follow_sets(self) -> Dict[Symbol, Set[Symbol]]:
+        return {A: set(f) for A, f in self._follow.items()}
+
+    def production_precedence(self, prod: Prod) -> Optional[Tuple[int, str]]:
+        sym = self.prod_prec.get(prod)
+        if sym is not None:
+            return self.prec.get(sym)
+        for s in reversed(prod[1]):
+            if s in self.terminals and s in self.prec:
+                return self.prec[s]
+        return None
+
+    # Gramática con S' -> S agregada para cada punto de entrada (por omisión sólo el símbolo
+    # inicial). Devuelve una nueva instancia si falta alguno; ésta no cambia.
+    def augment(self, starts: Optional[Iterable[Symbol]] = None) -> 'CompiledGrammar':
+        starts = list(starts) if starts else [self.start]
+        if all(E in self.aug_starts for E in starts):
+            return self
+        return CompiledGrammar(self.to_grammar(), list(self.aug_starts) + starts)
+
+    # Grammar mutable equivalente (sin las producciones aumentadas)
+    def to_grammar(self) -> Grammar:
+        augs = set(self.aug_starts.values())
+        H = Grammar(self.start, self.terminals - {END}, self.nonterminals - augs)
+        for A, rhs in self.productions:
+            if A not in augs:
+                H.add(A, rhs)
+        H.prec = dict(self.prec)
+        H.prod_prec = dict(self.prod_prec)
+        return H
+
+    # Como Grammar.copy: una copia mutable (p. ej. para cambiar el símbolo inicial)
+    def copy(self) -> Grammar:
+        return self.to_grammar()
+
+    def __reduce__(self):
+        return (_rebuild, (self.to_grammar(), tuple(self.aug_starts)))
+
+def _rebuild(G: Grammar, entries: Tuple[Symbol, ...]) -> CompiledGrammar:
+    return CompiledGrammar(G, entries)
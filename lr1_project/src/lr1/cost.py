@@ -0,0 +1,161 @@
+
+from __future__ import annotations
+import math
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+from .grammar import Grammar, Symbol, RHS, EPS
+
+# ---------------------------------------------------------------------------
+# Estimación previa: la colección LR(0) (núcleos sin lookahead) es mucho más barata que la
+# LR(1) y acota su forma; FOLLOW(A) acota los lookaheads que puede llevar cada ítem A -> α·β.
+
+Core = Tuple[Symbol, RHS, int]
+
+@dataclass
+class CostEstimate:
+    lr0_states: int
+    lr0_items: int
+    lookaheads: float  # media de |FOLLOW(A)| por ítem LR(0): cuánto se multiplica cada núcleo
+    items_bound: int  # Σ |FOLLOW(A)|: ítems LR(1) si cada núcleo apareciera una sola vez (LALR)
+    states_estimate: int  # heurística: núcleos LR(0) × √lookaheads (cada núcleo se parte por contexto)
+    truncated: bool  # se cortó al llegar a max_cores (los números son cotas inferiores)
+    elapsed: float
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+def _left_corners(G: Grammar, prods: Dict[Symbol, List[RHS]]) -> Dict[Symbol, FrozenSet[Symbol]]:
+    # B -> no terminales C tales que B =>* C ... por el extremo izquierdo (incluye a B)
+    direct = {A: {rhs[0] for rhs in alts if rhs and rhs[0] in G.nonterminals} for A, alts in prods.items()}
+    out: Dict[Symbol, FrozenSet[Symbol]] = {}
+    for A in prods:
+        seen = {A}
+        work = [A]
+        while work:
+            for C in direct.get(work.pop(), ()):
+                if C not in seen:
+                    seen.add(C)
+                    work.append(C)
+        out[A] = frozenset(seen)
+    return out
+
+# No modifica G (a diferencia de LR1Builder, que agrega el símbolo inicial aumentado)
+def estimate_cost(G: Grammar, max_cores: int = 20000) -> CostEstimate:
+    t0 = time.monotonic()
+    prods = {A: [tuple() if rhs == (EPS,) else tuple(rhs) for rhs in G.by_lhs.get(A, [])] for A in G.nonterminals}
+    left = _left_corners(G, prods)
+    follow = G.follow_sets()
+    nt = G.nonterminals
+
+    def closure(kernel: FrozenSet[Core]) -> Set[Core]:
+        I = set(kernel)
+        for A, rhs, dot in kernel:
+            if dot < len(rhs) and rhs[dot] in nt:
+                for C in left[rhs[dot]]:
+                    for gamma in prods[C]:
+                        I.add((C, gamma, 0))
+        return I
+
+    # El ítem inicial S' -> ·S se representa con lhs None (lookahead sólo $)
+    k0: FrozenSet[Core] = frozenset({(None, (G.start,), 0)})  # type: ignore
+    seen = {k0}
+    q = deque([k0])
+    n_items = 0
+    la_total = 0
+    truncated = False
+    while q:
+        I = closure(q.popleft())
+        n_items += len(I)
+        la_total += sum(1 if A is None else len(follow.get(A, ())) for A, _, _ in I)
+        by_sym: Dict[Symbol, Set[Core]] = {}
+        for A, rhs, dot in I:
+            if dot < len(rhs):
+                by_sym.setdefault(rhs[dot], set()).add((A, rhs, dot + 1))
+        for K in by_sym.values():
+            K = frozenset(K)
+            if K not in seen:
+                if len(seen) >= max_cores:
+                    truncated = True
+                    continue
+                seen.add(K)
+                q.append(K)
+    lookaheads = la_total / n_items if n_items else 0.0
+    split = math.sqrt(lookaheads) if lookaheads > 1 else 1.0
+    return CostEstimate(
+        lr0_states=len(seen), lr0_items=n_items, lookaheads=round(lookaheads, 2),
+        items_bound=la_total, states_estimate=int(len(seen) * split),
+        truncated=truncated, elapsed=round(time.monotonic() - t0, 4),
+    )
+
+# ---------------------------------------------------------------------------
+# Presupuesto de LR1Builder: se controla al crear cada estado; al pasarse de cualquier
+# límite la construcción se corta con BudgetExceeded y las estadísticas parciales.
+
+@dataclass
+class Budget:
+    max_states: Optional[int] = None
+    max_items: Optional[int] = None  # suma de ítems LR(1) de todos los estados
+    deadline: Optional[float] = None  # segundos de reloj desde que empieza la construcción
+    max_memory: Optional[int] = None  # bytes de RSS por encima del inicio (/proc, sólo Linux)
+    check_every: int = 64  # cada cuántos estados se mira la memoria
+
+class BudgetExceeded(RuntimeError):
+    def __init__(self, reason: str, stats: Dict):
+        super().__init__(f"Presupuesto de construcción excedido ({reason}): "
+                         f"{stats['states']} estados, {stats['items']} ítems en {stats['elapsed']:.2f}s")
+        self.reason = reason
+        self.stats = stats
+
+    def __reduce__(self):
+        return (BudgetExceeded, (self.reason, self.stats))
+
+def _rss() -> Optional[int]:
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+@dataclass
+class BuildMeter:
+    # Contadores de la construcción (LR1Builder.stats); con presupuesto, además lo hace cumplir
+    budget: Optional[Budget] = None
+    states: int = 0
+    items: int = 0
+    transitions: int = 0
+    pending: int = 0
+    t0: float = field(default_factory=time.monotonic)
+    rss0: Optional[int] = None
+
+    def __post_init__(self):
+        if self.budget is not None and self.budget.max_memory is not None:
+            self.rss0 = _rss()
+
+    def stats(self) -> Dict:
+        out = {'states': self.states, 'items': self.items, 'transitions': self.transitions,
+               'pending': self.pending, 'elapsed': round(time.monotonic() - self.t0, 4)}
+        if self.rss0 is not None:
+            rss = _rss()
+            out['memory'] = None if rss is None else rss - self.rss0
+        return out
+
+    def add_state(self, n_items: int, pending: int):
+        self.states += 1
+        self.items += n_items
+        self.pending = pending
+        b = self.budget
+        if b is None:
+            return
+        if b.max_states is not None and self.states > b.max_states:
+            raise BudgetExceeded('max_states', self.stats())
+        if b.max_items is not None and self.items > b.max_items:
+            raise BudgetExceeded('max_items', self.stats())
+        if b.deadline is not None and time.monotonic() - self.t0 > b.deadline:
+            raise BudgetExceeded('deadline', self.stats())
+        if b.max_memory is not None and self.rss0 is not None and not self.states % b.check_every:
+            rss = _rss()
+            if rss is not None and rss - self.rss0 > b.max_memory:
+                raise BudgetExceeded('max_memory', self.stats())
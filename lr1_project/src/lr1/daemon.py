@@ -0,0 +1,186 @@
+
+from __future__ import annotations
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from typing import List, Optional, Tuple
+
+# Protocolo (una conexión por comando): el cliente envía una línea JSON
+# {"argv": [...], "cwd": "..."} (o {"cmd": "stop"}); el daemon responde una línea JSON
+# {"code": n, "stdout": bytes, "stderr": bytes} seguida de los bytes de stdout y stderr.
+
+# Segundos que el cliente espera para conectar y enviar el pedido; si no llega, corre el
+# comando localmente. La respuesta se espera sin límite (LR1_DAEMON_TIMEOUT pone uno, y al
+# vencer es un error: el daemon ya está corriendo el comando y no se repite acá).
+CONNECT_TIMEOUT = 1.0
+
+class DaemonError(RuntimeError):
+    # El pedido ya se envió pero la respuesta no llegó (completa o a tiempo)
+    pass
+
+def default_socket() -> str:
+    env = os.environ.get('LR1_SOCKET')
+    if env:
+        return env
+    base = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(base, f"lr1-{os.getuid()}.sock")
+
+def _read_line(sock: socket.socket) -> bytes:
+    buf = bytearray()
+    while not buf.endswith(b"\n"):
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Un cliente que conecta y no envía nada libera su hilo al vencer el timeout
+    timeout = 30.0
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line.strip():
+            return  # conexión de prueba (ping)
+        req = json.loads(line)
+        if req.get('cmd') == 'stop':
+            self._reply(0, b'', b'')
+            self.server.shutdown()  # corre en el hilo del handler, no en el de serve_forever
+            return
+        code, out, err = run_captured(req.get('argv', []), req.get('cwd'))
+        self._reply(code, out, err)
+
+    def _reply(self, code: int, out: bytes, err: bytes):
+        head = json.dumps({'code': code, 'stdout': len(out), 'stderr': len(err)})
+        self.wfile.write(head.encode('utf-8') + b"\n" + out + err)
+
+# sys.stdout, el cwd y la cache de tablas son del proceso: los comandos corren de a uno
+_run_lock = threading.Lock()
+
+# Corre un comando del CLI en este proceso capturando stdout/stderr y el código de salida.
+def run_captured(argv: List[str], cwd: Optional[str] = None) -> Tuple[int, bytes, bytes]:
+    with _run_lock:
+        return _run_captured(argv, cwd)
+
+def _run_captured(argv: List[str], cwd: Optional[str]) -> Tuple[int, bytes, bytes]:
+    from .cli import run_command
+    out_b, err_b = io.BytesIO(), io.BytesIO()
+    out = io.TextIOWrapper(out_b, encoding='utf-8', write_through=True)
+    err = io.TextIOWrapper(err_b, encoding='utf-8', write_through=True)
+    prev = os.getcwd()
+    code = 0
+    try:
+        if cwd:
+            os.chdir(cwd)
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                run_command(argv)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if not isinstance(e.code, (int, type(None))):
+                    print(e.code, file=sys.stderr)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(prev)
+    out.flush()
+    err.flush()
+    return code, out_b.getvalue(), err_b.getvalue()
+
+# Un hilo por conexión: un cliente lento o colgado no bloquea el accept ni los pings; la
+# ejecución de los comandos se serializa en run_captured.
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(path: Optional[str] = None):
+    from . import cli
+    path = path or default_socket()
+    if os.path.exists(path):
+        if ping(path):
+            raise RuntimeError(f"Ya hay un daemon escuchando en {path}")
+        os.remove(path)
+    cli.enable_table_cache()
+    # El socket se crea ya con permisos 0600 (sin ventana entre bind y chmod)
+    umask = os.umask(0o177)
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(umask)
+    with server:
+        print(f"lr1 daemon escuchando en {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+# OSError: no se pudo conectar o enviar (el daemon no recibió el comando); DaemonError: se
+# envió y la respuesta no llegó en `timeout` segundos (None: sin límite) o llegó cortada
+def _request(path: str, payload: dict, timeout: Optional[float] = None) -> Tuple[int, bytes, bytes]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(CONNECT_TIMEOUT)
+        s.connect(path)
+        s.sendall(json.dumps(payload).encode('utf-8') + b"\n")
+        s.settimeout(timeout)
+        try:
+            return _read_reply(s)
+        except socket.timeout:
+            raise DaemonError(f"el daemon no respondió en {timeout:g}s") from None
+        except (OSError, ValueError) as e:
+            raise DaemonError(f"respuesta del daemon inválida: {e}") from None
+
+def _read_reply(s: socket.socket) -> Tuple[int, bytes, bytes]:
+    line = _read_line(s)
+    if not line.endswith(b"\n"):
+        raise ConnectionError('el daemon cerró la conexión sin responder')
+    nl = line.index(b"\n")
+    head = json.loads(line[:nl])
+    body = bytearray(line[nl + 1:])
+    need = head['stdout'] + head['stderr']
+    while len(body) < need:
+        chunk = s.recv(65536)
+        if not chunk:
+            raise ConnectionError('respuesta incompleta')
+        body += chunk
+    return head['code'], bytes(body[:head['stdout']]), bytes(body[head['stdout']:need])
+
+def ping(path: Optional[str] = None) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.settimeout(1.0)
+            s.connect(path or default_socket())
+        return True
+    except OSError:
+        return False
+
+def stop(path: Optional[str] = None):
+    _request(path or default_socket(), {'cmd': 'stop'}, timeout=5.0)
+
+# Ejecuta argv en el daemon si hay uno escuchando; None si no se le pudo entregar (el
+# llamador lo corre local). Si ya se entregó, nunca se corre local: un comando que escribe
+# archivos (pack, --checkpoint) quedaría corriendo dos veces sobre los mismos.
+def try_remote(argv: List[str]) -> Optional[int]:
+    path = default_socket()
+    if os.environ.get('LR1_NO_DAEMON') or not os.path.exists(path):
+        return None
+    limit = os.environ.get('LR1_DAEMON_TIMEOUT')
+    try:
+        code, out, err = _request(path, {'argv': argv, 'cwd': os.getcwd()}, timeout=float(limit) if limit else None)
+    except DaemonError as e:
+        print(f"ERROR: {e}; el comando pudo haberse ejecutado en el daemon (LR1_NO_DAEMON=1 lo corre sin él)",
+              file=sys.stderr)
+        return 1
+    except OSError:
+        return None
+    sys.stdout.flush()
+    sys.stdout.buffer.write(out)
+    sys.stdout.buffer.flush()
+    sys.stderr.buffer.write(err)
+    sys.stderr.buffer.flush()
+    return code
@@ -0,0 +1,813 @@
+
+from __future__ import annotations
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field, replace
+from random import Random
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from .grammar import Grammar, Symbol, Prod, EPS
+from .compiled import CompiledGrammar
+from .builder import LR1Builder
+from .tables import Tables
+from .parser import Parser, ParseError, ParserCheckpoint
+from .lexer import Lexer
+from .store import StateStore
+from .packed import PackedTables, pack_tables
+from .incremental import IncrementalLexer, IncrementalParser
+from .actions import SemanticActions
+from .methods import build_tables
+from .parallel import ParallelParser, tokenize_file
+from .ast import Node
+
+# Pruebas diferenciales: cada capa (builder, tables, lexer, parser) tiene una implementación
+# de referencia (la de hoy) y variantes registradas que tienen que dar exactamente lo mismo.
+# Se generan gramáticas (al azar y casos límite: ε, recursión, cadenas unitarias, conflictos,
+# varios puntos de entrada, nombres que chocan con S'), entradas válidas y mutadas, se corren
+# todas las variantes y se comparan formas canónicas; cada diferencia se achica a un caso mínimo.
+#
+# Una variante nueva (un builder, codificación de tablas, lexer o bucle de parseo más rápido)
+# se agrega con register_engine y queda cubierta por `lr1 difftest`:
+#   builder: make(G, starts) -> (states, trans, entries)      (G es una copia propia)
+#   tables:  make(G, starts) -> objeto con ACTION, GOTO y entries
+#   lexer:   make(rules) -> tokenize(text) -> [(terminal, lexema)]
+#   parser:  make(G, starts) -> parse(tokens, start) -> Node   (lanza ParseError)
+# Las que devuelven algo con close() (p. ej. PackedTables) se cierran después de comparar.
+# `errors` dice cuánto de un error tiene que coincidir: 'exact' (tipo, posición, token y
+# esperados), 'position' (posición y token: LALR/SLR detectan el error en el mismo token
+# pero tras otras reducciones, con otros esperados) o 'any' (sólo que falle).
+
+LAYERS = ('builder', 'tables', 'lexer', 'parser')
+REFERENCE = 'reference'
+
+@dataclass
+class Engine:
+    layer: str
+    name: str
+    make: Callable
+    default: bool = True  # se corre sin nombrarla en engines=
+    note: str = ''
+    errors: str = 'exact'
+
+ENGINES: Dict[str, Dict[str, Engine]] = {layer: {} for layer in LAYERS}
+ERROR_MODES = ('exact', 'position', 'any')
+
+def register_engine(layer: str, name: str, default: bool = True, note: str = '', errors: str = 'exact'):
+    if layer not in ENGINES:
+        raise ValueError(f"Capa desconocida: {layer} (opciones: {', '.join(LAYERS)})")
+    if errors not in ERROR_MODES:
+        raise ValueError(f"Modo de errores desconocido: {errors} (opciones: {', '.join(ERROR_MODES)})")
+    def deco(make: Callable) -> Callable:
+        ENGINES[layer][name] = Engine(layer, name, make, default, note, errors)
+        return make
+    return deco
+
+class Unsupported(Exception):
+    # La variante no cubre este caso (p. ej. otro punto de entrada): no se compara
+    pass
+
+# ---------------------------------------------------------------------------
+# Variantes registradas
+
+def _lr1(G: Grammar | CompiledGrammar, starts: Sequence[Symbol], store: Optional[StateStore] = None):
+    b = LR1Builder(G, starts=starts)
+    states, trans = b.build_canonical_collection(store)
+    return b, states, trans
+
+@register_engine('builder', REFERENCE)
+def _builder_reference(G, starts):
+    b, states, trans = _lr1(G, starts)
+    return states, trans, b.entries
+
+@register_engine('builder', 'compiled', note='LR1Builder sobre CompiledGrammar')
+def _builder_compiled(G, starts):
+    b, states, trans = _lr1(CompiledGrammar(G), starts)
+    return states, trans, b.entries
+
+@register_engine('builder', 'store', note='colección canónica en SQLite (StateStore)')
+def _builder_store(G, starts):
+    with StateStore(memory_items=64) as store:
+        b, states, trans = _lr1(G, starts, store)
+        return [states[i] for i in range(len(states))], dict(trans.items()), b.entries
+
+def _tables(G, starts) -> Tables:
+    b, states, trans = _lr1(G, starts)
+    return Tables(b.G, states, trans, b.aug_start, b.entries)
+
+@register_engine('tables', REFERENCE)
+def _tables_reference(G, starts):
+    return _tables(G, starts)
+
+@register_engine('tables', 'compiled', note='Tables sobre CompiledGrammar')
+def _tables_compiled(G, starts):
+    return _tables(CompiledGrammar(G), starts)
+
+def _packed(T: Tables) -> PackedTables:
+    fd, path = tempfile.mkstemp(prefix='lr1-diff-', suffix='.packed')
+    os.close(fd)
+    try:
+        pack_tables(T, path)
+        return PackedTables(path)
+    finally:
+        os.remove(path)  # el mmap sigue abierto
+
+@register_engine('tables', 'packed', note='pack_tables + PackedTables (mmap)')
+def _tables_packed(G, starts):
+    return _packed(_tables(G, starts))
+
+@register_engine('lexer', REFERENCE)
+def _lexer_reference(rules):
+    return Lexer(list(rules)).tokenize
+
+@register_engine('lexer', 'scan', note='Lexer.scan (offsets, tokens omitidos)')
+def _lexer_scan(rules):
+    L = Lexer(list(rules))
+    return lambda text: [(t, lx) for t, lx, _, _ in L.scan(text) if t is not None]
+
+@register_engine('lexer', 'incremental', note='IncrementalLexer: texto sin el tercio del medio + edit que lo inserta')
+def _lexer_incremental(rules):
+    L = Lexer(list(rules))
+    def tokenize(text: str):
+        a, b = len(text) // 3, 2 * len(text) // 3
+        inc = IncrementalLexer(L, text[:a] + text[b:])
+        inc.edit(a, a, text[a:b])
+        return list(inc.tokens)
+    return tokenize
+
+_BYTE_RE = re.compile(r"byte (\d+)")
+
+@register_engine('lexer', 'parallel', note='tokenize_file: archivo temporal, 2 procesos, trozos de 8 bytes')
+def _lexer_parallel(rules):
+    L = Lexer(list(rules))
+    def tokenize(text: str):
+        data = text.encode('utf-8')
+        fd, path = tempfile.mkstemp(prefix='lr1-diff-', suffix='.txt')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            try:
+                return tokenize_file(L, path, workers=2, chunk_size=8)
+            except SyntaxError as e:
+                # tokenize_file informa bytes; la referencia, caracteres
+                m = _BYTE_RE.search(str(e))
+                if m is None:
+                    raise
+                pos = len(data[:int(m.group(1))].decode('utf-8'))
+                raise SyntaxError(f"Lexer: input no reconocido desde pos {pos}") from None
+        finally:
+            os.remove(path)
+    return tokenize
+
+# No es equivalente por diseño (ver Lexer): sirve para ver en qué entradas cambia
+@register_engine('lexer', 'keyword_table', default=False, note='Lexer(keyword_table=True); difiere en los casos documentados')
+def _lexer_keyword_table(rules):
+    return Lexer(list(rules), keyword_table=True).tokenize
+
+@register_engine('parser', REFERENCE)
+def _parser_reference(G, starts):
+    return Parser(_tables(G, starts)).parse
+
+@register_engine('parser', 'packed', note='Parser sobre PackedTables')
+def _parser_packed(G, starts):
+    T = _packed(_tables(G, starts))
+    P = Parser(T)
+    def parse(tokens, start):
+        return P.parse(tokens, start)
+    parse.close = T.close  # type: ignore[attr-defined]
+    return parse
+
+@register_engine('parser', 'unit_goto', note='Tables.eliminate_unit_reductions (salta cadenas A -> B)')
+def _parser_unit_goto(G, starts):
+    T = _tables(G, starts)
+    T.eliminate_unit_reductions()
+    return Parser(T).parse
+
+class _Stop(Exception):
+    pass
+
+@register_engine('parser', 'resume', note='Parser.stream: checkpoint a mitad de la entrada, to_bytes y retomar en otro Parser')
+def _parser_resume(G, starts):
+    T = _tables(G, starts)
+    def parse(tokens, start):
+        taken: List[ParserCheckpoint] = []
+        def keep(cp: ParserCheckpoint):
+            taken.append(cp)
+            raise _Stop()
+        try:
+            return Parser(T).stream(tokens, start, checkpoint_every=max(1, len(tokens) // 2), on_checkpoint=keep)
+        except _Stop:
+            pass
+        cp = ParserCheckpoint.from_bytes(taken[0].to_bytes())
+        return Parser(T).stream(tokens[cp.pos:], resume=cp)
+    return parse
+
+# Tablas de methods.build_tables: sólo gramáticas sin conflictos con ese método. El árbol es
+# el mismo; el error cae en el mismo token, pero los esperados dependen del estado.
+def _method_parser(method: str):
+    def make(G, starts):
+        T = build_tables(G, method, starts=list(starts)).tables
+        if T.conflicts:
+            raise Unsupported()
+        return Parser(T).parse
+    return make
+
+for _m, _name in (('slr', 'SLR(1)'), ('lalr', 'LALR(1)'), ('auto', 'el método más barato sin conflictos')):
+    register_engine('parser', _m, note=f"Parser sobre build_tables(method='{_m}'): {_name}", errors='position')(_method_parser(_m))
+
+# Acciones que arman el mismo árbol que Parser.parse; las de ε se registran con el EPS de
+# Grammar (SemanticActions lo normaliza a la forma que reducen las tablas)
+def _tree_actions(G: Grammar) -> SemanticActions:
+    acts = SemanticActions()
+    nts = set(G.nonterminals)
+    for A, rhs in G.productions:
+        syms = tuple(X for X in rhs if X != EPS)
+        acts.register(A, rhs, lambda *vals, A=A, syms=syms: Node(A, [
+            v if X in nts else Node(X, [], v) for X, v in zip(syms, vals)]))
+    return acts
+
+@register_engine('parser', 'evaluate', note='Parser.evaluate con acciones semánticas que arman el árbol')
+def _parser_evaluate(G, starts):
+    actions = _tree_actions(G)
+    P = Parser(_tables(G, starts), actions=actions)
+    return P.evaluate
+
+# Punto de corte para ParallelParser: el primer no terminal (el inicial al final) con
+# alternativas que terminan en un terminal; esos terminales son los de sincronización
+def _sync_point(G: Grammar) -> Optional[Tuple[Symbol, set]]:
+    for A in sorted(G.nonterminals - {G.start}) + [G.start]:
+        last = {rhs[-1] for rhs in G.by_lhs[A] if rhs and rhs[-1] in G.terminals}
+        if last:
+            return A, last
+    return None
+
+# Los errores se informan por unidad (ParseErrors), no en la posición del parseo secuencial
+@register_engine('parser', 'parallel', note='ParallelParser (2 procesos) cortando en los terminales finales de un no terminal',
+                 errors='any')
+def _parser_parallel(G, starts):
+    cut = _sync_point(G)
+    if cut is None:
+        raise Unsupported()
+    P = ParallelParser(G, cut[1], cut[0], workers=2)
+    def parse(tokens, start):
+        if start not in (None, G.start):
+            raise Unsupported()
+        return P.parse(tokens)
+    parse.close = P.close  # type: ignore[attr-defined]
+    return parse
+
+def _incremental(G, starts, edit: bool):
+    T = _tables(G, starts)
+    def parse(tokens, start):
+        if start is not None and T.entries.get(start) != 0:
+            raise Unsupported()
+        P = IncrementalParser(T)
+        if not edit or not tokens:
+            return P.parse(list(tokens))
+        # Parseo previo sin el token del medio y reparseo insertándolo
+        k = len(tokens) // 2
+        try:
+            P.parse(list(tokens[:k]) + list(tokens[k + 1:]))
+        except ParseError:
+            pass
+        return P.reparse(list(tokens), k, k, k + 1)
+    return parse
+
+@register_engine('parser', 'incremental', note='IncrementalParser.parse')
+def _parser_incremental(G, starts):
+    return _incremental(G, starts, edit=False)
+
+@register_engine('parser', 'reparse', note='IncrementalParser.reparse tras insertar un token')
+def _parser_reparse(G, starts):
+    return _incremental(G, starts, edit=True)
+
+# ---------------------------------------------------------------------------
+# Formas canónicas: números de estado reasignados en BFS desde los puntos de entrada (por
+# símbolo, en orden), así dos variantes que numeran distinto se comparan igual.
+
+def _relabel(entries: Dict[Symbol, int], edges: Dict[int, Dict[Symbol, int]]) -> Dict[int, int]:
+    order: Dict[int, int] = {}
+    queue = [s for _, s in sorted(entries.items(), key=lambda kv: kv[1])]
+    for s in queue:
+        if s in order:
+            continue
+        order[s] = len(order)
+        out = edges.get(s, {})
+        queue.extend(out[X] for X in sorted(out))
+    return order
+
+def canonical_automaton(states, trans, entries) -> Tuple:
+    edges: Dict[int, Dict[Symbol, int]] = {}
+    for (i, X), j in trans.items():
+        edges.setdefault(i, {})[X] = j
+    new = _relabel(entries, edges)
+    rest = [i for i in range(len(states)) if i not in new]  # inalcanzables (no debería haber)
+    for i in rest:
+        new[i] = len(new)
+    by_new = sorted(new, key=new.get)
+    return (
+        tuple(sorted((E, new[s]) for E, s in entries.items())),
+        tuple(tuple(sorted((it.lhs, it.rhs, it.dot, it.la) for it in states[i])) for i in by_new),
+        tuple(sorted((new[i], X, new[j]) for (i, X), j in trans.items())),
+    )
+
+def canonical_tables(T) -> Tuple:
+    action = list(T.ACTION.items())
+    goto = list(T.GOTO.items())
+    edges: Dict[int, Dict[Symbol, int]] = {}
+    for (s, a), act in action:
+        if act.kind == 'shift':
+            edges.setdefault(s, {})[a] = int(act.value)
+    for (s, A), j in goto:
+        edges.setdefault(s, {})[A] = j
+    new = _relabel(T.entries, edges)
+
+    def relabel(s: int):
+        return new.get(s, ('?', s))  # estado inalcanzable: se marca
+
+    def cell(act) -> Tuple:
+        if act.kind == 'shift':
+            return ('shift', relabel(int(act.value)))
+        if act.kind == 'reduce':
+            lhs, rhs = act.value
+            return ('reduce', lhs, tuple(rhs))
+        return (act.kind,)
+
+    return (
+        tuple(sorted((E, relabel(s)) for E, s in T.entries.items())),
+        tuple(sorted(((relabel(s), a) + cell(act) for (s, a), act in action), key=repr)),
+        tuple(sorted(((relabel(s), A, relabel(j)) for (s, A), j in goto), key=repr)),
+    )
+
+def canonical_tree(node: Optional[Node]) -> Any:
+    if node is None:
+        return None
+    return (node.sym, node.lexeme, tuple(canonical_tree(ch) for ch in node.children))
+
+_POS_RE = re.compile(r"pos (\d+)")
+
+# ('ok', forma canónica) o ('error', tipo, detalle): los errores también tienen que coincidir
+def _outcome(fn: Callable[[], Any], canon: Callable[[Any], Any]) -> Tuple:
+    try:
+        value = fn()
+    except Unsupported:
+        raise
+    except ParseError as e:
+        return ('error', 'ParseError', e.pos, e.token, tuple(sorted(e.expected)))
+    except SyntaxError as e:
+        m = _POS_RE.search(str(e))
+        return ('error', 'SyntaxError', int(m.group(1)) if m else None)
+    except Exception as e:  # una variante que revienta también es una diferencia
+        return ('error', type(e).__name__, str(e))
+    try:
+        return ('ok', canon(value))
+    finally:
+        _close(value)
+
+def _same(engine: Engine, expected: Tuple, got: Tuple) -> bool:
+    if got == expected:
+        return True
+    if engine.errors == 'exact' or expected[0] != 'error' or got[0] != 'error':
+        return False
+    return engine.errors == 'any' or expected[1:4] == got[1:4]
+
+def _close(obj):
+    close = getattr(obj, 'close', None)
+    if callable(close):
+        close()
+
+# ---------------------------------------------------------------------------
+# Casos
+
+@dataclass
+class Case:
+    layer: str
+    prods: Tuple[Prod, ...] = ()  # con EPS para las producciones vacías, como Grammar
+    start: Symbol = ''
+    starts: Tuple[Symbol, ...] = ()  # puntos de entrada (el primero es `start`)
+    precedence: Tuple[Tuple[str, Tuple[Symbol, ...]], ...] = ()
+    tokens: Tuple[Symbol, ...] = ()  # parser (lexema = terminal)
+    entry: Optional[Symbol] = None  # parser: punto de entrada a usar
+    rules: Tuple[Tuple[str, str, bool], ...] = ()  # lexer
+    text: str = ''  # lexer
+
+    def grammar(self) -> Grammar:
+        nts = {A for A, _ in self.prods}
+        terms = {X for _, rhs in self.prods for X in rhs if X not in nts and X != EPS}
+        G = Grammar(self.start, terms, nts)
+        for A, rhs in self.prods:
+            G.add(A, () if rhs == (EPS,) else rhs)
+        G.set_precedence((assoc, syms) for assoc, syms in self.precedence)
+        return G
+
+    # En el formato de los archivos de gramática (para reproducir con lr1 build / parse)
+    def describe(self) -> str:
+        if self.layer == 'lexer':
+            lines = ["LEXER:"] + [f"  {t}: /{rx}/{' skip' if skip else ''}" for t, rx, skip in self.rules]
+            lines.append(f"texto: {self.text!r}")
+            return "\n".join(lines)
+        nts = []
+        for A, _ in self.prods:
+            if A not in nts:
+                nts.append(A)
+        terms = sorted({X for _, rhs in self.prods for X in rhs if X not in nts and X != EPS})
+        lines = [f"START: {self.start}", f"NONTERMINALS: {' '.join(nts)}", f"TERMINALS: {' '.join(terms)}"]
+        lines += [f"%{assoc} {' '.join(syms)}" for assoc, syms in self.precedence]
+        lines.append("PRODUCTIONS:")
+        for A in nts:
+            alts = [' '.join(rhs) for B, rhs in self.prods if B == A]
+            lines.append(f"  {A} -> {' | '.join(alts)}")
+        if len(self.starts) > 1:
+            lines.append(f"# puntos de entrada: {', '.join(self.starts)}")
+        if self.layer == 'parser':
+            lines.append(f"# entrada{f' (desde {self.entry})' if self.entry else ''}: {' '.join(self.tokens) or '(vacía)'}")
+        return "\n".join(lines)
+
+# Salida de la referencia o de una variante para el caso
+def run_engine(case: Case, engine: Engine) -> Tuple:
+    layer = case.layer
+    if layer == 'builder':
+        return _outcome(lambda: engine.make(case.grammar(), case.starts), lambda r: canonical_automaton(*r))
+    if layer == 'tables':
+        return _outcome(lambda: engine.make(case.grammar(), case.starts), canonical_tables)
+    if layer == 'lexer':
+        return _outcome(lambda: engine.make(case.rules)(case.text), lambda toks: tuple(map(tuple, toks)))
+    parse = None
+    try:
+        parse = engine.make(case.grammar(), case.starts)
+        tokens = [(t, t) for t in case.tokens]
+        return _outcome(lambda: parse(tokens, case.entry), canonical_tree)
+    finally:
+        if parse is not None:
+            _close(parse)
+
+@dataclass
+class Mismatch:
+    layer: str
+    engine: str
+    case: Case
+    expected: Tuple
+    got: Tuple
+    original: Optional[Case] = None  # el caso antes de achicarlo
+
+    def __str__(self) -> str:
+        return (f"[{self.layer}] {self.engine} difiere de la referencia\n"
+                f"{self.case.describe()}\n  referencia: {_short(self.expected)}\n  {self.engine}: {_short(self.got)}")
+
+def _short(x: Any, n: int = 400) -> str:
+    s = repr(x)
+    return s if len(s) <= n else s[:n] + '...'
+
+def mismatch(case: Case, engine: Engine) -> Optional[Tuple[Tuple, Tuple]]:
+    try:
+        got = run_engine(case, engine)
+        expected = run_engine(case, ENGINES[case.layer][REFERENCE])
+    except Unsupported:
+        return None
+    return None if _same(engine, expected, got) else (expected, got)
+
+# ---------------------------------------------------------------------------
+# Achicado: se aplican reducciones mientras la diferencia se mantenga (voraz, hasta que
+# ninguna sirve o se acaban los intentos)
+
+def _without(seq: Tuple, k: int, n: int = 1) -> Tuple:
+    return seq[:k] + seq[k + n:]
+
+# Con conflictos sin resolver, qué acción queda en la celda depende del orden de iteración
+# de los sets (cambia con PYTHONHASHSEED) y el parser hasta puede no terminar: tables y
+# parser sólo usan gramáticas deterministas; las demás se cubren en la capa builder.
+def _deterministic(case: Case) -> bool:
+    if case.layer == 'parser' and _cyclic(case.prods):
+        return False
+    return not _tables(case.grammar(), case.starts).conflicts
+
+# Los puntos de entrada tienen que seguir teniendo producciones
+def _valid(case: Case) -> bool:
+    if case.layer == 'lexer':
+        return True
+    lhs = {A for A, _ in case.prods}
+    if not all(E in lhs for E in case.starts):
+        return False
+    return case.layer == 'builder' or _deterministic(case)
+
+# Si `removed` se quedó sin producciones se sacan las que lo usan: si no, pasaría a ser un
+# terminal y el caso cambiaría de significado
+def _drop_orphans(case: Case, removed: Symbol) -> Case:
+    lhs = {A for A, _ in case.prods}
+    if removed in lhs:
+        return case
+    return replace(case, prods=tuple(p for p in case.prods if removed not in p[1]))
+
+def _candidates(case: Case):
+    if case.layer == 'lexer':
+        text = case.text
+        n = len(text) // 2
+        while n >= 1:
+            for k in range(len(text) - n + 1):
+                yield replace(case, text=text[:k] + text[k + n:])
+            n //= 2
+        for k in range(len(case.rules)):
+            yield replace(case, rules=_without(case.rules, k))
+        return
+    if case.layer == 'parser':
+        toks = case.tokens
+        n = len(toks) // 2
+        while n >= 1:
+            for k in range(len(toks) - n + 1):
+                yield replace(case, tokens=_without(toks, k, n))
+            n //= 2
+    for k in range(len(case.prods)):
+        A = case.prods[k][0]
+        yield _drop_orphans(replace(case, prods=_without(case.prods, k)), A)
+    for k, (A, rhs) in enumerate(case.prods):
+        if rhs == (EPS,):
+            continue
+        for j in range(len(rhs)):
+            shorter = _without(rhs, j) or (EPS,)
+            yield replace(case, prods=case.prods[:k] + ((A, shorter),) + case.prods[k + 1:])
+    for k in range(len(case.precedence)):
+        yield replace(case, precedence=_without(case.precedence, k))
+    if len(case.starts) > 1 and case.entry in (None, case.starts[0]):
+        yield replace(case, starts=case.starts[:1])
+
+def shrink(case: Case, engine: Engine, max_tries: int = 2000) -> Tuple[Case, Tuple, Tuple]:
+    found = mismatch(case, engine)
+    assert found is not None
+    tries = 0
+    progress = True
+    while progress and tries < max_tries:
+        progress = False
+        for cand in _candidates(case):
+            tries += 1
+            if tries > max_tries:
+                break
+            if cand == case or not _valid(cand):
+                continue
+            hit = mismatch(cand, engine)
+            if hit is not None:
+                case, found = cand, hit
+                progress = True
+                break
+    return case, found[0], found[1]
+
+# ---------------------------------------------------------------------------
+# Generadores
+
+# Casos límite conocidos: (producciones "A -> x y | ...; B -> ...", precedencia, puntos de entrada extra)
+_TEMPLATES: List[Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...], Tuple[str, ...]]] = [
+    # ambigua resuelta por precedencia
+    ("E -> E + E | E * E | - E | ( E ) | id", (('left', ('+',)), ('left', ('*',)), ('right', ('-',))), ()),
+    # dangling else (shift/reduce sin resolver)
+    ("S -> if c S | if c S else S | x", (), ()),
+    # cadenas de ε y anulables encadenados
+    ("S -> A B C | d; A -> a | ε; B -> A b | ε; C -> c C | ε", (), ()),
+    # cadena unitaria larga (eliminate_unit_reductions)
+    ("S -> A; A -> B | a; B -> C | b; C -> ( S ) | c", (), ()),
+    # recursión izquierda y derecha
+    ("L -> L , I | I; I -> x | R; R -> y R | y", (), ('R',)),
+    # reduce/reduce
+    ("S -> A | B; A -> x; B -> x", (), ()),
+    # LR(1) pero no LALR(1) (fusionar núcleos da reduce/reduce)
+    ("S -> a A d | b B d | a B e | b A e; A -> c; B -> c", (), ()),
+    # nombres que chocan con los símbolos aumentados
+    ("S -> S' a | b; S' -> S'' c | ε; S'' -> d", (), ("S'",)),
+    # %nonassoc (celdas de error)
+    ("E -> E < E | E + E | n", (('nonassoc', ('<',)), ('left', ('+',))), ()),
+    # listas de sentencias terminadas en '.' (ParallelParser corta y cose por S)
+    ("P -> L; L -> L S | S; S -> x = E .; E -> E + T | T; T -> ( E ) | x", (), ()),
+    ("P -> R | ε; R -> S R | S; S -> x = E . | { P } .; E -> E + x | x", (), ('S',)),
+]
+
+def _parse_template(text: str) -> Tuple[Symbol, Tuple[Prod, ...]]:
+    prods: List[Prod] = []
+    for part in text.split('; '):
+        A, alts = part.split(' -> ')
+        for alt in alts.split(' | '):
+            rhs = tuple(alt.split())
+            prods.append((A, rhs if rhs != ('ε',) else (EPS,)))
+    return prods[0][0], tuple(prods)
+
+_NT_NAMES = ['S', 'A', 'B', 'C', 'D', 'E', 'F', 'G']
+_T_NAMES = ['a', 'b', 'c', 'd', '+', '(', ')', 'x', 'id']
+
+# Gramática al azar con hasta `size` no terminales; todos derivan alguna cadena terminal
+def random_grammar(rng: Random, size: int) -> Tuple[Symbol, Tuple[Prod, ...]]:
+    nts = _NT_NAMES[:rng.randint(1, max(1, min(size, len(_NT_NAMES))))]
+    terms = rng.sample(_T_NAMES, rng.randint(1, min(len(_T_NAMES), size + 1)))
+    prods: List[Prod] = []
+    for A in nts:
+        for _ in range(rng.randint(1, 3)):
+            n = rng.choice((0, 1, 1, 2, 2, 3, 4))
+            rhs = tuple(rng.choice(nts + terms + terms) for _ in range(n))
+            prods.append((A, rhs or (EPS,)))
+    # Productivos: si un no terminal no deriva nada, se le agrega una alternativa terminal
+    productive: set = set()
+    changed = True
+    while changed:
+        changed = False
+        for A, rhs in prods:
+            if A not in productive and all(X in productive or X not in nts for X in rhs):
+                productive.add(A)
+                changed = True
+    for A in nts:
+        if A not in productive:
+            prods.append((A, (rng.choice(terms),)))
+    return nts[0], tuple(prods)
+
+# Altura mínima de un árbol de derivación desde cada no terminal: eligiendo siempre una
+# alternativa de altura menor la derivación termina (aunque haya ciclos o ε)
+def _heights(prods: Sequence[Prod]) -> Dict[Symbol, int]:
+    nts = {A for A, _ in prods}
+    best: Dict[Symbol, int] = {}
+    changed = True
+    while changed:
+        changed = False
+        for A, rhs in prods:
+            if all(X in best for X in rhs if X in nts):
+                h = 1 + max((best[X] for X in rhs if X in nts), default=0)
+                if h < best.get(A, 10 ** 9):
+                    best[A] = h
+                    changed = True
+    return best
+
+# Ciclos A =>+ A (p. ej. A -> A, o A -> B C con C anulable y B -> A): el parser LR puede
+# reducir para siempre
+def _cyclic(prods: Sequence[Prod]) -> bool:
+    nts = {A for A, _ in prods}
+    nullable: set = set()
+    changed = True
+    while changed:
+        changed = False
+        for A, rhs in prods:
+            if A not in nullable and all(X == EPS or X in nullable for X in rhs):
+                nullable.add(A)
+                changed = True
+    edges: Dict[Symbol, set] = {A: set() for A in nts}
+    for A, rhs in prods:
+        for k, X in enumerate(rhs):
+            if X in nts and all(Y in nullable or Y == EPS for Y in rhs[:k] + rhs[k + 1:]):
+                edges[A].add(X)
+    for A in nts:
+        seen, work = set(), list(edges[A])
+        while work:
+            B = work.pop()
+            if B == A:
+                return True
+            if B not in seen:
+                seen.add(B)
+                work.extend(edges[B])
+    return False
+
+# Oración derivada al azar desde `start`; pasado `max_len` se eligen alternativas que bajan la altura
+def sentence(rng: Random, prods: Sequence[Prod], start: Symbol, max_len: int = 12) -> Tuple[Symbol, ...]:
+    nts = {A for A, _ in prods}
+    by_lhs: Dict[Symbol, List[Tuple[Symbol, ...]]] = {}
+    for A, rhs in prods:
+        by_lhs.setdefault(A, []).append(rhs)
+    height = _heights(prods)
+    if start not in height:
+        return ()
+    out: List[Symbol] = []
+    stack = [start]
+    while stack:
+        X = stack.pop()
+        if X == EPS:
+            continue
+        if X not in nts:
+            out.append(X)
+            continue
+        alts = [rhs for rhs in by_lhs[X] if all(Y in height for Y in rhs if Y in nts)]
+        if len(out) + len(stack) >= max_len:
+            alts = [rhs for rhs in alts if all(height[Y] < height[X] for Y in rhs if Y in nts)]
+        stack.extend(reversed(rng.choice(alts)))
+    return tuple(out)
+
+def mutate(rng: Random, tokens: Tuple[Symbol, ...], terminals: Sequence[Symbol]) -> Tuple[Symbol, ...]:
+    toks = list(tokens)
+    op = rng.randrange(4)
+    k = rng.randrange(len(toks) + 1)
+    if op == 0 and toks:
+        del toks[min(k, len(toks) - 1)]
+    elif op == 1 or not toks:
+        toks.insert(k, rng.choice(list(terminals)))
+    elif op == 2:
+        toks[min(k, len(toks) - 1)] = rng.choice(list(terminals))
+    elif len(toks) > 1:
+        j = min(k, len(toks) - 2)
+        toks[j], toks[j + 1] = toks[j + 1], toks[j]
+    return tuple(toks)
+
+def pick_grammar(rng: Random, size: int) -> Tuple[Symbol, Tuple[Prod, ...], Tuple, Tuple[Symbol, ...]]:
+    if rng.random() < 0.5:
+        text, prec, extra = rng.choice(_TEMPLATES)
+        start, prods = _parse_template(text)
+    else:
+        start, prods = random_grammar(rng, size)
+        prec, extra = (), ()
+        others = sorted({A for A, _ in prods} - {start})
+        if others and rng.random() < 0.3:
+            extra = (rng.choice(others),)
+    return start, prods, prec, (start,) + tuple(extra)
+
+# Reglas de lexer con prefijos compartidos, palabras clave antes y después del identificador
+# y operadores donde el corto va primero ('=' antes que '=='): gana la primera alternativa
+_LEX_RULES = [
+    ('IF', r'if', False), ('IN', r'in', False), ('WHILE', r'while', False),
+    ('ID', r'[a-z_]\w*', False), ('NUM', r'\d+', False), ('FLOAT', r'\d+\.\d*', False),
+    ('EQ', r'==', False), ('ASSIGN', r'=', False), ('PLUS', r'\+', False), ('INC', r'\+\+', False),
+    ('LP', r'\(', False), ('RP', r'\)', False), ('WS', r'\s+', True), ('COMMENT', r'#[^\n]*', True),
+]
+_LEXEMES = ['if', 'in', 'int', 'while', 'whilex', 'x', '_y1', '0', '42', '3.', '3.14', '=', '==', '===',
+            '+', '++', '+++', '(', ')', ' ', '\n', '# c\n', '$']
+
+def lexer_case(rng: Random, size: int) -> Case:
+    rules = [r for r in _LEX_RULES if rng.random() < 0.8]
+    if rng.random() < 0.5:
+        rng.shuffle(rules)
+    text = ''.join(rng.choice(_LEXEMES) + rng.choice(('', '', ' ')) for _ in range(rng.randint(0, 3 * size)))
+    return Case('lexer', rules=tuple(rules), text=text)
+
+# ---------------------------------------------------------------------------
+# Corrida
+
+@dataclass
+class DiffResult:
+    cases: int = 0
+    checks: int = 0  # comparaciones variante vs. referencia
+    skipped: int = 0  # casos que una variante no cubre (Unsupported)
+    mismatches: List[Mismatch] = field(default_factory=list)
+    engines: Dict[str, List[str]] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+def selected_engines(layers: Sequence[str], names: Optional[Sequence[str]] = None) -> Dict[str, List[Engine]]:
+    out: Dict[str, List[Engine]] = {}
+    for layer in layers:
+        if layer not in ENGINES:
+            raise ValueError(f"Capa desconocida: {layer} (opciones: {', '.join(LAYERS)})")
+        out[layer] = [e for e in ENGINES[layer].values()
+                      if e.name != REFERENCE and (e.name in names if names else e.default)]
+    if names:
+        known = {e.name for layer in layers for e in ENGINES[layer].values()}
+        unknown = [n for n in names if n not in known]
+        if unknown:
+            raise ValueError(f"Variante desconocida: {', '.join(unknown)}")
+    return out
+
+def _cases(rng: Random, layer: str, size: int, inputs: int) -> List[Case]:
+    if layer == 'lexer':
+        return [lexer_case(rng, size)]
+    while True:
+        start, prods, prec, starts = pick_grammar(rng, size)
+        base = Case(layer, prods, start, starts, prec)
+        if _valid(base):
+            break
+    if layer != 'parser':
+        return [base]
+    terms = sorted({X for _, rhs in prods for X in rhs if X not in {A for A, _ in prods} and X != EPS}) or ['x']
+    out = []
+    for k in range(inputs):
+        entry = rng.choice(starts) if len(starts) > 1 else None
+        toks = sentence(rng, prods, entry or start, max_len=rng.randint(0, 4 * size))
+        if k % 2:
+            toks = mutate(rng, toks, terms)
+        out.append(replace(base, tokens=toks, entry=entry))
+    return out
+
+# `cases`: grammars/textos por capa; `inputs`: entradas por gramática en la capa parser.
+# Se detiene en la primera diferencia de cada variante (después de achicarla).
+def run_difftest(cases: int = 100, seed: int = 0, layers: Sequence[str] = LAYERS,
+                 engines: Optional[Sequence[str]] = None, size: int = 5, inputs: int = 6,
+                 do_shrink: bool = True) -> DiffResult:
+    t0 = time.monotonic()
+    chosen = selected_engines(layers, engines)
+    result = DiffResult(engines={layer: [e.name for e in es] for layer, es in chosen.items()})
+    for layer in layers:
+        rng = Random(f"{seed}:{layer}")
+        failed: set = set()
+        for _ in range(cases):
+            for case in _cases(rng, layer, size, inputs):
+                result.cases += 1
+                try:
+                    expected = run_engine(case, ENGINES[layer][REFERENCE])
+                except Unsupported:
+                    continue
+                for engine in chosen[layer]:
+                    if engine.name in failed:
+                        continue
+                    try:
+                        got = run_engine(case, engine)
+                    except Unsupported:
+                        result.skipped += 1
+                        continue
+                    result.checks += 1
+                    if _same(engine, expected, got):
+                        continue
+                    failed.add(engine.name)
+                    small, exp, gt = shrink(case, engine) if do_shrink else (case, expected, got)
+                    result.mismatches.append(Mismatch(layer, engine.name, small, exp, gt, case))
+    result.elapsed = round(time.monotonic() - t0, 3)
+    return result
@@ -1,6 +1,6 @@
 
 from __future__ import annotations
-from typing import Dict, Iterable, List, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from collections import defaultdict
 
 EPS = 'ε'
@@ -19,6 +19,16 @@ class Grammar:
         self.by_lhs: Dict[Symbol, List[RHS]] = defaultdict(list)
         self._first_cache: Dict[Symbol, Set[Symbol]] = {}
         self._first_visiting: Set[Symbol] = set()
+        # Precedencia estilo yacc: símbolo -> (nivel, 'left'|'right'|'nonassoc'); mayor nivel liga más fuerte
+        self.prec: Dict[Symbol, Tuple[int, str]] = {}
+        self.prod_prec: Dict[Prod, Symbol] = {}  # %prec explícito por producción
+        # Punto de entrada -> S' que agregó LR1Builder al aumentarla en el lugar
+        self.aug_starts: Dict[Symbol, Symbol] = {}
+
+    # S' del símbolo inicial (None si no está aumentada)
+    @property
+    def aug_start(self) -> Optional[Symbol]:
+        return self.aug_starts.get(self.start)
 
     def add(self, lhs: Symbol, rhs: Iterable[Symbol]):
         rhs = tuple(rhs)
@@ -31,6 +41,37 @@ class Grammar:
         self.by_lhs[lhs].append(rhs)
         self._first_cache.clear()
 
+    # Versión inmutable con FIRST/FOLLOW precalculados (ver compiled.py)
+    def compile(self) -> 'CompiledGrammar':
+        from .compiled import CompiledGrammar
+        return CompiledGrammar(self)
+
+    def copy(self) -> 'Grammar':
+        H = Grammar(self.start, self.terminals - {END}, self.nonterminals)
+        for A, rhs in self.productions:
+            H.add(A, rhs)
+        H.prec = dict(self.prec)
+        H.prod_prec = dict(self.prod_prec)
+        # Las producciones S' -> S ya copiadas: sin esto LR1Builder aumentaría otra vez
+        H.aug_starts = dict(self.aug_starts)
+        return H
+
+    # levels: [(assoc, [símbolos]), ...] en orden de declaración (de menor a mayor precedencia)
+    def set_precedence(self, levels: Iterable[Tuple[str, Iterable[Symbol]]]):
+        for n, (assoc, syms) in enumerate(levels, start=1):
+            for s in syms:
+                self.prec[s] = (n, assoc)
+
+    # %prec explícito o, si no, el terminal más a la derecha con precedencia
+    def production_precedence(self, prod: Prod) -> Optional[Tuple[int, str]]:
+        sym = self.prod_prec.get(prod)
+        if sym is not None:
+            return self.prec.get(sym)
+        for s in reversed(prod[1]):
+            if s in self.terminals and s in self.prec:
+                return self.prec[s]
+        return None
+
     def _compute_first_all(self) -> None:
         # Initialize FIRST sets
         firsts: Dict[Symbol, Set[Symbol]] = {}
@@ -99,6 +140,8 @@ class Grammar:
         follow: Dict[Symbol, Set[Symbol]] = {A: set() for A in self.nonterminals}
         # $ is in terminals by construction; add to start symbol FOLLOW
         follow[self.start].add(END)
+        for E in self.aug_starts:
+            follow[E].add(END)  # cada punto de entrada puede terminar la entrada
 
         changed = True
         while changed:
@@ -1,11 +1,13 @@
 
 from __future__ import annotations
 import re
-from typing import Dict, List, Tuple
-from .grammar import Grammar
+from typing import Dict, List, Optional, Tuple
+from .grammar import Grammar, EPS
 
-_SECTION_RE = re.compile(r"^(START|NONTERMINALS|TERMINALS|PRODUCTIONS|LEXER):\s*(.*)$")
+_SECTION_RE = re.compile(r"^(START|NONTERMINALS|TERMINALS|PRODUCTIONS|LEXER|ACTIONS):\s*(.*)$")
 _LEXER_LINE_RE = re.compile(r"^(.+?):\s*/(.+?)/\s*(skip)?$")
+_ACTION_LINE_RE = re.compile(r"^(.+?)->(.*?)=>(.+)$")
+_PREC_LINE_RE = re.compile(r"^%(left|right|nonassoc)\s+(.+)$")
 
 class GrammarSpec:
     def __init__(self):
@@ -14,11 +16,17 @@ class GrammarSpec:
         self.terms: List[str] = []
         self.prods: List[Tuple[str, List[str]]] = []
         self.lex_rules: List[Tuple[str, str, bool]] = []  # (terminal, regex, skip)
+        self.actions: List[Tuple[str, List[str], str]] = []  # (lhs, rhs, expresión con $1..$n)
+        self.precedence: List[Tuple[str, List[str]]] = []  # (%left|%right|%nonassoc, símbolos), de menor a mayor
+        self.prod_prec: Dict[Tuple[str, Tuple[str, ...]], str] = {}  # producción -> símbolo de %prec
 
     def to_grammar(self) -> Grammar:
         G = Grammar(self.start, self.terms, self.nonterms)
         for A, rhs in self.prods:
             G.add(A, rhs)
+        G.set_precedence(self.precedence)
+        for (A, rhs), sym in self.prod_prec.items():
+            G.prod_prec[(A, rhs if rhs else (EPS,))] = sym
         return G
 
 def _strip_quotes(s: str) -> str:
@@ -27,6 +35,38 @@ def _strip_quotes(s: str) -> str:
         return s[1:-1]
     return s
 
+def parse_action_line(raw: str) -> Tuple[str, List[str], str]:
+    m = _ACTION_LINE_RE.match(raw.strip())
+    if not m:
+        raise ValueError(f"Línea de acción inválida: {raw}")
+    rhs = [s for s in m.group(2).split() if s not in ('ε', 'eps', 'epsilon')]
+    return (m.group(1).strip(), rhs, m.group(3).strip())
+
+def is_precedence_line(raw: str) -> bool:
+    return bool(_PREC_LINE_RE.match(raw.strip()))
+
+# "%left + -" -> ('left', ['+', '-'])
+def parse_precedence_line(raw: str) -> Tuple[str, List[str]]:
+    m = _PREC_LINE_RE.match(raw.strip())
+    if not m:
+        raise ValueError(f"Declaración de precedencia inválida: {raw}")
+    return (m.group(1), [_strip_quotes(s) for s in m.group(2).split()])
+
+# "E -> - E %prec UMINUS" -> (['-', 'E'], 'UMINUS')
+def split_prec(symbols: List[str]) -> Tuple[List[str], Optional[str]]:
+    if '%prec' not in symbols:
+        return symbols, None
+    k = symbols.index('%prec')
+    if k != len(symbols) - 2:
+        raise ValueError(f"%prec debe ir al final de la alternativa: {' '.join(symbols)}")
+    return symbols[:k], symbols[k + 1]
+
+def add_alternative(spec: GrammarSpec, A: str, alt: str):
+    symbols, prec = split_prec([s for s in alt.split() if s])
+    spec.prods.append((A, symbols))
+    if prec:
+        spec.prod_prec[(A, tuple(symbols))] = prec
+
 def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
     with open(path, 'r', encoding='utf-8') as f:
         lines = [ln.rstrip() for ln in f]
@@ -41,6 +81,9 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
         for raw in lines:
             if not raw.strip():
                 continue
+            if is_precedence_line(raw):
+                spec.precedence.append(parse_precedence_line(raw))
+                continue
             prod_lines.append(raw.strip())
 
         # Parsear producciones
@@ -55,8 +98,7 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
                 if alt == '' or alt.lower() == '��' or alt == '��':
                     spec.prods.append((A, []))
                 else:
-                    symbols = [s for s in alt.split() if s]
-                    spec.prods.append((A, symbols))
+                    add_alternative(spec, A, alt)
 
         # Inferir START/NONTERMINALS/TERMINALS
         lhs_order = [A for (A, _) in spec.prods]
@@ -77,6 +119,9 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
     for raw in lines:
         if not raw.strip():
             continue
+        if is_precedence_line(raw):
+            spec.precedence.append(parse_precedence_line(raw))
+            continue
         m = _SECTION_RE.match(raw)
         if m:
             current = m.group(1)
@@ -89,7 +134,7 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
                 spec.terms = [t for t in rest.split() if t]
             elif current == 'PRODUCTIONS':
                 prod_lines.clear()
-            elif current == 'LEXER':
+            elif current in ('LEXER', 'ACTIONS'):
                 pass
             continue
 
@@ -104,6 +149,8 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
             regex = mm.group(2)
             skip = bool(mm.group(3))
             spec.lex_rules.append((term, regex, skip))
+        elif current == 'ACTIONS':
+            spec.actions.append(parse_action_line(raw))
         else:
             raise ValueError(f"Línea fuera de sección: {raw}")
 
@@ -119,8 +166,7 @@ def load_grammar_file(path: str) -> Tuple[GrammarSpec, Grammar]:
             if alt == '' or alt.lower() == 'ε':
                 spec.prods.append((A, []))
             else:
-                symbols = [s for s in alt.split() if s]
-                spec.prods.append((A, symbols))
+                add_alternative(spec, A, alt)
 
     G = spec.to_grammar()
     return spec, G
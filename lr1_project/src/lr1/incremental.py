@@ -0,0 +1,324 @@
+
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+from .ast import Node
+from .grammar import END, EPS
+from .lexer import Lexer
+from .parser import ParseError
+from .tables import Tables
+
+Token = Tuple[str, str]
+
+class IncrementalLexer:
+    # Guarda sólo los tokens no omitidos con sus offsets [inicio, fin) en el texto.
+    def __init__(self, lexer: Lexer, text: str):
+        self.L = lexer
+        self.text = text
+        self.tokens: List[Token] = []
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.valid = False
+        try:
+            self._relex_all()
+        except SyntaxError:
+            pass
+
+    # Tras un error léxico no hay tokens confiables: el siguiente edit re-lexea todo
+    def _relex_all(self) -> Tuple[int, int, int]:
+        n = len(self.tokens)
+        tokens: List[Token] = []
+        starts: List[int] = []
+        ends: List[int] = []
+        for term, lexeme, s, e in self.L.scan(self.text):
+            if term is not None:
+                tokens.append((term, lexeme))
+                starts.append(s)
+                ends.append(e)
+        self.tokens, self.starts, self.ends = tokens, starts, ends
+        self.valid = True
+        return 0, n, len(tokens)
+
+    # Reemplaza text[start:end] por new_text y re-tokeniza sólo la zona dañada.
+    # Devuelve (a, b, b_new): los tokens viejos [a, b) pasaron a ser los nuevos [a, b_new).
+    def edit(self, start: int, end: int, new_text: str) -> Tuple[int, int, int]:
+        text = self.text[:start] + new_text + self.text[end:]
+        if not self.valid:
+            self.text = text
+            return self._relex_all()
+        delta = len(new_text) - (end - start)
+        edit_end = start + len(new_text)
+        # Se retrocede un token antes del primero que toca la edición: su match pudo
+        # depender del texto siguiente (p. ej. un identificador que ahora se alarga).
+        a = max(0, bisect_left(self.ends, start) - 1)
+        pos = self.starts[a] if a > 0 else 0
+        n = len(self.tokens)
+
+        new_tokens: List[Token] = []
+        new_starts: List[int] = []
+        new_ends: List[int] = []
+        b = n
+        lo = a
+        try:
+            for term, lexeme, s, e in self.L.scan(text, pos):
+                if term is None:
+                    continue
+                if s >= edit_end:
+                    # Resincronización: mismo inicio que un token viejo tras la zona editada;
+                    # desde aquí el resto del texto es idéntico y el lexer no tiene más estado.
+                    lo = bisect_left(self.starts, s - delta, lo)
+                    if lo < n and self.starts[lo] == s - delta:
+                        b = lo
+                        break
+                new_tokens.append((term, lexeme))
+                new_starts.append(s)
+                new_ends.append(e)
+        except SyntaxError:
+            self.text = text
+            self.valid = False
+            raise
+
+        self.text = text
+        self.tokens[a:b] = new_tokens
+        self.starts[a:] = new_starts + [x + delta for x in self.starts[b:]]
+        self.ends[a:] = new_ends + [x + delta for x in self.ends[b:]]
+        return a, b, a + len(new_tokens)
+
+class _Cursor:
+    # Recorre el árbol viejo de izquierda a derecha con el camino desde `root` hasta el token
+    # consultado. Las consultas llegan con offsets crecientes, así que cada nodo se apila y
+    # desapila a lo sumo una vez por reparseo (antes cada consulta bajaba desde la raíz).
+    def __init__(self, root: Node, off: int):
+        # [nodo, offset, índice del hijo en el camino, offset de ese hijo]
+        self.path: List[list] = [[root, off, 0, off]]
+
+    # Nodos no terminales (no vacíos) que empiezan en el offset viejo `o`, del más externo al más interno
+    def nodes_at(self, o: int) -> List[Node]:
+        path = self.path
+        while path and path[-1][1] + path[-1][0].ntok <= o:
+            path.pop()
+        if not path or path[-1][1] > o:
+            return []
+        k = len(path)
+        while k > 0 and path[k - 1][1] == o:
+            k -= 1
+        out = [lvl[0] for lvl in path[k:] if lvl[0].children]
+        while True:
+            lvl = path[-1]
+            children = lvl[0].children
+            if not children:
+                return out
+            ci, coff = lvl[2], lvl[3]
+            while coff + children[ci].ntok <= o:
+                coff += children[ci].ntok
+                ci += 1
+            lvl[2], lvl[3] = ci, coff
+            ch = children[ci]
+            path.append([ch, coff, 0, coff])
+            if coff == o and ch.children:
+                out.append(ch)
+
+class _Abort(Exception):
+    pass
+
+class IncrementalParser:
+    # Reparseo estilo Wagner–Graham: cada Node guarda el estado LR bajo él (`state`) y
+    # cuántos tokens cubre (`ntok`). Un subárbol viejo se reutiliza si empieza en la posición
+    # actual, el estado coincide y tanto sus tokens como el lookahead que decidió su última
+    # reducción están fuera de la zona editada: el LR es determinista, así que el parseo
+    # completo haría exactamente las mismas acciones.
+    #
+    # Para no re-reducir los ancestros de la edición (en una lista recursiva a izquierda son
+    # uno por elemento que sigue) se reparsea sólo el menor nodo viejo Y que envuelve la zona
+    # dañada: desde su estado base, hasta volver a tener un único Y' sobre la base en la
+    # posición donde terminaba Y. Si Y empieza antes de la edición (o en el fondo de la pila)
+    # la pila bajo él es la del parseo viejo, y el lookahead tras Y no cambió, así que desde
+    # ahí el parseo completo repetiría las acciones viejas: los ancestros se copian con Y'
+    # en lugar de Y. Si el reparseo se sale de Y (desapila la base o pasa su final) se prueba
+    # con el padre.
+    SPLICE_TRIES = 4
+
+    def __init__(self, tables: Tables):
+        self.T = tables
+        self.root: Optional[Node] = None
+        self.last_stats: Dict[str, int] = {}
+
+    @staticmethod
+    def _new_stats() -> Dict[str, int]:
+        return {'shifted': 0, 'reductions': 0, 'reused': 0, 'reused_tokens': 0, 'copied': 0, 'discarded': 0}
+
+    def parse(self, tokens: List[Token]) -> Node:
+        stats = self._new_stats()
+        self.root = self._run(tokens, stats)
+        self.last_stats = stats
+        return self.root
+
+    # tokens: lista nueva completa; los viejos [a, b) fueron reemplazados por [a, b_new)
+    def reparse(self, tokens: List[Token], a: int, b: int, b_new: int) -> Node:
+        if self.root is None:
+            return self.parse(tokens)
+        damage = (a, b, b_new - b)
+        path = self._enclosing(a, b)
+        discarded = 0
+        root = None
+        for depth in range(len(path) - 1, max(-1, len(path) - 1 - self.SPLICE_TRIES), -1):
+            Y, off = path[depth][0], path[depth][1]
+            stats = self._new_stats()
+            try:
+                sub = self._run(tokens, stats, off, Y.state, _Cursor(Y, off), damage, (Y.sym, off + Y.ntok + damage[2]))
+            except _Abort:
+                discarded += stats['shifted'] + stats['reductions']
+                continue
+            root = self._splice(path, depth, sub, stats)
+            break
+        if root is None:
+            stats = self._new_stats()
+            root = self._run(tokens, stats, cursor=_Cursor(self.root, 0), damage=damage)
+        # discarded: shifts y reducciones de intentos que se salieron de su nodo
+        stats['discarded'] = discarded
+        self.root = root
+        self.last_stats = stats
+        return root
+
+    # Camino [(nodo, offset, índice en el padre)] desde la raíz hasta el menor no terminal
+    # que contiene los tokens viejos [a, b) y el lookahead posterior, y cuya pila inferior
+    # no depende de la edición: empieza antes de `a`, o es primer hijo desde la raíz.
+    def _enclosing(self, a: int, b: int) -> List[Tuple[Node, int, int]]:
+        node, off, bottom = self.root, 0, True
+        path = [(node, off, -1)]
+        while True:
+            coff = off
+            for idx, ch in enumerate(node.children):
+                first = bottom and idx == 0
+                if ch.children and (coff < a or first) and coff + ch.ntok >= b and ch.ntok > 0:
+                    node, off, bottom = ch, coff, first
+                    path.append((ch, coff, idx))
+                    break
+                coff += ch.ntok
+            else:
+                return path
+
+    # Reemplaza el nodo en path[depth] por `sub` copiando sus ancestros
+    @staticmethod
+    def _splice(path: List[Tuple[Node, int, int]], depth: int, sub: Node, stats: Dict[str, int]) -> Node:
+        grow = sub.ntok - path[depth][0].ntok
+        node = sub
+        for d in range(depth - 1, -1, -1):
+            parent, idx = path[d][0], path[d + 1][2]
+            children = list(parent.children)
+            children[idx] = node
+            stats['reused'] += len(children) - 1
+            stats['reused_tokens'] += parent.ntok - path[d + 1][0].ntok
+            stats['copied'] += 1
+            node = Node(parent.sym, children, parent.lexeme, state=parent.state, ntok=parent.ntok + grow)
+        return node
+
+    # Parseo LR desde `i` con `base` como estado inicial. Sin `goal` llega hasta accept; con
+    # goal=(símbolo, fin) devuelve el nodo en cuanto queda solo sobre la base en la posición
+    # `fin`, y lanza _Abort si desapila la base o pasa de `fin`. `cursor` y `damage` (a, b,
+    # delta) habilitan la reutilización de subárboles viejos.
+    def _run(self, tokens: List[Token], stats: Dict[str, int], i: int = 0, base: int = 0,
+             cursor: Optional[_Cursor] = None, damage: Optional[Tuple[int, int, int]] = None,
+             goal: Optional[Tuple[str, int]] = None) -> Node:
+        ACTION, GOTO = self.T.ACTION, self.T.GOTO
+        n = len(tokens)
+        a, b, delta = damage if damage is not None else (0, 0, 0)
+        g_sym, g_end = goal if goal is not None else (None, n + 1)
+        states: List[int] = [base]
+        nodes: List[Node] = []
+        cands: List[Node] = []
+        cand_i = -1
+        while True:
+            s = states[-1]
+            if i == g_end and len(nodes) == 1 and nodes[0].sym == g_sym:
+                return nodes[0]
+            if cursor is not None and i < n and i < g_end:
+                if i != cand_i:
+                    cand_i = i
+                    if i < a:
+                        cands = [nd for nd in cursor.nodes_at(i) if i + nd.ntok < a]
+                    elif i >= b + delta:
+                        cands = cursor.nodes_at(i - delta)
+                    else:
+                        cands = []
+                hit = None
+                for nd in cands:
+                    if nd.state == s and (s, nd.sym) in GOTO and i + nd.ntok <= g_end:
+                        hit = nd
+                        break
+                if hit is not None:
+                    nodes.append(hit)
+                    states.append(GOTO[(s, hit.sym)])
+                    i += hit.ntok
+                    stats['reused'] += 1
+                    stats['reused_tokens'] += hit.ntok
+                    continue
+
+            a_type, a_lex = tokens[i] if i < n else (END, END)
+            act = ACTION.get((s, a_type))
+            if not act:
+                raise ParseError(i, a_type, self.T.expected(s))
+            if act.kind == 'shift':
+                if i >= g_end:
+                    raise _Abort()
+                nodes.append(Node(a_type, [], a_lex, state=s, ntok=1))
+                states.append(int(act.value))  # type: ignore
+                i += 1
+                stats['shifted'] += 1
+            elif act.kind == 'reduce':
+                lhs, rhs = act.value  # type: ignore
+                k = 0 if rhs == (EPS,) else len(rhs)
+                if k > len(nodes):
+                    raise _Abort()
+                children = nodes[len(nodes) - k:] if k else []
+                if k:
+                    del nodes[-k:]
+                    del states[-k:]
+                s = states[-1]
+                j = GOTO.get((s, lhs))
+                if j is None:
+                    raise RuntimeError(f"Missing GOTO for state {s}, lhs {lhs}")
+                states.append(j)
+                nodes.append(Node(lhs, children, state=s, ntok=sum(ch.ntok for ch in children)))
+                stats['reductions'] += 1
+            else:
+                if goal is not None:
+                    raise _Abort()
+                return nodes[0]
+
+class IncrementalDocument:
+    # Texto + tokens + árbol; cada edit re-lexea la zona dañada y reutiliza subárboles intactos.
+    # Si el texto queda inválido, el árbol anterior se conserva y el daño se acumula hasta
+    # el siguiente reparseo exitoso.
+    def __init__(self, tables: Tables, lexer: Lexer, text: str):
+        self.lexer = IncrementalLexer(lexer, text)
+        self.parser = IncrementalParser(tables)
+        self.tree: Optional[Node] = None
+        self._pending: Optional[Tuple[int, int, int]] = None
+        if self.lexer.valid:
+            try:
+                self.tree = self.parser.parse(self.lexer.tokens)
+            except SyntaxError:
+                pass
+
+    @property
+    def text(self) -> str:
+        return self.lexer.text
+
+    def edit(self, start: int, end: int, new_text: str) -> Node:
+        a, b, b_new = self.lexer.edit(start, end, new_text)
+        if self._pending is not None:
+            # Componer con el daño anterior (en coordenadas de los tokens del último árbol)
+            a1, b1, b1_new = self._pending
+            hi = max(b1_new, b)
+            a, b, b_new = min(a1, a), hi - b1_new + b1, hi + b_new - b
+        try:
+            if self.tree is None:
+                self.tree = self.parser.parse(self.lexer.tokens)
+            else:
+                self.tree = self.parser.reparse(self.lexer.tokens, a, b, b_new)
+        except SyntaxError:
+            self._pending = (a, b, b_new)
+            raise
+        self._pending = None
+        return self.tree
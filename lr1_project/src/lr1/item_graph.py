@@ -0,0 +1,70 @@
+
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterator, List, Set, Tuple
+from .grammar import Symbol, EPS
+from .items import LR1Item
+
+class ItemGraph:
+    # AFN de ítems LR(1): un nodo por ítem (id entero en orden de aparición), aristas por
+    # símbolo (avance del punto) y ε (cierre). Lo llena LR1Builder(track_items=True) en la
+    # misma pasada que la colección canónica.
+    def __init__(self):
+        self.items: List[LR1Item] = []
+        self.id_of: Dict[LR1Item, int] = {}
+        self.edges: Dict[int, Dict[Symbol, Set[int]]] = {}
+        self.start = -1
+        self.finals: Set[int] = set()
+
+    def intern(self, it: LR1Item) -> int:
+        k = self.id_of.get(it)
+        if k is None:
+            k = len(self.items)
+            self.id_of[it] = k
+            self.items.append(it)
+        return k
+
+    def add_edge(self, src: LR1Item, X: Symbol, dst: LR1Item):
+        u, v = self.intern(src), self.intern(dst)
+        self.edges.setdefault(u, {}).setdefault(X, set()).add(v)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def successors(self, u: int) -> Dict[Symbol, Set[int]]:
+        return self.edges.get(u, {})
+
+    # (origen, símbolo, destino); ε para las aristas de cierre
+    def iter_edges(self) -> Iterator[Tuple[int, Symbol, int]]:
+        for u, by_sym in self.edges.items():
+            for X, vs in by_sym.items():
+                for v in vs:
+                    yield u, X, v
+
+    # Ids alcanzables desde el inicial en orden BFS
+    def reachable(self) -> List[int]:
+        if self.start < 0:
+            return []
+        seen = {self.start}
+        order = [self.start]
+        q = deque([self.start])
+        while q:
+            u = q.popleft()
+            for vs in self.successors(u).values():
+                for v in vs:
+                    if v not in seen:
+                        seen.add(v)
+                        order.append(v)
+                        q.append(v)
+        return order
+
+    def eps_closure(self, ids) -> Set[int]:
+        out = set(ids)
+        q = deque(out)
+        while q:
+            u = q.popleft()
+            for v in self.successors(u).get(EPS, ()):
+                if v not in out:
+                    out.add(v)
+                    q.append(v)
+        return out
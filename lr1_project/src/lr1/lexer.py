@@ -1,21 +1,88 @@
 
 from __future__ import annotations
 import re
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_META = set('.^$*+?{}[]|()')
+
+# Texto que reconoce `rx` si es un literal puro (p. ej. 'while', '\+'); None si no lo es
+def _literal(rx: str) -> Optional[str]:
+    out = []
+    i = 0
+    while i < len(rx):
+        c = rx[i]
+        if c == '\\':
+            if i + 1 == len(rx) or rx[i + 1].isalnum():
+                return None  # \d, \w, \b, ...
+            out.append(rx[i + 1])
+            i += 2
+            continue
+        if c in _META:
+            return None
+        out.append(c)
+        i += 1
+    return ''.join(out) or None
 
 class Lexer:
-    def __init__(self, rules: List[Tuple[str, str, bool]]):
+    # Las reglas se prueban en orden como alternativas de una sola regex: gana la primera
+    # que reconoce algo en la posición actual (no la más larga).
+    #
+    # keyword_table=True: una regla literal (p. ej. while: /while/) ubicada ANTES de una regla
+    # que reconoce su texto completo (el identificador, p. ej. id: /[a-z]\w*/) se saca de la
+    # alternancia; se reconoce el identificador una sola vez y, si el lexema es exactamente
+    # una palabra clave, el token se reclasifica con un dict. Diferencias con la alternancia:
+    #   - el identificador se toma completo: 'whilex' es id (antes: while + x);
+    #   - una regla entre la palabra clave y el identificador que también reconozca el
+    #     texto de la palabra clave ahora le gana;
+    #   - si dos palabras clave tienen el mismo literal, gana la primera.
+    # Los literales declarados DESPUÉS del identificador nunca ganaban y se dejan como están.
+    def __init__(self, rules: List[Tuple[str, str, bool]], keyword_table: bool = False):
         # rules: (terminal, regex, skip)
+        self.keyword_table = keyword_table
+        # grupo del identificador -> {lexema: terminal de la palabra clave}
+        self.keywords: Dict[str, Dict[str, str]] = {}
+        moved = self._keyword_rules(rules) if keyword_table else {}
         parts = []
         self.term_by_group = []
         self.skip_groups = set()
         for idx, (term, rx, skip) in enumerate(rules):
+            if idx in moved:
+                continue
             name = f"G{idx}"
             parts.append(f"(?P<{name}>{rx})")
             self.term_by_group.append((name, term))
             if skip:
                 self.skip_groups.add(name)
+        for idx, (ident, literal) in moved.items():
+            self.keywords.setdefault(f"G{ident}", {}).setdefault(literal, rules[idx][0])
         self.master = re.compile("|".join(parts))
+        self.term_of = dict(self.term_by_group)
+
+    # {índice de la regla literal: (índice de la regla identificador, literal)}
+    @staticmethod
+    def _keyword_rules(rules) -> Dict[int, Tuple[int, str]]:
+        compiled = [re.compile(rx) for _, rx, _ in rules]
+        moved: Dict[int, Tuple[int, str]] = {}
+        for i, (term, rx, skip) in enumerate(rules):
+            lit = _literal(rx)
+            if skip or lit is None:
+                continue
+            for j in range(i + 1, len(rules)):
+                if not rules[j][2] and _literal(rules[j][1]) is None and compiled[j].fullmatch(lit):
+                    moved[i] = (j, lit)
+                    break
+        return moved
+
+    # Terminal del token reconocido por el grupo `name` (None si se omite)
+    def classify(self, name: str, lexeme: str) -> Optional[str]:
+        if name in self.skip_groups:
+            return None
+        kw = self.keywords.get(name)
+        if kw:
+            hit = kw.get(lexeme)
+            if hit is not None:
+                return hit
+        return self.term_of[name]
 
     def tokenize(self, text: str) -> List[Tuple[str, str]]:
         out: List[Tuple[str, str]] = []
@@ -24,13 +91,25 @@ class Lexer:
         while mo:
             name = mo.lastgroup
             lexeme = mo.group(name)
-            if name not in self.skip_groups:
-                for g, term in self.term_by_group:
-                    if g == name:
-                        out.append((term, lexeme))
-                        break
+            term = self.classify(name, lexeme)
+            if term is not None:
+                out.append((term, lexeme))
+            pos = mo.end()
+            mo = self.master.match(text, pos)
+        if pos != len(text):
+            raise SyntaxError(f"Lexer: input no reconocido desde pos {pos}: {text[pos:pos+20]!r}")
+        return out
+
+    # Recorre el texto desde `pos` devolviendo (terminal | None si se omite, lexema, inicio, fin).
+    # El lexer no guarda estado entre tokens: su snapshot es sólo el offset, y `scan(text, offset)`
+    # retoma desde ahí (ver ParserCheckpoint.offset).
+    def scan(self, text: str, pos: int = 0) -> Iterator[Tuple[Optional[str], str, int, int]]:
+        mo = self.master.match(text, pos)
+        while mo:
+            name = mo.lastgroup
+            lexeme = mo.group(name)
+            yield (self.classify(name, lexeme), lexeme, pos, mo.end())
             pos = mo.end()
             mo = self.master.match(text, pos)
         if pos != len(text):
             raise SyntaxError(f"Lexer: input no reconocido desde pos {pos}: {text[pos:pos+20]!r}")
-        return out
\ No newline at end of file
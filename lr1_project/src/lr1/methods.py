@@ -0,0 +1,195 @@
+
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
+from .grammar import Grammar, Symbol, RHS, END
+from .items import LR1Item
+from .builder import LR1Builder
+from .compiled import CompiledGrammar
+from .cost import Budget
+from .store import StateStore
+from .tables import Tables
+
+# Métodos de construcción de tablas, del más barato al más fuerte. Los tres primeros usan el
+# autómata LR(0) (un estado por núcleo) y sólo difieren en los lookaheads de las reducciones;
+# LR(1) es la colección canónica de LR1Builder. `auto` prueba en este orden y se queda con
+# el primero sin conflictos (los resueltos por precedencia no cuentan).
+METHODS = ('lr0', 'slr', 'lalr', 'lr1')
+METHOD_NAMES = {'lr0': 'LR(0)', 'slr': 'SLR(1)', 'lalr': 'LALR(1)', 'lr1': 'LR(1)'}
+
+Core = Tuple[Symbol, RHS, int]
+
+class LALRBuilder(LR1Builder):
+    # Autómata LR(0) con lookaheads LR(0), SLR(1) o LALR(1). Los estados se devuelven como
+    # conjuntos de LR1Item, un ítem por (núcleo, lookahead), igual que los de LR1Builder, así
+    # que Tables, el serializador y el backend los tratan sin cambios.
+    def __init__(self, G: Grammar | CompiledGrammar, budget: Optional[Budget] = None,
+                 starts: Optional[Sequence[Symbol]] = None):
+        super().__init__(G, budget=budget, starts=starts)
+        self.kernels: List[FrozenSet[Core]] = []
+        self.cores: List[FrozenSet[Core]] = []  # clausura LR(0) de cada núcleo
+        self.trans: Dict[Tuple[int, Symbol], int] = {}
+
+    def _closure0(self, kernel: FrozenSet[Core]) -> FrozenSet[Core]:
+        nt = self.G.nonterminals
+        I = set(kernel)
+        work = list(kernel)
+        while work:
+            A, rhs, dot = work.pop()
+            if dot < len(rhs) and rhs[dot] in nt:
+                for gamma in self._rhs_of(rhs[dot]):
+                    c = (rhs[dot], gamma, 0)
+                    if c not in I:
+                        I.add(c)
+                        work.append(c)
+        return frozenset(I)
+
+    def build_lr0(self) -> Tuple[List[FrozenSet[Core]], Dict[Tuple[int, Symbol], int]]:
+        if self.cores:
+            return self.cores, self.trans
+        meter = self.meter
+        index_of: Dict[FrozenSet[Core], int] = {}
+        q: deque = deque()
+
+        def idx(K: FrozenSet[Core]) -> int:
+            k = index_of.get(K)
+            if k is None:
+                k = index_of[K] = len(self.kernels)
+                self.kernels.append(K)
+                self.cores.append(self._closure0(K))
+                meter.add_state(len(self.cores[k]), len(q))
+                q.append(k)
+            return k
+
+        # Un estado inicial por punto de entrada, en el orden de self.starts (ver entries)
+        for E in self.starts:
+            idx(frozenset({(self.aug_starts[E], (E,), 0)}))
+        while q:
+            i = q.popleft()
+            by_sym: Dict[Symbol, Set[Core]] = {}
+            for A, rhs, dot in self.cores[i]:
+                if dot < len(rhs):
+                    by_sym.setdefault(rhs[dot], set()).add((A, rhs, dot + 1))
+            for X in sorted(by_sym):
+                self.trans[(i, X)] = idx(frozenset(by_sym[X]))
+                meter.transitions += 1
+        return self.cores, self.trans
+
+    # Estados inadecuados para LR(0): una reducción junto a otra reducción o a un shift
+    def lr0_inadequate(self) -> List[int]:
+        cores, trans = self.build_lr0()
+        terms = self.G.terminals
+        shifts = {i for (i, X) in trans if X in terms}
+        bad = []
+        for i, I in enumerate(cores):
+            complete = sum(1 for A, rhs, dot in I if dot == len(rhs))
+            if complete > 1 or (complete and i in shifts):
+                bad.append(i)
+        return bad
+
+    def _expand(self, lookaheads) -> List[FrozenSet[LR1Item]]:
+        return [frozenset(LR1Item(A, rhs, dot, a) for A, rhs, dot in I for a in lookaheads(i, (A, rhs, dot)))
+                for i, I in enumerate(self.cores)]
+
+    # LR(0): se reduce con cualquier terminal
+    def lr0_states(self) -> List[FrozenSet[LR1Item]]:
+        self.build_lr0()
+        augs = set(self.aug_starts.values())
+        terms = sorted(self.G.terminals)
+        return self._expand(lambda i, c: (END,) if c[0] in augs else terms)
+
+    # SLR(1): lookaheads de A -> α·β = FOLLOW(A)
+    def slr_states(self) -> List[FrozenSet[LR1Item]]:
+        self.build_lr0()
+        follow = self.G.follow_sets()
+        for aug in self.aug_starts.values():
+            follow[aug] = {END}
+        return self._expand(lambda i, c: follow.get(c[0], ()))
+
+    # LALR(1) por generación espontánea y propagación de lookaheads (Aho et al., alg. 4.63):
+    # se cierra cada ítem núcleo con un lookahead centinela; lo que no es el centinela nace
+    # en el destino y el centinela indica que el lookahead se propaga desde el núcleo.
+    def lalr_states(self) -> List[FrozenSet[LR1Item]]:
+        self.build_lr0()
+        kernels, trans = self.kernels, self.trans
+        probe = '#'
+        while probe in self.G.terminals:
+            probe += '#'
+        la: Dict[Tuple[int, Core], Set[Symbol]] = {(i, c): set() for i, K in enumerate(kernels) for c in K}
+        links: Dict[Tuple[int, Core], List[Tuple[int, Core]]] = {}
+        for E, k in self.entries.items():
+            la[(k, (self.aug_starts[E], (E,), 0))].add(END)
+        for i, K in enumerate(kernels):
+            for c in K:
+                for it in self.closure({LR1Item(c[0], c[1], c[2], probe)}):
+                    X = it.at_dot()
+                    if X is None:
+                        continue
+                    dst = (trans[(i, X)], (it.lhs, it.rhs, it.dot + 1))
+                    if it.la == probe:
+                        links.setdefault((i, c), []).append(dst)
+                    else:
+                        la[dst].add(it.la)
+        work = deque(k for k, s in la.items() if s)
+        while work:
+            src = work.popleft()
+            for dst in links.get(src, ()):
+                before = len(la[dst])
+                la[dst] |= la[src]
+                if len(la[dst]) != before:
+                    work.append(dst)
+        # La clausura LR(1) de cada núcleo con sus lookaheads da los ítems no núcleo
+        # (incluidas las producciones ε, que sólo aparecen fuera del núcleo)
+        return [frozenset(self.closure({LR1Item(c[0], c[1], c[2], a) for c in K for a in la[(i, c)]}))
+                for i, K in enumerate(kernels)]
+
+@dataclass
+class MethodBuild:
+    method: str  # el método con el que se construyeron las tablas
+    builder: LR1Builder
+    states: List
+    trans: Dict[Tuple[int, Symbol], int]
+    tables: Tables
+    # Métodos probados (en orden) y conflictos sin resolver de cada uno (para LR(0), estados inadecuados)
+    tried: List[Tuple[str, int]] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return METHOD_NAMES[self.method]
+
+# Construye con `method` (uno de METHODS) o, con 'auto', con el más barato que no tenga
+# conflictos, escalando LR(0) -> SLR(1) -> LALR(1) -> LR(1). Si ninguno alcanza se devuelven
+# las tablas LR(1) con sus conflictos. `store` y `track_items` sólo aplican a LR(1).
+def build_tables(G: Grammar | CompiledGrammar, method: str = 'auto', starts: Optional[Sequence[Symbol]] = None,
+                 budget: Optional[Budget] = None, track_items: bool = False,
+                 store: Optional[StateStore] = None) -> MethodBuild:
+    if method != 'auto' and method not in METHODS:
+        raise ValueError(f"Método desconocido: {method} (opciones: auto, {', '.join(METHODS)})")
+    tried: List[Tuple[str, int]] = []
+    if method != 'lr1':
+        lb = LALRBuilder(G, budget=budget, starts=starts)
+        lb.build_lr0()
+        steps = ('lr0', 'slr', 'lalr') if method == 'auto' else (method,)
+        for m in steps:
+            if m == 'lr0' and method == 'auto':
+                # Adecuado para LR(0): se emiten igual los lookaheads SLR (mismo autómata,
+                # los errores se detectan antes)
+                bad = lb.lr0_inadequate()
+                if bad:
+                    tried.append(('lr0', len(bad)))
+                    continue
+                states = lb.slr_states()
+            else:
+                states = getattr(lb, f"{m}_states")()
+            T = Tables(lb.G, states, lb.trans, lb.aug_start, lb.entries)
+            T.method = m
+            tried.append((m, len(T.conflicts)))
+            if not T.conflicts or method != 'auto':
+                return MethodBuild(m, lb, states, lb.trans, T, tried)
+        G = lb.G
+    builder = LR1Builder(G, track_items=track_items, budget=budget, starts=starts)
+    states, trans = builder.build_canonical_collection(store)
+    T = Tables(builder.G, states, trans, builder.aug_start, builder.entries)
+    tried.append(('lr1', len(T.conflicts)))
+    return MethodBuild('lr1', builder, states, trans, T, tried)
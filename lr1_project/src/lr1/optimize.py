@@ -0,0 +1,260 @@
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .grammar import Grammar, Symbol, RHS, Prod, EPS
+from .ast import Node
+
+PASSES = ('useless', 'inline', 'factor')
+# 'factor' no va por omisión: el autómata LR ya comparte los prefijos comunes y factorizarlos
+# sólo agrega no terminales y estados (calc.txt pasa de 30 a 34 estados LR(1))
+DEFAULT_PASSES = ('useless', 'inline')
+
+def _body(rhs: RHS) -> RHS:
+    return tuple() if rhs == (EPS,) else rhs
+
+def _rhs(body: RHS) -> RHS:
+    return body if body else (EPS,)
+
+def _node_prod(node: Node) -> Prod:
+    return (node.sym, _rhs(tuple(ch.sym for ch in node.children)))
+
+@dataclass
+class _InlineStep:
+    # nueva producción -> (posición, no terminal expandido, largo de su cuerpo)
+    new_prods: Dict[Prod, Tuple[int, Symbol, int]] = field(default_factory=dict)
+
+    def undo(self, node: Node) -> Optional[Node]:
+        info = self.new_prods.get(_node_prod(node))
+        if info is None:
+            return None
+        i, A, n = info
+        inner = Node(A, node.children[i:i + n])
+        node.children = node.children[:i] + [inner] + node.children[i + n:]
+        return inner
+
+@dataclass
+class _FactorStep:
+    lhs: Symbol
+    tail: Symbol
+
+    def undo(self, node: Node) -> Optional[Node]:
+        if node.sym == self.lhs and node.children and node.children[-1].sym == self.tail:
+            node.children = node.children[:-1] + node.children[-1].children
+        return None
+
+class OptimizedGrammar:
+    def __init__(self, original: Grammar, grammar: Grammar, steps: List, origins: Dict[Prod, Tuple[Prod, ...]],
+                 removed: Set[Symbol], inlined: Optional[Set[Symbol]] = None, duplicates: Optional[List[Prod]] = None):
+        self.original = original
+        self.grammar = grammar
+        self.steps = steps
+        self.origins = origins
+        self.removed = removed  # no terminales inútiles (improductivos o inalcanzables)
+        self.inlined = inlined or set()  # no terminales expandidos en sus usos
+        self.duplicates = duplicates or []  # alternativas repetidas que se descartaron
+
+    # Producciones de la gramática original que representa una reducción de la optimizada
+    def origin_of(self, prod: Prod) -> Tuple[Prod, ...]:
+        return self.origins.get(prod, ())
+
+    def _undo_from(self, node: Node, upto: int):
+        for k in range(upto - 1, -1, -1):
+            inner = self.steps[k].undo(node)
+            if inner is not None:
+                self._undo_from(inner, k)
+
+    # Reescribe (in place) un árbol de la gramática optimizada en términos de la original
+    def restore_tree(self, root: Node) -> Node:
+        order: List[Node] = []
+        stack = [root]
+        while stack:
+            n = stack.pop()
+            order.append(n)
+            stack.extend(n.children)
+        for n in reversed(order):
+            self._undo_from(n, len(self.steps))
+        return root
+
+    # Compara colección canónica y tablas antes/después (construye ambas)
+    def report(self) -> Dict[str, Tuple[int, int]]:
+        from .builder import LR1Builder
+        from .tables import Tables
+        out: Dict[str, List[int]] = {}
+        for G in (self.original, self.grammar):
+            # self.grammar puede venir aumentada (S' -> S) si ya se construyeron sus tablas
+            augs = set(G.aug_starts.values())
+            H = G.copy()
+            builder = LR1Builder(H)
+            states, trans = builder.build_canonical_collection()
+            T = Tables(H, states, trans, builder.aug_start)
+            for key, val in (
+                ('nonterminals', len(G.nonterminals - augs)),
+                ('productions', sum(1 for A, _ in G.productions if A not in augs)),
+                ('states', len(states)),
+                ('items', sum(len(I) for I in states)),
+                ('action', len(T.ACTION)),
+                ('goto', len(T.GOTO)),
+                ('conflicts', len(T.conflicts)),
+            ):
+                out.setdefault(key, []).append(val)
+        return {k: (v[0], v[1]) for k, v in out.items()}
+
+def _fresh(base: Symbol, taken: Set[Symbol]) -> Symbol:
+    k = 1
+    while f"{base}_{k}" in taken:
+        k += 1
+    return f"{base}_{k}"
+
+class _Rewriter:
+    def __init__(self, G: Grammar):
+        self.start = G.start
+        self.terminals = set(G.terminals)
+        # Una alternativa repetida no cambia el lenguaje; las pasadas suponen producciones únicas
+        self.prods: List[Prod] = []
+        self.duplicates: List[Prod] = []
+        seen: Set[Prod] = set()
+        for A, rhs in G.productions:
+            p = (A, tuple(rhs))
+            if p in seen:
+                self.duplicates.append(p)
+            else:
+                seen.add(p)
+                self.prods.append(p)
+        self.nonterminals = set(G.nonterminals)
+        self.origins: Dict[Prod, Tuple[Prod, ...]] = {p: (p,) for p in self.prods}
+        self.steps: List = []
+        self.removed: Set[Symbol] = set()
+        self.inlined: Set[Symbol] = set()
+        self.prec = dict(G.prec)
+        self.prod_prec = dict(G.prod_prec)
+
+    def _drop(self, keep: Set[Symbol], into: Optional[Set[Symbol]] = None):
+        gone = self.nonterminals - keep
+        (self.removed if into is None else into).update(gone)
+        self.nonterminals = set(keep)
+        self.prods = [(A, rhs) for A, rhs in self.prods if A in keep and all(s not in gone for s in rhs)]
+
+    def remove_useless(self):
+        productive: Set[Symbol] = set()
+        changed = True
+        while changed:
+            changed = False
+            for A, rhs in self.prods:
+                if A not in productive and all(s in self.terminals or s == EPS or s in productive for s in rhs):
+                    productive.add(A)
+                    changed = True
+        if self.start not in productive:
+            raise ValueError(f"El símbolo inicial {self.start} no genera ninguna cadena")
+        self._drop(productive)
+
+        reachable = {self.start}
+        work = [self.start]
+        while work:
+            A = work.pop()
+            for B, rhs in self.prods:
+                if B != A:
+                    continue
+                for s in rhs:
+                    if s in self.nonterminals and s not in reachable:
+                        reachable.add(s)
+                        work.append(s)
+        self._drop(reachable)
+
+    def _sites(self, A: Symbol) -> List[Tuple[int, int]]:
+        return [(k, i) for k, (_, rhs) in enumerate(self.prods) for i, s in enumerate(rhs) if s == A]
+
+    def _inline_site(self, k: int, i: int, alts: List[RHS]) -> bool:
+        B, rhs = self.prods[k]
+        A = rhs[i]
+        new = [(B, _rhs(rhs[:i] + _body(g) + rhs[i + 1:])) for g in alts]
+        existing = set(self.prods)
+        if len(set(new)) != len(new) or any(p in existing for p in new):
+            return False
+        step = _InlineStep()
+        for (_, nrhs), g in zip(new, alts):
+            step.new_prods[(B, nrhs)] = (i, A, len(_body(g)))
+        base = self.origins.pop(self.prods[k])
+        for p, g in zip(new, alts):
+            self.origins[p] = base + self.origins[(A, g)]
+        self.prods[k:k + 1] = new
+        self.steps.append(step)
+        return True
+
+    def inline(self):
+        changed = True
+        while changed:
+            changed = False
+            for A in dict.fromkeys(lhs for lhs, _ in self.prods):
+                if A == self.start or A not in self.nonterminals:
+                    continue
+                alts = [rhs for lhs, rhs in self.prods if lhs == A]
+                if any(A in g for g in alts):
+                    continue
+                sites = self._sites(A)
+                unit = len(alts) == 1 and len(_body(alts[0])) <= 1
+                if not sites or not (unit or len(sites) == 1):
+                    continue
+                while sites and self._inline_site(*sites[0], alts):
+                    sites = self._sites(A)
+                if not sites:
+                    for g in alts:
+                        self.origins.pop((A, g), None)
+                    self._drop(self.nonterminals - {A}, self.inlined)
+                    changed = True
+
+    def left_factor(self):
+        changed = True
+        while changed:
+            changed = False
+            for A in sorted(self.nonterminals):
+                groups: Dict[Symbol, List[RHS]] = {}
+                for lhs, rhs in self.prods:
+                    if lhs == A and _body(rhs):
+                        groups.setdefault(rhs[0], []).append(rhs)
+                group = next((g for g in groups.values() if len(g) > 1), None)
+                if group is None:
+                    continue
+                n = 1
+                while all(len(g) > n for g in group) and len({g[n] for g in group}) == 1:
+                    n += 1
+                prefix = group[0][:n]
+                tail = _fresh(A, self.nonterminals | self.terminals | self.removed | self.inlined)
+                self.nonterminals.add(tail)
+                head = (A, prefix + (tail,))
+                k = self.prods.index((A, group[0]))
+                members = set(group)
+                rest = [p for p in self.prods if not (p[0] == A and p[1] in members)]
+                tails = [(tail, _rhs(g[n:])) for g in group]
+                for g, t in zip(group, tails):
+                    self.origins[t] = self.origins.pop((A, g))
+                self.origins[head] = ()
+                rest[k:k] = [head]
+                self.prods = rest + tails
+                self.steps.append(_FactorStep(A, tail))
+                changed = True
+                break
+
+    def grammar(self) -> Grammar:
+        H = Grammar(self.start, self.terminals, self.nonterminals)
+        for A, rhs in self.prods:
+            H.add(A, rhs)
+        H.prec = dict(self.prec)
+        H.prod_prec = {p: s for p, s in self.prod_prec.items() if p[1] in H.by_lhs.get(p[0], [])}
+        return H
+
+def optimize_grammar(G: Grammar, passes: Iterable[str] = DEFAULT_PASSES) -> OptimizedGrammar:
+    passes = tuple(passes)
+    for p in passes:
+        if p not in PASSES:
+            raise ValueError(f"Pasada desconocida: {p}")
+    rw = _Rewriter(G)
+    if 'useless' in passes:
+        rw.remove_useless()
+    if 'inline' in passes:
+        rw.inline()
+    if 'factor' in passes:
+        rw.left_factor()
+    if 'useless' in passes and rw.steps:
+        rw.remove_useless()
+    return OptimizedGrammar(G.copy(), rw.grammar(), rw.steps, rw.origins, rw.removed, rw.inlined, rw.duplicates)
@@ -0,0 +1,237 @@
+
+from __future__ import annotations
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from .grammar import EPS, END
+from .tables import Action, Tables
+
+# Tablas empaquetadas en un archivo que se abre con mmap de sólo lectura: varios procesos
+# (p. ej. workers de uvicorn) que abren el mismo archivo comparten sus páginas en memoria.
+#
+# Formato: b'LR1P\x01' + 3 bytes de relleno, largo del encabezado (u32 little-endian),
+# encabezado JSON (símbolos, producciones, reglas de lexer, ...), relleno hasta múltiplo
+# de 4 y dos matrices densas de int32 en el orden de bytes de la máquina que las escribió:
+# ACTION[n_states x n_terminales] y GOTO[n_states x n_no_terminales].
+# Celda ACTION: 0 error, (j << 2) | 1 shift j, (p << 2) | 2 reduce prods[p], 3 accept.
+# Celda GOTO: -1 si no hay transición.
+
+_MAGIC = b'LR1P\x01\x00\x00\x00'
+_SHIFT, _REDUCE, _ACCEPT = 1, 2, 3
+
+def _align4(n: int) -> int:
+    return (n + 3) & ~3
+
+def pack_tables(tables: Tables, path: str, lex_rules: Sequence[Tuple[str, str, bool]] = (),
+                meta: Optional[Dict[str, Any]] = None):
+    G = tables.G
+    terms = sorted(set(G.terminals) | {END})
+    nonterms = sorted(G.nonterminals)
+    term_id = {a: k for k, a in enumerate(terms)}
+    nt_id = {A: k for k, A in enumerate(nonterms)}
+    prods = sorted({act.value for act in tables.ACTION.values() if act.kind == 'reduce'})  # type: ignore
+    prod_id = {p: k for k, p in enumerate(prods)}
+    n = len(tables.states)
+
+    action = array('i', bytes(4 * n * len(terms)))
+    for (s, a), act in tables.ACTION.items():
+        if act.kind == 'shift':
+            code = (int(act.value) << 2) | _SHIFT  # type: ignore
+        elif act.kind == 'reduce':
+            code = (prod_id[act.value] << 2) | _REDUCE  # type: ignore
+        else:
+            code = _ACCEPT
+        action[s * len(terms) + term_id[a]] = code
+    goto = array('i', [-1]) * (n * len(nonterms))
+    for (s, A), j in tables.GOTO.items():
+        goto[s * len(nonterms) + nt_id[A]] = j
+
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'n_states': n,
+        'start': G.start,
+        'aug_start': tables.aug_start,
+        'aug_symbols': sorted(tables.aug_symbols),
+        'method': tables.method,
+        'entries': tables.entries,
+        'terminals': terms,
+        'nonterminals': nonterms,
+        'prods': [[lhs, list(rhs)] for lhs, rhs in prods],
+        'lex_rules': [list(r) for r in lex_rules],
+        'conflicts': [[c[0], c[1], c[2]] for c in tables.conflicts],
+        'resolved': [[r[0], r[1], r[2]] for r in tables.resolved],
+        'meta': meta or {},
+    }, ensure_ascii=False).encode('utf-8')
+    head = _MAGIC + struct.pack('<I', len(header)) + header
+    head += b'\x00' * (_align4(len(head)) - len(head))
+
+    # Escritura atómica: quien abra `path` ve el archivo viejo o el nuevo completo
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(head)
+        action.tofile(f)
+        goto.tofile(f)
+    os.replace(tmp, path)
+
+class _ActionView:
+    # ACTION de sólo lectura con la interfaz de dict que usa el Parser: get((s, a)), keys(), ...
+    def __init__(self, T: 'PackedTables'):
+        self._T = T
+
+    def get(self, key: Tuple[int, str], default=None):
+        s, a = key
+        T = self._T
+        t = T.term_id.get(a)
+        if t is None or not 0 <= s < T.n_states:
+            return default
+        code = T._action[s * T._width + t]
+        if not code:
+            return default
+        kind = code & 3
+        if kind == _SHIFT:
+            return Action('shift', code >> 2)
+        if kind == _REDUCE:
+            return T._reduce[code >> 2]
+        return T._accept
+
+    def __getitem__(self, key):
+        act = self.get(key)
+        if act is None:
+            raise KeyError(key)
+        return act
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def items(self) -> Iterator[Tuple[Tuple[int, str], Action]]:
+        T = self._T
+        for s in range(T.n_states):
+            for a in T.terminals:
+                act = self.get((s, a))
+                if act is not None:
+                    yield (s, a), act
+
+    def keys(self):
+        return (k for k, _ in self.items())
+
+    def values(self):
+        return (v for _, v in self.items())
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self) -> int:
+        return sum(1 for c in self._T._action if c)
+
+class _GotoView:
+    def __init__(self, T: 'PackedTables'):
+        self._T = T
+
+    def get(self, key: Tuple[int, str], default=None):
+        s, A = key
+        T = self._T
+        k = T.nt_id.get(A)
+        if k is None or not 0 <= s < T.n_states:
+            return default
+        j = T._goto[s * len(T.nonterminals) + k]
+        return default if j < 0 else j
+
+    def __getitem__(self, key):
+        j = self.get(key)
+        if j is None:
+            raise KeyError(key)
+        return j
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def items(self) -> Iterator[Tuple[Tuple[int, str], int]]:
+        T = self._T
+        for s in range(T.n_states):
+            for A in T.nonterminals:
+                j = self.get((s, A))
+                if j is not None:
+                    yield (s, A), j
+
+    def keys(self):
+        return (k for k, _ in self.items())
+
+    def values(self):
+        return (v for _, v in self.items())
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self) -> int:
+        return sum(1 for j in self._T._goto if j >= 0)
+
+class PackedTables:
+    # Lado lector de pack_tables: expone ACTION/GOTO/unit_goto/is_unit/expected como Tables,
+    # así que Parser(PackedTables(path)) funciona igual (sin estados ni ítems: sólo las tablas).
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(_MAGIC)] != _MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: no es un archivo de tablas LR1P")
+        (hlen,) = struct.unpack_from('<I', self._mm, len(_MAGIC))
+        start = len(_MAGIC) + 4
+        header = json.loads(self._mm[start:start + hlen].decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            self._mm.close()
+            raise ValueError(f"{path}: tablas empaquetadas con otro orden de bytes ({header['byteorder']})")
+        self.header = header
+        self.n_states: int = header['n_states']
+        self.start: str = header['start']
+        self.aug_start: str = header['aug_start']
+        self.aug_symbols = set(header.get('aug_symbols', [self.aug_start]))
+        self.entries: Dict[str, int] = header.get('entries', {self.start: 0})
+        self.method: str = header.get('method', 'lr1')
+        self.terminals: List[str] = header['terminals']
+        self.nonterminals: List[str] = header['nonterminals']
+        self.prods = [(lhs, tuple(rhs)) for lhs, rhs in header['prods']]
+        self.lex_rules = [tuple(r) for r in header['lex_rules']]
+        self.conflicts = [tuple(c) for c in header['conflicts']]
+        self.resolved = [tuple(r) for r in header['resolved']]
+        self.meta: Dict[str, Any] = header['meta']
+        self.term_id = {a: k for k, a in enumerate(self.terminals)}
+        self.nt_id = {A: k for k, A in enumerate(self.nonterminals)}
+        self._width = len(self.terminals)
+
+        off = _align4(start + hlen)
+        n_action = self.n_states * len(self.terminals)
+        n_goto = self.n_states * len(self.nonterminals)
+        view = memoryview(self._mm)
+        self._action = view[off:off + 4 * n_action].cast('i')
+        self._goto = view[off + 4 * n_action:off + 4 * (n_action + n_goto)].cast('i')
+        view.release()
+        self._reduce = [Action('reduce', p) for p in self.prods]
+        self._accept = Action('accept')
+        self.ACTION = _ActionView(self)
+        self.GOTO = _GotoView(self)
+        self.unit_goto: Dict = {}
+        self.unit_keep: set = set()
+
+    def is_unit(self, prod) -> bool:
+        lhs, rhs = prod
+        return len(rhs) == 1 and rhs[0] != EPS and prod not in self.unit_keep
+
+    def expected(self, s: int) -> List[str]:
+        row = self._action[s * self._width:(s + 1) * self._width]
+        return [a for a, code in zip(self.terminals, row) if code]
+
+    def close(self):
+        self._action.release()
+        self._goto.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
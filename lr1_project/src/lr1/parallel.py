@@ -0,0 +1,400 @@
+
+from __future__ import annotations
+import copy
+import io
+import mmap
+import os
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from .ast import Node
+from .grammar import Grammar, Symbol, END, EPS
+from .builder import LR1Builder
+from .tables import Tables
+from .parser import Parser, ParseError
+from .lexer import Lexer
+from .packed import PackedTables
+from .serialize import read_binary, write_binary
+
+Token = Tuple[str, str]
+
+class ParseErrors(SyntaxError):
+    # Errores de todas las unidades que fallaron, en orden de entrada
+    def __init__(self, errors: List[ParseError]):
+        super().__init__("; ".join(str(e) for e in errors))
+        self.errors = errors
+
+    def __reduce__(self):
+        return (ParseErrors, (self.errors,))
+
+# Un solo autómata con un punto de entrada por símbolo de `starts` (G no se modifica)
+def _build(G: Grammar, starts: Sequence[Symbol]) -> Tables:
+    builder = LR1Builder(G.compile() if isinstance(G, Grammar) else G, starts=starts)
+    states, trans = builder.build_canonical_collection()
+    return Tables(builder.G, states, trans, builder.aug_start, builder.entries)
+
+# Copia liviana para enviar a los workers: el parser sólo usa ACTION/GOTO
+def _shareable(tables: Tables) -> Tables:
+    T = copy.copy(tables)
+    T.states = []
+    T.trans = {}
+    return T
+
+_worker_parser: Optional[Parser] = None
+_worker_start: Optional[Symbol] = None
+
+def _init_worker(tables: Tables, build_tree: bool, start: Symbol):
+    global _worker_parser, _worker_start
+    _worker_parser = Parser(tables, build_tree=build_tree)
+    _worker_start = start
+
+# units: [(offset del primer token, tokens)] -> [(nodo, error con pos absoluta)]
+def _parse_units(units: List[Tuple[int, List[Token]]]) -> List[Tuple[Optional[Node], Optional[ParseError]]]:
+    out: List[Tuple[Optional[Node], Optional[ParseError]]] = []
+    for offset, toks in units:
+        try:
+            out.append((_worker_parser.parse(toks, start=_worker_start), None))  # type: ignore
+        except ParseError as e:
+            out.append((None, ParseError(offset + e.pos, e.token, e.expected)))
+    return out
+
+class ParallelParser:
+    # Parte el stream en unidades que terminan en un terminal de sincronización, parsea
+    # cada unidad desde el punto de entrada `sub_start` en un pool de procesos y luego cose
+    # los subárboles desde el símbolo inicial, empujando cada unidad como `sub_start`. Las
+    # dos entradas comparten un solo juego de tablas. Si el cosido falla (fronteras no
+    # seguras) se cae al parseo secuencial. `tables`: tablas ya construidas con los puntos de
+    # entrada G.start y sub_start (p. ej. de la cache del daemon); si no, se construyen.
+    def __init__(self, G: Grammar, sync: Iterable[Symbol], sub_start: Symbol,
+                 workers: Optional[int] = None, build_tree: bool = True, tables: Optional[Tables] = None):
+        if sub_start not in G.nonterminals:
+            raise ValueError(f"No terminal desconocido: {sub_start}")
+        if tables is not None and not {G.start, sub_start} <= set(tables.entries):
+            raise ValueError(f"Las tablas no tienen puntos de entrada para {G.start} y {sub_start}")
+        self.sync = set(sync)
+        self.sub_start = sub_start
+        self.build_tree = build_tree
+        self.tables = tables if tables is not None else _build(G, [G.start, sub_start])
+        self.start_state = self.tables.entries[G.start]
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(_shareable(self.tables), self.build_tree, self.sub_start),
+            )
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def split(self, tokens: Sequence[Token]) -> Tuple[List[Tuple[int, List[Token]]], List[Token]]:
+        units: List[Tuple[int, List[Token]]] = []
+        start = 0
+        for i, (t, _) in enumerate(tokens):
+            if t in self.sync:
+                units.append((start, list(tokens[start:i + 1])))
+                start = i + 1
+        return units, list(tokens[start:])
+
+    def parse(self, tokens: Sequence[Token | str]) -> Optional[Node]:
+        toks: List[Token] = [(t, t) if isinstance(t, str) else (t[0], t[1]) for t in tokens]
+        units, tail = self.split(toks)
+        if len(units) < 2:
+            return Parser(self.tables, build_tree=self.build_tree).parse(toks)
+
+        size = max(1, len(units) // (self.workers * 4))
+        chunks = [units[k:k + size] for k in range(0, len(units), size)]
+        results: List[Tuple[Optional[Node], Optional[ParseError]]] = []
+        for part in self._get_pool().map(_parse_units, chunks):
+            results.extend(part)
+
+        errors = [e for _, e in results if e is not None]
+        if not errors:
+            stitched = self._stitch(units, [n for n, _ in results], tail)
+            if stitched is not False:
+                return stitched  # type: ignore
+        try:
+            return Parser(self.tables, build_tree=self.build_tree).parse(toks)
+        except ParseError as e:
+            raise ParseErrors(errors or [e])
+
+    # Parseo LR con las tablas completas donde cada unidad ya parseada se empuja vía
+    # GOTO[s, sub_start] en cuanto el parser decide desplazar su primer token.
+    def _stitch(self, units, unit_nodes, tail: List[Token]):
+        ACTION, GOTO = self.tables.ACTION, self.tables.GOTO
+        pieces = [(toks[0][0], node) for (_, toks), node in zip(units, unit_nodes)]
+        pieces += [(t, Node(t, [], lx)) for t, lx in tail]
+        pieces.append((END, None))
+        states: List[int] = [self.start_state]
+        nodes: List[Optional[Node]] = []
+        n_units = len(units)
+        for k, (la, piece) in enumerate(pieces):
+            while True:
+                s = states[-1]
+                act = ACTION.get((s, la))
+                if not act:
+                    return False
+                if act.kind == 'reduce':
+                    lhs, rhs = act.value  # type: ignore
+                    n = 0 if rhs == (EPS,) else len(rhs)
+                    children = nodes[len(nodes) - n:] if n else []
+                    if n:
+                        del nodes[-n:]
+                        del states[-n:]
+                    j = GOTO.get((states[-1], lhs))
+                    if j is None:
+                        return False
+                    states.append(j)
+                    nodes.append(Node(lhs, children) if self.build_tree else None)  # type: ignore
+                elif act.kind == 'accept':
+                    return nodes[0] if self.build_tree else None
+                else:
+                    if k < n_units:
+                        j = GOTO.get((s, self.sub_start))
+                        if j is None:
+                            return False
+                    else:
+                        j = int(act.value)  # type: ignore
+                    states.append(j)
+                    nodes.append(piece)
+                    break
+        return False
+
+# ---------------------------------------------------------------------------
+# Lexing paralelo especulativo de archivos grandes
+
+# (terminal | None si se omite, lexema, inicio, fin); offsets en bytes del archivo
+LexItem = Tuple[Optional[str], str, int, int]
+
+def _char_boundary(mm, size: int, p: int) -> int:
+    while 0 < p < size and (mm[p] & 0xC0) == 0x80:
+        p -= 1
+    return p
+
+# Inicio especulado de un trozo: justo después del siguiente salto de línea (los
+# lexers suelen resincronizar ahí); si no hay uno cerca, el siguiente carácter UTF-8.
+def _guess_start(mm, size: int, p: int, lookahead: int = 4096) -> int:
+    nl = mm.find(b'\n', p, min(size, p + lookahead))
+    if nl != -1:
+        return nl + 1
+    while p < size and (mm[p] & 0xC0) == 0x80:
+        p += 1
+    return p
+
+# Lexea desde el byte `start` los tokens que empiezan antes de `stop`, decodificando una
+# ventana que crece si un token puede quedar cortado en su borde. Con `sync` (inicio ->
+# índice) se detiene en el primer token que empieza donde empieza uno ya conocido.
+# Devuelve (tokens, fin, posición del error o None, índice de sincronización o None).
+def _lex_range(mm, size: int, lexer: Lexer, start: int, stop: int,
+               sync: Optional[Dict[int, int]] = None, strict: bool = True,
+               margin: int = 4096, max_margin: int = 1 << 20):
+    master, classify = lexer.master, lexer.classify
+    out: List[LexItem] = []
+    pos = start
+    while pos < stop:
+        W = _char_boundary(mm, size, min(size, stop + margin))
+        text = mm[pos:W].decode('utf-8')
+        ascii_only = len(text) == W - pos
+        i, b = 0, pos
+        grow = False
+        while b < stop:
+            if sync is not None and b in sync and b != start:
+                return out, b, None, sync[b]
+            mo = master.match(text, i)
+            if mo is None or (mo.end() == len(text) and W < size):
+                grow = W < size
+                break
+            name = mo.lastgroup
+            lexeme = mo.group(name)
+            if ascii_only:
+                e = pos + mo.end()
+            elif lexeme.isascii():
+                e = b + len(lexeme)
+            else:
+                e = b + len(lexeme.encode('utf-8'))
+            out.append((classify(name, lexeme), lexeme, b, e))
+            i, b = mo.end(), e
+        pos = b
+        if b >= stop:
+            break
+        if not grow or (not strict and margin >= max_margin):
+            if strict:
+                snippet = mm[b:b + 20].decode('utf-8', 'replace')
+                raise SyntaxError(f"Lexer: input no reconocido desde byte {b}: {snippet!r}")
+            return out, b, b, None
+        margin *= 2
+    return out, pos, None, None
+
+_worker_lex: Optional[Tuple[Lexer, str]] = None
+
+def _init_lex_worker(lexer: Lexer, path: str):
+    global _worker_lex
+    _worker_lex = (lexer, path)
+
+def _lex_chunk(bounds: Tuple[int, int]):
+    lexer, path = _worker_lex  # type: ignore
+    start, stop = bounds
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        out, end, err, _ = _lex_range(mm, len(mm), lexer, start, stop, strict=False)
+    return out, end, err
+
+# Tokeniza un archivo (UTF-8) en paralelo. Cada worker lexea su trozo desde un inicio
+# especulado; al unir, el trozo k se acepta desde el primer token que empieza justo donde
+# terminó el k-1 (el lexer no tiene más estado que la posición, así que desde ahí el
+# resultado es idéntico al secuencial). Si no coincide se re-lexea desde esa posición
+# hasta resincronizar con los tokens del trozo. Devuelve (terminal, lexema) sin los
+# omitidos, o (terminal, lexema, byte inicio, byte fin) con `offsets=True`.
+def tokenize_file(lexer: Lexer, path: str, workers: Optional[int] = None,
+                  chunk_size: Optional[int] = None, offsets: bool = False) -> List[tuple]:
+    workers = workers or os.cpu_count() or 1
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk = chunk_size or max(1 << 20, size // (workers * 4) + 1)
+            starts = [0]
+            while starts[-1] + chunk < size:
+                g = _guess_start(mm, size, starts[-1] + chunk)
+                if g >= size:
+                    break
+                starts.append(max(g, starts[-1] + 1))
+            bounds = list(zip(starts, starts[1:] + [size]))
+
+            if len(bounds) == 1 or workers == 1:
+                items, _, _, _ = _lex_range(mm, size, lexer, 0, size)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_lex_worker,
+                                         initargs=(lexer, path)) as pool:
+                    results = list(pool.map(_lex_chunk, bounds))
+                items = _reconcile(mm, size, lexer, bounds, results)
+
+    if offsets:
+        return [(t, lx, s, e) for t, lx, s, e in items if t is not None]
+    return [(t, lx) for t, lx, _, _ in items if t is not None]
+
+def _reconcile(mm, size: int, lexer: Lexer, bounds, results) -> List[LexItem]:
+    items: List[LexItem] = []
+    pos = 0
+    for (g, e), (toks, end, err) in zip(bounds, results):
+        if pos >= e:
+            continue  # el último token del trozo anterior ya cubre este trozo completo
+        chunk_starts = [t[2] for t in toks]
+        j = bisect_left(chunk_starts, pos)
+        if j == len(toks) or chunk_starts[j] != pos:
+            # Especulación incorrecta: re-lexear hasta coincidir con un inicio del trozo
+            sync = {s: k for k, s in enumerate(chunk_starts) if s > pos}
+            fix, pos, _, j = _lex_range(mm, size, lexer, pos, e, sync=sync)
+            items.extend(fix)
+            if j is None:
+                continue
+        items.extend(toks[j:])
+        pos = end
+        if err is not None:
+            fix, pos, _, _ = _lex_range(mm, size, lexer, pos, e)
+            items.extend(fix)
+    if pos < size:
+        fix, pos, _, _ = _lex_range(mm, size, lexer, pos, size)
+        items.extend(fix)
+    return items
+
+# ---------------------------------------------------------------------------
+# Lotes: muchas entradas independientes (programas o listas de tokens) contra las mismas
+# tablas empaquetadas (lr1.packed). Cada proceso abre el archivo una vez con mmap y lo
+# reutiliza entre lotes; los árboles vuelven en el binario LR1T (sin recursión al picklear).
+
+BatchInput = Union[str, Sequence[Union[Token, str]]]
+BatchResult = Tuple[Optional[Node], Optional[SyntaxError]]
+
+_batch_tables: 'OrderedDict[str, Tuple[Parser, Parser, Optional[Lexer]]]' = OrderedDict()
+_batch_lock = threading.Lock()
+BATCH_TABLES_CACHE = 16
+
+# Las tablas desalojadas no se cierran a mano (otro hilo puede estar usándolas): el mmap se
+# libera cuando ya nadie las referencia.
+def _batch_parsers(path: str) -> Tuple[Parser, Parser, Optional[Lexer]]:
+    with _batch_lock:
+        hit = _batch_tables.get(path)
+        if hit is None:
+            T = PackedTables(path)
+            hit = (Parser(T, build_tree=True), Parser(T, build_tree=False),
+                   Lexer(T.lex_rules) if T.lex_rules else None)
+            _batch_tables[path] = hit
+            while len(_batch_tables) > BATCH_TABLES_CACHE:
+                _batch_tables.popitem(last=False)
+        _batch_tables.move_to_end(path)
+        return hit
+
+# Un programa (str) pasa por el lexer de la gramática; una lista se toma como tokens
+def _parse_input(path: str, inp: BatchInput, build_tree: bool) -> BatchResult:
+    with_tree, without_tree, lexer = _batch_parsers(path)
+    try:
+        if isinstance(inp, str):
+            if lexer is None:
+                raise SyntaxError('La gramática no tiene reglas LEXER; enviar tokens')
+            toks = lexer.tokenize(inp)
+        else:
+            toks = inp  # type: ignore
+        return (with_tree if build_tree else without_tree).parse(toks), None
+    except SyntaxError as e:
+        return None, e
+
+def _parse_batch(path: str, inputs: List[BatchInput], build_tree: bool) -> List[Tuple[Optional[bytes], Optional[SyntaxError]]]:
+    out: List[Tuple[Optional[bytes], Optional[SyntaxError]]] = []
+    for inp in inputs:
+        node, err = _parse_input(path, inp, build_tree)
+        if node is None:
+            out.append((None, err))
+        else:
+            buf = io.BytesIO()
+            write_binary(node, buf)
+            out.append((buf.getvalue(), None))
+    return out
+
+class BatchParser:
+    # Pool de procesos reutilizable entre lotes (y entre gramáticas: la tarea lleva la ruta
+    # del archivo empaquetado). Lotes de menos de `min_parallel` entradas se parsean en el
+    # proceso actual, donde levantar el pool no compensa.
+    def __init__(self, workers: Optional[int] = None, min_parallel: int = 32):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def parse_many(self, packed_path: str, inputs: Sequence[BatchInput], build_tree: bool = False) -> List[BatchResult]:
+        inputs = list(inputs)
+        if self.workers <= 1 or len(inputs) < self.min_parallel:
+            return [_parse_input(packed_path, inp, build_tree) for inp in inputs]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        size = max(1, len(inputs) // (self.workers * 4))
+        chunks = [inputs[k:k + size] for k in range(0, len(inputs), size)]
+        results: List[BatchResult] = []
+        for part in self._pool.map(_parse_batch, [packed_path] * len(chunks), chunks, [build_tree] * len(chunks)):
+            for blob, err in part:
+                results.append((None if blob is None else read_binary(io.BytesIO(blob)), err))
+        return results
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
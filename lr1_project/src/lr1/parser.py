@@ -1,35 +1,125 @@
 
 from __future__ import annotations
-from typing import List, Tuple, Optional
+import hashlib
+import io
+import json
+import pickle
+import struct
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Tuple, Optional
 from .tables import Tables
 from .ast import Node
 from .grammar import END, EPS
+from .actions import SemanticActions
+from .serialize import read_binary, write_binary
+
+class ParseError(SyntaxError):
+    def __init__(self, pos: int, token: str, expected: List[str]):
+        super().__init__(f"Unexpected token '{token}' at pos {pos}. Expected: {expected}")
+        self.pos = pos
+        self.token = token
+        self.expected = expected
+
+    def __reduce__(self):
+        return (ParseError, (self.pos, self.token, self.expected))
+
+# Instantánea de un parseo en curso (Parser.stream), tomada justo antes de consumir el token
+# `pos`: pila de estados, pila de nodos (o de valores, con evaluate) y posición en la entrada.
+# Con tokens de Lexer.scan, `offset` es dónde empieza ese token en el texto: el lexer no
+# guarda estado entre tokens, así que Lexer.scan(text, offset) es su instantánea.
+@dataclass
+class ParserCheckpoint:
+    states: List[int]
+    stack: List[Any]
+    pos: int  # tokens ya consumidos (no omitidos) desde el inicio de la entrada
+    offset: Optional[int] = None  # offset en el texto del token `pos`
+    mode: str = 'tree'  # 'tree' (nodos) | 'eval' (valores) | 'none' (sin árbol)
+    # Parser.signature() de las tablas: sólo se retoma con las mismas tablas y opciones
+    signature: str = ''
+    meta: dict = field(default_factory=dict)
+
+    # Formato: b'LR1C\x01', largo del encabezado JSON (u32 LE), encabezado, pila de estados
+    # (int32 LE) y la pila: árbol binario LR1T (serialize.py) con los nodos como hijos de una
+    # raíz ficticia en modo 'tree', pickle de los valores en modo 'eval'.
+    def to_bytes(self) -> bytes:
+        header = json.dumps({'pos': self.pos, 'offset': self.offset, 'mode': self.mode, 'signature': self.signature,
+                             'n_states': len(self.states), 'n_stack': len(self.stack), 'meta': self.meta},
+                            ensure_ascii=False).encode('utf-8')
+        out = io.BytesIO()
+        out.write(_CP_MAGIC + struct.pack('<I', len(header)) + header)
+        out.write(struct.pack(f'<{len(self.states)}i', *self.states))
+        if self.mode == 'tree':
+            write_binary(Node(_CP_ROOT, list(self.stack)), out)
+        elif self.mode == 'eval':
+            pickle.dump(self.stack, out, protocol=pickle.HIGHEST_PROTOCOL)
+        return out.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'ParserCheckpoint':
+        if data[:len(_CP_MAGIC)] != _CP_MAGIC:
+            raise ValueError('No es un checkpoint de parser LR1C')
+        off = len(_CP_MAGIC)
+        (hlen,) = struct.unpack_from('<I', data, off)
+        off += 4
+        h = json.loads(data[off:off + hlen].decode('utf-8'))
+        off += hlen
+        states = list(struct.unpack_from(f"<{h['n_states']}i", data, off))
+        off += 4 * h['n_states']
+        stack: List[Any] = []
+        if h['mode'] == 'tree':
+            stack = read_binary(io.BytesIO(data[off:])).children
+        elif h['mode'] == 'eval':
+            stack = pickle.loads(data[off:])
+        if len(stack) != h['n_stack']:
+            raise ValueError('Checkpoint de parser corrupto (pila incompleta)')
+        return cls(states, stack, h['pos'], h['offset'], h['mode'], h['signature'], h['meta'])
+
+_CP_MAGIC = b'LR1C\x01'
+_CP_ROOT = '\x00stack'
+
+def _normalize(tokens: List[Tuple[str, Optional[str]] | str]) -> List[Tuple[str, Optional[str]]]:
+    norm: List[Tuple[str, Optional[str]]] = []
+    for tk in tokens:
+        if isinstance(tk, str):
+            norm.append((tk, tk))
+        else:
+            t, lx = tk
+            norm.append((t, lx))
+    norm.append((END, END))
+    return norm
 
 class Parser:
-    def __init__(self, tables: Tables, build_tree: bool = True):
+    def __init__(self, tables: Tables, build_tree: bool = True, collapse_units: bool = False,
+                 actions: Optional[SemanticActions] = None):
         self.T = tables
         self.build_tree = build_tree
+        # Colapsar nodos de un solo hijo producidos por reducciones unitarias (A -> X)
+        self.collapse_units = collapse_units
+        self.actions = actions if actions is not None else SemanticActions()
 
-    def parse(self, tokens: List[Tuple[str, Optional[str]] | str]) -> Optional[Node]:
-        norm: List[Tuple[str, Optional[str]]] = []
-        for tk in tokens:
-            if isinstance(tk, str):
-                norm.append((tk, tk))
-            else:
-                t, lx = tk
-                norm.append((t, lx))
-        norm.append((END, END))
+    # Estado inicial del punto de entrada `start` (None: el estado 0, el de la primera entrada)
+    def _entry(self, start: Optional[str]) -> int:
+        if start is None:
+            return 0
+        s = self.T.entries.get(start)
+        if s is None:
+            raise ValueError(f"'{start}' no es un punto de entrada de estas tablas (hay: {sorted(self.T.entries)})")
+        return s
+
+    def parse(self, tokens: List[Tuple[str, Optional[str]] | str], start: Optional[str] = None) -> Optional[Node]:
+        norm = _normalize(tokens)
 
-        states: List[int] = [0]
+        states: List[int] = [self._entry(start)]
         nodes: List[Node] = []
+        unit_goto = self.T.unit_goto
+        collapse = self.build_tree and self.collapse_units
         i = 0
         while True:
             s = states[-1]
             a_type, a_lex = norm[i]
             act = self.T.ACTION.get((s, a_type))
             if not act:
-                expected = sorted({sym for (st, sym) in self.T.ACTION.keys() if st == s})
-                raise SyntaxError(f"Unexpected token '{a_type}' at pos {i}. Expected: {expected}")
+                raise ParseError(i, a_type, self.T.expected(s))
 
             if act.kind == 'shift':
                 if self.build_tree and a_type != END:
@@ -50,8 +140,174 @@ class Parser:
                 j = self.T.GOTO.get((s, lhs))
                 if j is None:
                     raise RuntimeError(f"Missing GOTO for state {s}, lhs {lhs}")
+                chain = ()
+                if unit_goto:
+                    hop = unit_goto.get((s, lhs, a_type))
+                    if hop:
+                        j, chain = hop
                 states.append(j)
                 if self.build_tree:
-                    nodes.append(Node(lhs, [] if rhs == (EPS,) else children))
+                    if collapse and self.T.is_unit((lhs, rhs)):
+                        node = children[0]
+                    else:
+                        node = Node(lhs, [] if rhs == (EPS,) else children)
+                    if not collapse:
+                        for A, _ in chain:
+                            node = Node(A, [node])
+                    nodes.append(node)
+            else:
+                return nodes[0] if (self.build_tree and nodes) else None
+
+    # Evalúa las acciones semánticas al reducir, sobre una pila de valores (sin construir Node).
+    # Los terminales aportan su lexema; sin acción, el valor es el del primer símbolo (o None).
+    def evaluate(self, tokens: List[Tuple[str, Optional[str]] | str], start: Optional[str] = None) -> Any:
+        norm = _normalize(tokens)
+        ACTION, GOTO, unit_goto = self.T.ACTION, self.T.GOTO, self.T.unit_goto
+        actions = self.actions.by_prod
+        states: List[int] = [self._entry(start)]
+        values: List[Any] = []
+        i = 0
+        while True:
+            s = states[-1]
+            a_type, a_lex = norm[i]
+            act = ACTION.get((s, a_type))
+            if not act:
+                raise ParseError(i, a_type, self.T.expected(s))
+
+            if act.kind == 'shift':
+                values.append(a_lex)
+                states.append(int(act.value))  # type: ignore
+                i += 1
+            elif act.kind == 'reduce':
+                prod = act.value
+                lhs, rhs = prod  # type: ignore
+                k = 0 if rhs == (EPS,) else len(rhs)
+                if k:
+                    args = values[-k:]
+                    del values[-k:]
+                    del states[-k:]
+                else:
+                    args = []
+                fn = actions.get(prod)  # type: ignore
+                v = fn(*args) if fn else (args[0] if args else None)
+                s = states[-1]
+                j = GOTO.get((s, lhs))
+                if j is None:
+                    raise RuntimeError(f"Missing GOTO for state {s}, lhs {lhs}")
+                if unit_goto:
+                    hop = unit_goto.get((s, lhs, a_type))
+                    if hop:
+                        j, chain = hop
+                        for p in chain:
+                            fn = actions.get(p)
+                            if fn:
+                                v = fn(v)
+                states.append(j)
+                values.append(v)
+            else:
+                return values[0] if values else None
+
+    # Huella de las tablas y de las opciones que cambian las pilas (unit_goto, collapse):
+    # Tables y PackedTables de la misma construcción dan la misma, así que un checkpoint de un
+    # proceso se retoma en otro que abrió las tablas empaquetadas
+    def signature(self) -> str:
+        sig = getattr(self, '_signature', None)
+        if sig is None:
+            h = hashlib.blake2b(digest_size=16)
+            for (s, a), act in sorted(self.T.ACTION.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+                h.update(repr((s, a, act.kind, act.value)).encode('utf-8'))
+            for (s, A), j in sorted(self.T.GOTO.items()):
+                h.update(repr((s, A, j)).encode('utf-8'))
+            h.update(repr((sorted(self.T.entries.items()), bool(self.T.unit_goto), self.collapse_units)).encode('utf-8'))
+            sig = self._signature = h.hexdigest()
+        return sig
+
+    # Parseo en streaming con checkpoints. `tokens` es cualquier iterable de (terminal, lexema)
+    # o terminales, o directamente Lexer.scan(text, offset) (se saltan los omitidos y los
+    # checkpoints guardan el offset). Cada `checkpoint_every` tokens se llama a on_checkpoint
+    # con un ParserCheckpoint (comparte los nodos con el parseo: to_bytes() si hay que guardarlo).
+    # `resume`: sigue desde un checkpoint; `tokens` son entonces los que siguen a cp.pos, p. ej.
+    # Lexer.scan(text, cp.offset). Devuelve lo mismo que parse (o evaluate, con evaluate=True).
+    def stream(self, tokens: Iterable, start: Optional[str] = None, evaluate: bool = False,
+               checkpoint_every: int = 0, on_checkpoint: Optional[Callable[[ParserCheckpoint], None]] = None,
+               resume: Optional[ParserCheckpoint] = None) -> Any:
+        mode = 'eval' if evaluate else ('tree' if self.build_tree else 'none')
+        if resume is not None:
+            if resume.mode != mode:
+                raise ValueError(f"El checkpoint es de modo '{resume.mode}' y este parseo de modo '{mode}'")
+            if resume.signature != self.signature():
+                raise ValueError('El checkpoint se tomó con otras tablas u opciones de parser')
+            states, stack, pos = list(resume.states), list(resume.stack), resume.pos
+        else:
+            states, stack, pos = [self._entry(start)], [], 0
+        ACTION, GOTO, unit_goto = self.T.ACTION, self.T.GOTO, self.T.unit_goto
+        actions = self.actions.by_prod
+        build = mode == 'tree'
+        collapse = build and self.collapse_units
+        every = checkpoint_every if on_checkpoint is not None else 0
+        first = pos
+        it = iter(tokens)
+
+        def lookahead() -> Tuple[str, Any, Optional[int]]:
+            for tk in it:
+                if isinstance(tk, str):
+                    return tk, tk, None
+                if len(tk) == 4:
+                    if tk[0] is None:
+                        continue
+                    return tk[0], tk[1], tk[2]
+                return tk[0], tk[1], None
+            return END, END, None
+
+        a_type, a_lex, a_off = lookahead()
+        while True:
+            s = states[-1]
+            act = ACTION.get((s, a_type))
+            if not act:
+                raise ParseError(pos, a_type, self.T.expected(s))
+
+            if act.kind == 'shift':
+                if build:
+                    stack.append(Node(a_type, [], a_lex))
+                elif mode == 'eval':
+                    stack.append(a_lex)
+                states.append(int(act.value))  # type: ignore
+                pos += 1
+                a_type, a_lex, a_off = lookahead()
+                if every and (pos - first) % every == 0 and a_type != END:
+                    on_checkpoint(ParserCheckpoint(list(states), list(stack), pos, a_off, mode, self.signature()))  # type: ignore
+            elif act.kind == 'reduce':
+                prod = act.value
+                lhs, rhs = prod  # type: ignore
+                k = 0 if rhs == (EPS,) else len(rhs)
+                args = stack[len(stack) - k:] if k and mode != 'none' else []
+                if k:
+                    del states[-k:]
+                    if mode != 'none':
+                        del stack[-k:]
+                s = states[-1]
+                j = GOTO.get((s, lhs))
+                if j is None:
+                    raise RuntimeError(f"Missing GOTO for state {s}, lhs {lhs}")
+                chain: Tuple = ()
+                if unit_goto:
+                    hop = unit_goto.get((s, lhs, a_type))
+                    if hop:
+                        j, chain = hop
+                states.append(j)
+                if build:
+                    node = args[0] if collapse and self.T.is_unit(prod) else Node(lhs, args)  # type: ignore
+                    if not collapse:
+                        for A, _ in chain:
+                            node = Node(A, [node])
+                    stack.append(node)
+                elif mode == 'eval':
+                    fn = actions.get(prod)  # type: ignore
+                    v = fn(*args) if fn else (args[0] if args else None)
+                    for p in chain:
+                        fn = actions.get(p)
+                        if fn:
+                            v = fn(v)
+                    stack.append(v)
             else:
-                return nodes[0] if (self.build_tree and nodes) else None
\ No newline at end of file
+                return stack[0] if stack else None
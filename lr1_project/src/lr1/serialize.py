@@ -0,0 +1,211 @@
+
+from __future__ import annotations
+import csv
+import html
+import json
+from typing import BinaryIO, Dict, List, Optional, TextIO, Tuple, Union
+from .ast import Node
+
+# Escritores iterativos (pila explícita): no dependen del límite de recursión y
+# escriben de a un nodo/fila en `out`, sin armar el texto completo en memoria.
+
+TREE_FORMATS = ('pretty', 'json', 'sexpr', 'binary')
+TABLE_FORMATS = ('text', 'csv', 'md', 'html')
+
+def write_pretty(root: Node, out: TextIO):
+    stack: List[Tuple[Node, int]] = [(root, 0)]
+    first = True
+    while stack:
+        node, depth = stack.pop()
+        if not first:
+            out.write("\n")
+        first = False
+        out.write('  ' * depth + node.sym + (f":{node.lexeme}" if node.lexeme else ''))
+        for ch in reversed(node.children):
+            stack.append((ch, depth + 1))
+
+# {"sym": ..., "lexeme": ..., "children": [...]}
+def write_json(root: Node, out: TextIO):
+    stack: List[Union[Node, str]] = [root]
+    while stack:
+        top = stack.pop()
+        if isinstance(top, str):
+            out.write(top)
+            continue
+        out.write('{"sym": ' + json.dumps(top.sym, ensure_ascii=False)
+                  + ', "lexeme": ' + json.dumps(top.lexeme, ensure_ascii=False)
+                  + ', "children": [')
+        stack.append(']}')
+        for k in range(len(top.children) - 1, -1, -1):
+            stack.append(top.children[k])
+            if k:
+                stack.append(', ')
+
+# (E (T (F (num "1"))) + ...): hojas con lexema como (sym "lexema"), sin lexema sólo sym
+def write_sexpr(root: Node, out: TextIO):
+    stack: List[Union[Node, str]] = [root]
+    while stack:
+        top = stack.pop()
+        if isinstance(top, str):
+            out.write(top)
+            continue
+        if not top.children:
+            if top.lexeme is None:
+                out.write(top.sym)
+            else:
+                out.write(f"({top.sym} {json.dumps(top.lexeme, ensure_ascii=False)})")
+            continue
+        out.write('(' + top.sym)
+        stack.append(')')
+        for ch in reversed(top.children):
+            stack.append(ch)
+            stack.append(' ')
+
+# Binario compacto: b'LR1T' + versión, tabla de símbolos y nodos en preorden como
+# varints (símbolo, cantidad de hijos, largo del lexema + 1 ó 0 si no hay lexema).
+_MAGIC = b'LR1T\x01'
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+def _read_varint(inp: BinaryIO) -> int:
+    n = shift = 0
+    while True:
+        c = inp.read(1)
+        if not c:
+            raise ValueError('Árbol binario truncado')
+        n |= (c[0] & 0x7F) << shift
+        if c[0] < 0x80:
+            return n
+        shift += 7
+
+def write_binary(root: Node, out: BinaryIO):
+    sym_id: Dict[str, int] = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        sym_id.setdefault(node.sym, len(sym_id))
+        stack.extend(node.children)
+    out.write(_MAGIC + _varint(len(sym_id)))
+    for sym in sym_id:
+        raw = sym.encode('utf-8')
+        out.write(_varint(len(raw)) + raw)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        out.write(_varint(sym_id[node.sym]) + _varint(len(node.children)))
+        if node.lexeme is None:
+            out.write(b'\x00')
+        else:
+            raw = node.lexeme.encode('utf-8')
+            out.write(_varint(len(raw) + 1) + raw)
+        stack.extend(reversed(node.children))
+
+def read_binary(inp: BinaryIO) -> Node:
+    if inp.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError('No es un árbol binario LR1T')
+    syms = [inp.read(_read_varint(inp)).decode('utf-8') for _ in range(_read_varint(inp))]
+    root: Optional[Node] = None
+    # (nodo, hijos que le faltan leer)
+    pending: List[List] = []
+    while True:
+        sym = syms[_read_varint(inp)]
+        n = _read_varint(inp)
+        k = _read_varint(inp)
+        lexeme = inp.read(k - 1).decode('utf-8') if k else None
+        node = Node(sym, [], lexeme)
+        if pending:
+            parent = pending[-1]
+            parent[0].children.append(node)
+            parent[1] -= 1
+        else:
+            root = node
+        if n:
+            pending.append([node, n])
+        while pending and pending[-1][1] == 0:
+            pending.pop()
+        if not pending:
+            return root  # type: ignore
+
+def write_tree(root: Node, out, fmt: str = 'pretty'):
+    if fmt == 'pretty':
+        write_pretty(root, out)
+    elif fmt == 'json':
+        write_json(root, out)
+    elif fmt == 'sexpr':
+        write_sexpr(root, out)
+    elif fmt == 'binary':
+        write_binary(root, out)
+    else:
+        raise ValueError(f"Formato de árbol desconocido: {fmt}")
+
+# Escribe dentro de un string JSON ya abierto (para incrustar texto en un sobre JSON)
+class JSONStringWriter:
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write(self, s: str):
+        self.out.write(json.dumps(s, ensure_ascii=False)[1:-1])
+
+# ---------------------------------------------------------------------------
+# Tablas ACTION/GOTO, una fila por estado
+
+def _cell(act) -> str:
+    if not act:
+        return ''
+    if act.kind == 'shift':
+        return f"s{act.value}"
+    if act.kind == 'reduce':
+        lhs, rhs = act.value
+        return f"r[{lhs}→{' '.join(rhs)}]"
+    return 'acc'
+
+def _rows(tables):
+    terms = sorted(tables.G.terminals)
+    nonterms = sorted(tables.G.nonterminals - tables.aug_symbols)
+    def gen():
+        for i in range(len(tables.states)):
+            yield i, [_cell(tables.ACTION.get((i, t))) for t in terms], \
+                [tables.GOTO.get((i, A)) for A in nonterms]
+    return terms, nonterms, gen()
+
+def write_tables(tables, out: TextIO, fmt: str = 'text'):
+    terms, nonterms, rows = _rows(tables)
+    if fmt == 'text':
+        hdr = "".join(["st | "] + [f"{t:>8}" for t in terms] + [" || "] + [f"{A:>8}" for A in nonterms])
+        out.write(hdr + "\n" + "-" * len(hdr))
+        for i, acts, gotos in rows:
+            out.write("\n" + "".join([f"{i:>2} | "] + [f"{c:>8}" for c in acts] + [" || "]
+                                     + [f"{(j if j is not None else ''):>8}" for j in gotos]))
+    elif fmt == 'csv':
+        w = csv.writer(out, lineterminator="\n")
+        w.writerow(['state'] + [f"ACTION:{t}" for t in terms] + [f"GOTO:{A}" for A in nonterms])
+        for i, acts, gotos in rows:
+            w.writerow([i] + acts + ['' if j is None else j for j in gotos])
+    elif fmt == 'md':
+        def esc(s) -> str:
+            return str(s).replace('|', '\\|')
+        out.write("| " + " | ".join(esc(c) for c in ['state'] + terms + nonterms) + " |\n")
+        out.write("|---" * (1 + len(terms) + len(nonterms)) + "|\n")
+        for i, acts, gotos in rows:
+            cells = [str(i)] + acts + ['' if j is None else str(j) for j in gotos]
+            out.write("| " + " | ".join(esc(c) for c in cells) + " |\n")
+    elif fmt == 'html':
+        e = html.escape
+        out.write("<table>\n<thead><tr><th>state</th>"
+                  + "".join(f"<th>{e(t)}</th>" for t in terms)
+                  + "".join(f"<th>{e(A)}</th>" for A in nonterms) + "</tr></thead>\n<tbody>\n")
+        for i, acts, gotos in rows:
+            out.write(f"<tr><td>{i}</td>" + "".join(f"<td>{e(c)}</td>" for c in acts)
+                      + "".join(f"<td>{'' if j is None else j}</td>" for j in gotos) + "</tr>\n")
+        out.write("</tbody>\n</table>\n")
+    else:
+        raise ValueError(f"Formato de tabla desconocido: {fmt}")
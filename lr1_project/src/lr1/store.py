@@ -0,0 +1,186 @@
+
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+from .grammar import Grammar, Symbol, EPS, END
+from .items import LR1Item
+
+# Un ítem se codifica como un entero: (producción, punto, lookahead) en base mixta.
+class ItemCodec:
+    def __init__(self, G: Grammar):
+        self.symbols: List[Symbol] = sorted(set(G.terminals) | set(G.nonterminals) | {END})
+        self.sym_id: Dict[Symbol, int] = {s: k for k, s in enumerate(self.symbols)}
+        # Producciones en la forma de los ítems: ε se representa con RHS vacío
+        self.prods: List[Tuple[Symbol, Tuple[Symbol, ...]]] = []
+        for A in sorted(G.by_lhs):
+            for rhs in G.by_lhs[A]:
+                self.prods.append((A, tuple() if rhs == (EPS,) else tuple(rhs)))
+        self.prod_id = {p: k for k, p in enumerate(self.prods)}
+        self.width = max((len(rhs) for _, rhs in self.prods), default=0) + 1
+        self.nsym = len(self.symbols)
+
+    def encode_item(self, it: LR1Item) -> int:
+        p = self.prod_id[(it.lhs, it.rhs)]
+        return (p * self.width + it.dot) * self.nsym + self.sym_id[it.la]
+
+    def decode_item(self, code: int) -> LR1Item:
+        rest, la = divmod(code, self.nsym)
+        p, dot = divmod(rest, self.width)
+        lhs, rhs = self.prods[p]
+        return LR1Item(lhs, rhs, dot, self.symbols[la])
+
+    def encode(self, I) -> bytes:
+        return array('Q', sorted(self.encode_item(it) for it in I)).tobytes()
+
+    def decode(self, blob: bytes) -> FrozenSet[LR1Item]:
+        codes = array('Q')
+        codes.frombytes(blob)
+        return frozenset(self.decode_item(c) for c in codes)
+
+class TransView:
+    # Transiciones (origen, símbolo) -> destino guardadas en SQLite, agrupables por origen
+    def __init__(self, store: 'StateStore'):
+        self._s = store
+        self._pending: List[Tuple[int, int, int]] = []
+        # Filas realmente insertadas (un (origen, símbolo) repetido no cuenta)
+        self.inserted = 0
+
+    def add(self, i: int, X: Symbol, j: int):
+        self._pending.append((i, self._s.codec.sym_id[X], j))
+        if len(self._pending) >= 10000:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            cur = self._s.db.executemany("INSERT OR IGNORE INTO trans VALUES (?, ?, ?)", self._pending)
+            self.inserted += cur.rowcount
+            self._pending = []
+
+    def outgoing(self, i: int) -> Dict[Symbol, int]:
+        self.flush()
+        syms = self._s.codec.symbols
+        return {syms[x]: j for x, j in self._s.db.execute("SELECT sym, dst FROM trans WHERE src = ?", (i,))}
+
+    def get(self, key: Tuple[int, Symbol], default=None):
+        self.flush()
+        x = self._s.codec.sym_id.get(key[1])
+        if x is None:
+            return default
+        row = self._s.db.execute("SELECT dst FROM trans WHERE src = ? AND sym = ?", (key[0], x)).fetchone()
+        return default if row is None else row[0]
+
+    def __getitem__(self, key: Tuple[int, Symbol]) -> int:
+        j = self.get(key)
+        if j is None:
+            raise KeyError(key)
+        return j
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def items(self) -> Iterator[Tuple[Tuple[int, Symbol], int]]:
+        self.flush()
+        syms = self._s.codec.symbols
+        for i, x, j in self._s.db.execute("SELECT src, sym, dst FROM trans ORDER BY src, sym"):
+            yield (i, syms[x]), j
+
+    def keys(self):
+        return (k for k, _ in self.items())
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self) -> int:
+        self.flush()
+        return self._s.db.execute("SELECT COUNT(*) FROM trans").fetchone()[0]
+
+class StateStore:
+    # Colección canónica fuera de memoria: cada estado es un arreglo ordenado de ítems
+    # codificados en SQLite, deduplicado por un índice de hash (con verificación del blob
+    # ante colisiones). En memoria sólo queda un LRU de estados decodificados acotado
+    # por `memory_items` ítems. Se usa como secuencia de estados: len(), store[i], iteración.
+    def __init__(self, path: Optional[str] = None, memory_items: int = 1_000_000):
+        self._tmp = not path
+        if not path:
+            fd, path = tempfile.mkstemp(prefix='lr1-states-', suffix='.sqlite')
+            os.close(fd)
+        self.path = path
+        self.memory_items = memory_items
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("DROP TABLE IF EXISTS states")
+        self.db.execute("DROP TABLE IF EXISTS trans")
+        self.db.execute("CREATE TABLE states (id INTEGER PRIMARY KEY, hash BLOB NOT NULL, items BLOB NOT NULL)")
+        self.db.execute("CREATE INDEX states_hash ON states (hash)")
+        self.db.execute("CREATE TABLE trans (src INTEGER, sym INTEGER, dst INTEGER, PRIMARY KEY (src, sym)) WITHOUT ROWID")
+        self.codec: Optional[ItemCodec] = None
+        self.trans = TransView(self)
+        self._n = 0
+        self._cache: 'OrderedDict[int, FrozenSet[LR1Item]]' = OrderedDict()
+        self._cached_items = 0
+
+    # La gramática (ya aumentada) fija la codificación de ítems
+    def attach(self, G: Grammar):
+        self.codec = ItemCodec(G)
+
+    def _remember(self, i: int, I: FrozenSet[LR1Item]):
+        self._cache[i] = I
+        self._cached_items += len(I)
+        while self._cached_items > self.memory_items and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cached_items -= len(old)
+
+    # Devuelve (id, es_nuevo)
+    def add(self, I) -> Tuple[int, bool]:
+        blob = self.codec.encode(I)  # type: ignore
+        h = hashlib.blake2b(blob, digest_size=16).digest()
+        for i, items in self.db.execute("SELECT id, items FROM states WHERE hash = ?", (h,)):
+            if items == blob:
+                return i, False
+        i = self._n
+        self.db.execute("INSERT INTO states VALUES (?, ?, ?)", (i, h, blob))
+        self._n += 1
+        self._remember(i, frozenset(I))
+        return i, True
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> FrozenSet[LR1Item]:
+        if i < 0:
+            i += self._n
+        I = self._cache.get(i)
+        if I is not None:
+            self._cache.move_to_end(i)
+            return I
+        row = self.db.execute("SELECT items FROM states WHERE id = ?", (i,)).fetchone()
+        if row is None:
+            raise IndexError(i)
+        I = self.codec.decode(row[0])  # type: ignore
+        self._remember(i, I)
+        return I
+
+    def __iter__(self) -> Iterator[FrozenSet[LR1Item]]:
+        for i in range(self._n):
+            yield self[i]
+
+    def commit(self):
+        self.trans.flush()
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+        if self._tmp and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,8 +1,9 @@
 
 from __future__ import annotations
+import io
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set, Tuple
-from .grammar import Grammar, Prod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from .grammar import Grammar, Prod, EPS
 
 @dataclass
 class Action:
@@ -10,71 +11,137 @@ class Action:
     value: Optional[int | Prod] = None
 
 class Tables:
-    def __init__(self, G: Grammar, states: List[Set], trans: Dict[Tuple[int, str], int], aug_start: str):
+    def __init__(self, G: Grammar, states: List[Set], trans: Dict[Tuple[int, str], int], aug_start: str,
+                 entries: Optional[Dict[str, int]] = None):
         self.G = G
         self.states = states
         self.trans = trans
         self.aug_start = aug_start
+        # Punto de entrada -> estado inicial (LR1Builder.entries); por omisión G.start en el 0
+        self.entries: Dict[str, int] = dict(entries) if entries else {G.start: 0}
+        self.aug_symbols: Set[str] = set(G.aug_starts.values()) | {aug_start}
+        self.method = 'lr1'  # con qué se construyeron los estados (lo fija methods.build_tables)
         self.ACTION: Dict[Tuple[int, str], Action] = {}
         self.GOTO: Dict[Tuple[int, str], int] = {}
         self.conflicts: List[Tuple[str, int, str, Action, Action]] = []
+        # Conflictos shift/reduce resueltos por precedencia: (estado, símbolo, elegida, shift, reduce)
+        self.resolved: List[Tuple[int, str, str, Action, Action]] = []
+        self._nonassoc: Set[Tuple[int, str]] = set()
+        # (estado bajo el tope, símbolo, lookahead) -> (estado final, cadena de reducciones unitarias saltadas)
+        self.unit_goto: Dict[Tuple[int, str, str], Tuple[int, Tuple[Prod, ...]]] = {}
+        self.unit_keep: Set[Prod] = set()
         self._build()
 
     def _set_action(self, i: int, a: str, act: Action):
         key = (i, a)
+        if key in self._nonassoc:
+            return
         if key in self.ACTION and (self.ACTION[key].kind != act.kind or self.ACTION[key].value != act.value):
             old = self.ACTION[key]
+            if {'shift', 'reduce'} == {old.kind, act.kind} and self._resolve(i, a, old, act):
+                return
             ctype = 'shift/reduce' if {'shift', 'reduce'} == {old.kind, act.kind} else 'reduce/reduce'
             self.conflicts.append((ctype, i, a, old, act))
             return
         self.ACTION[key] = act
 
+    # Resolución yacc: gana la mayor precedencia; a igual nivel, %left reduce,
+    # %right desplaza y %nonassoc deja la celda en error.
+    def _resolve(self, i: int, a: str, old: Action, new: Action) -> bool:
+        shift, red = (old, new) if old.kind == 'shift' else (new, old)
+        tok = self.G.prec.get(a)
+        prod = self.G.production_precedence(red.value)  # type: ignore
+        if tok is None or prod is None:
+            return False
+        key = (i, a)
+        if prod[0] > tok[0] or (prod[0] == tok[0] and tok[1] == 'left'):
+            self.ACTION[key] = red
+            chosen = 'reduce'
+        elif prod[0] < tok[0] or tok[1] == 'right':
+            self.ACTION[key] = shift
+            chosen = 'shift'
+        else:
+            del self.ACTION[key]
+            self._nonassoc.add(key)
+            chosen = 'error'
+        self.resolved.append((i, a, chosen, shift, red))
+        return True
+
+    # Transiciones agrupadas por estado origen (un StateStore las sirve desde disco). Con un
+    # StateStore los estados se recorren de a uno, pero ACTION y GOTO quedan en memoria.
+    def _outgoing(self):
+        if hasattr(self.trans, 'outgoing'):
+            return self.trans.outgoing
+        by_src: Dict[int, Dict[str, int]] = {}
+        for (i, X), j in self.trans.items():
+            by_src.setdefault(i, {})[X] = j
+        return lambda i: by_src.get(i, {})
+
     def _build(self):
         G = self.G
+        outgoing = self._outgoing()
         for i, I in enumerate(self.states):
+            out = outgoing(i)
             for a in G.terminals:
-                if (i, a) in self.trans:
-                    self._set_action(i, a, Action('shift', self.trans[(i, a)]))
+                if a in out:
+                    self._set_action(i, a, Action('shift', out[a]))
             for A in G.nonterminals:
-                if (i, A) in self.trans:
-                    self.GOTO[(i, A)] = self.trans[(i, A)]
+                if A in out:
+                    self.GOTO[(i, A)] = out[A]
             for it in I:
                 if it.is_complete():
-                    if it.lhs == self.aug_start and it.la == '$':
+                    if it.lhs in self.aug_symbols and it.la == '$':
                         self._set_action(i, '$', Action('accept'))
                     else:
                         self._set_action(i, it.la, Action('reduce', (it.lhs, it.rhs)))
 
+    # Terminales con acción en el estado s (para los mensajes de error)
+    def expected(self, s: int) -> List[str]:
+        return sorted({a for (st, a) in self.ACTION.keys() if st == s})
+
+    def is_unit(self, prod: Prod) -> bool:
+        lhs, rhs = prod
+        return len(rhs) == 1 and rhs[0] != EPS and prod not in self.unit_keep
+
+    # Post-proceso: tras un GOTO sobre X, si el lookahead provoca una cadena de
+    # reducciones unitarias A -> X, B -> A, ... se salta directo al estado final.
+    # Las producciones en `keep` (p. ej. con acción semántica) no se saltan.
+    def eliminate_unit_reductions(self, keep: Iterable[Prod] = ()):
+        self.unit_keep = set(keep)
+        self.unit_goto = {}
+        terms = sorted(self.G.terminals)
+        for (t, X), u in self.GOTO.items():
+            for a in terms:
+                chain: List[Prod] = []
+                cur = u
+                while True:
+                    act = self.ACTION.get((cur, a))
+                    if not act or act.kind != 'reduce' or not self.is_unit(act.value):  # type: ignore
+                        break
+                    lhs = act.value[0]  # type: ignore
+                    nxt = self.GOTO.get((t, lhs))
+                    if nxt is None or act.value in chain:
+                        break
+                    chain.append(act.value)  # type: ignore
+                    cur = nxt
+                if chain:
+                    self.unit_goto[(t, X, a)] = (cur, tuple(chain))
+
     def dump_conflicts(self) -> str:
         if not self.conflicts:
-            return "No conflicts."
-        lines = ["Conflicts:"]
-        for ctype, st, sym, old, new in self.conflicts:
-            lines.append(f"  • {ctype} at state {st}, on '{sym}': had {old.kind} {old.value}, new {new.kind} {new.value}")
+            lines = ["No conflicts."]
+        else:
+            lines = ["Conflicts:"]
+            for ctype, st, sym, old, new in self.conflicts:
+                lines.append(f"  • {ctype} at state {st}, on '{sym}': had {old.kind} {old.value}, new {new.kind} {new.value}")
+        if self.resolved:
+            lines.append(f"Resolved by precedence ({len(self.resolved)}):")
+            for st, sym, chosen, shift, red in self.resolved:
+                lines.append(f"  • state {st}, on '{sym}': {chosen} (shift {shift.value} vs reduce {red.value})")
         return "\n".join(lines)
 
     def dump_tables(self) -> str:
-        terms = sorted(self.G.terminals)
-        nonterms = sorted(self.G.nonterminals - {self.aug_start})
-        hdr = ["st | "] + [f"{t:>8}" for t in terms] + [" || "] + [f"{A:>8}" for A in nonterms]
-        lines = ["".join(hdr), "-" * (len("".join(hdr)))]
-        for i in range(len(self.states)):
-            row = [f"{i:>2} | "]
-            for t in terms:
-                a = self.ACTION.get((i, t))
-                if not a:
-                    cell = ''
-                elif a.kind == 'shift':
-                    cell = f"s{a.value}"
-                elif a.kind == 'reduce':
-                    lhs, rhs = a.value  # type: ignore
-                    cell = f"r[{lhs}→{' '.join(rhs)}]"
-                else:
-                    cell = 'acc'
-                row.append(f"{cell:>8}")
-            row.append(" || ")
-            for A in nonterms:
-                j = self.GOTO.get((i, A))
-                row.append(f"{(j if j is not None else ''):>8}")
-            lines.append("".join(row))
-        return "\n".join(lines)
\ No newline at end of file
+        from .serialize import write_tables
+        buf = io.StringIO()
+        write_tables(self, buf, 'text')
+        return buf.getvalue()
\ No newline at end of file
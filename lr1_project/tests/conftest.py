@@ -0,0 +1,20 @@
+import os
+from functools import lru_cache
+
+import pytest
+
+from lr1.grammar_io import load_grammar_file
+from lr1.lexer import Lexer
+from lr1.methods import build_tables
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+@lru_cache(maxsize=None)
+def _load(name: str):
+    spec, G = load_grammar_file(os.path.join(GRAMMAR_DIR, name))
+    return spec, G, build_tables(G, 'lr1').tables, Lexer(spec.lex_rules)
+
+# load('stmts.txt') -> (spec, G, tables, lexer) de una gramática de grammar/, construida una sola vez
+@pytest.fixture
+def load():
+    return _load
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+from lr1.actions import SemanticActions, actions_from_spec, evaluate_tree
+from lr1.cli import run_command
+from lr1.grammar import Grammar
+from lr1.grammar_io import load_grammar_file
+from lr1.methods import build_tables
+from lr1.parser import Parser
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+EPS_LIST = """START: L
+NONTERMINALS: L
+TERMINALS: x
+PRODUCTIONS:
+  L -> L x | ε
+ACTIONS:
+  L -> ε => 0
+  L -> L x => $1 + 1
+"""
+
+def test_epsilon_action_from_spec(tmp_path):
+    path = tmp_path / 'eps.txt'
+    path.write_text(EPS_LIST, encoding='utf-8')
+    spec, G = load_grammar_file(str(path))
+    P = Parser(build_tables(G, 'lr1').tables, actions=actions_from_spec(spec))
+    assert P.evaluate([('x', 'x')] * 3) == 3
+    assert P.evaluate([]) == 0
+    assert P.stream([('x', 'x')] * 2, evaluate=True) == 2
+
+@pytest.mark.parametrize('register', [
+    lambda acts: acts.register('L', (), lambda: 10),
+    lambda acts: acts.register('L', ('ε',), lambda: 10),
+    lambda acts: acts.on('L -> ε')(lambda: 10),
+    lambda acts: acts.on('L ->')(lambda: 10),
+])
+def test_epsilon_action_registration_forms(register):
+    G = Grammar('L', {'x'}, {'L'})
+    G.add('L', ('L', 'x'))
+    G.add('L', ())
+    acts = SemanticActions()
+    register(acts)
+    acts.register('L', ('L', 'x'), lambda l, x: l + 1)
+    assert ('L', ()) in acts and ('L', ('ε',)) in acts
+    P = Parser(build_tables(G, 'lr1').tables, actions=acts)
+    assert P.evaluate([('x', 'x')] * 2) == 12
+
+def test_calc_actions(load):
+    spec, G, T, L = load('calc.txt')
+    P = Parser(T, actions=actions_from_spec(spec))
+    assert P.evaluate(L.tokenize('2 * (3 + 4) - 5')) == 9
+
+def test_evaluate_tree_matches_evaluate(load, tmp_path):
+    spec, G, T, L = load('calc.txt')
+    acts = actions_from_spec(spec)
+    toks = L.tokenize('((1 + 2) * 3 - 4 / 8) * (6 - 2)')
+    assert evaluate_tree(Parser(T).parse(toks), acts) == Parser(T, actions=acts).evaluate(toks)
+    path = tmp_path / 'eps.txt'
+    path.write_text(EPS_LIST, encoding='utf-8')
+    spec, G = load_grammar_file(str(path))
+    T = build_tables(G, 'lr1').tables
+    assert evaluate_tree(Parser(T).parse([('x', 'x')] * 4), actions_from_spec(spec)) == 4
+
+@pytest.mark.parametrize('flags', [['--optimize'], ['--optimize', '--unit-elim'], ['--optimize', '--unit-elim', '--collapse']])
+@pytest.mark.parametrize('program', ['2 * (3 + 4) - 1', '8 / 2 / 2 - (1 - 3) * 5', '42'])
+def test_cli_eval_with_optimize(tmp_path, capsys, flags, program):
+    # Las acciones son de la gramática original: con --optimize tiene que dar lo mismo
+    path = tmp_path / 'in.txt'
+    path.write_text(program, encoding='utf-8')
+    calc = os.path.join(GRAMMAR_DIR, 'calc.txt')
+    run_command(['parse', calc, str(path), '--eval'])
+    plain = capsys.readouterr().out
+    run_command(['parse', calc, str(path), '--eval', *flags])
+    assert capsys.readouterr().out == plain
+    assert float(plain) == eval(program)
@@ -0,0 +1,52 @@
+import pytest
+
+from lr1.check import check_grammar
+from lr1.grammar import Grammar
+from lr1.methods import build_tables
+
+def _grammar(start, prods, prec=()):
+    nts = {A for A, _ in prods}
+    terms = {X for _, rhs in prods for X in rhs if X not in nts}
+    G = Grammar(start, terms, nts)
+    for A, rhs in prods:
+        G.add(A, rhs)
+    G.set_precedence(prec)
+    return G
+
+def _agrees(G) -> bool:
+    result = check_grammar(G)
+    return result.ok == (not build_tables(_copy(G), 'lr1').tables.conflicts)
+
+def _copy(G):
+    return _grammar(G.start, [(A, () if rhs == ('ε',) else rhs) for A, rhs in G.productions])
+
+def test_accept_reduce_conflict():
+    # [S' -> S·, $] y [T -> ·, $] en el mismo estado: Tables lo reporta, check también
+    G = _grammar('S', [('S', ('S', 'T')), ('S', ('a',)), ('T', ())])
+    result = check_grammar(G)
+    assert not result.ok
+    assert [(c.kind, c.symbol, c.actions) for c in result.conflicts] == [('reduce/reduce', '$', ('accept', 'T -> ε'))]
+    assert build_tables(_copy(G), 'lr1').tables.conflicts
+
+@pytest.mark.parametrize('prods', [
+    [('E', ('E', '+', 'T')), ('E', ('T',)), ('T', ('id',))],
+    [('S', ('A', 'a')), ('S', ('b', 'A', 'c')), ('S', ('d', 'c')), ('S', ('b', 'd', 'a')), ('A', ('d',))],  # LALR(1)
+    [('S', ('a', 'A', 'd')), ('S', ('b', 'B', 'd')), ('S', ('a', 'B', 'e')), ('S', ('b', 'A', 'e')),
+     ('A', ('c',)), ('B', ('c',))],  # LR(1) pero no LALR(1)
+])
+def test_conflict_free(prods):
+    G = _grammar(prods[0][0], prods)
+    assert check_grammar(G).ok
+    assert _agrees(G)
+
+def test_lalr_conflict_confirmed_by_lr1():
+    G = _grammar('S', [('S', ('a', 'A', 'd')), ('S', ('b', 'B', 'd')), ('S', ('a', 'B', 'e')), ('S', ('b', 'A', 'e')),
+                       ('A', ('c',)), ('B', ('c',))])
+    result = check_grammar(G)
+    assert result.ok and result.method == 'lr1'
+
+def test_ambiguous_and_precedence():
+    prods = [('E', ('E', '+', 'E')), ('E', ('E', '*', 'E')), ('E', ('id',))]
+    result = check_grammar(_grammar('E', prods))
+    assert not result.ok and {c.kind for c in result.conflicts} == {'shift/reduce'}
+    assert check_grammar(_grammar('E', prods, [('left', ['+']), ('left', ['*'])])).ok
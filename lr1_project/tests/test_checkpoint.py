@@ -0,0 +1,81 @@
+import copy
+import os
+
+import pytest
+
+from lr1.actions import actions_from_spec
+from lr1.cli import run_command
+from lr1.packed import PackedTables, pack_tables
+from lr1.parser import Parser, ParserCheckpoint
+
+CALC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar', 'calc.txt')
+
+def _program(n: int) -> str:
+    return ' + '.join(f"({i} * 2 - {i % 7}) / {i % 5 + 1}" for i in range(n))
+
+def _parser(spec, T, mode: str) -> Parser:
+    return Parser(T, build_tree=mode == 'tree', actions=actions_from_spec(spec) if mode == 'eval' else None)
+
+def _checkpoints(P: Parser, text: str, L, mode: str, every: int):
+    taken = []
+    result = P.stream(L.scan(text), evaluate=mode == 'eval', checkpoint_every=every, on_checkpoint=taken.append)
+    return result, taken
+
+@pytest.mark.parametrize('mode', ['tree', 'eval', 'none'])
+def test_resume_from_every_checkpoint(load, mode):
+    spec, G, T, L = load('calc.txt')
+    text = _program(40)
+    P = _parser(spec, T, mode)
+    expected = P.evaluate(L.tokenize(text)) if mode == 'eval' else P.parse(L.tokenize(text))
+    result, taken = _checkpoints(P, text, L, mode, every=17)
+    assert result == expected
+    assert len(taken) > 10
+    for cp in taken:
+        cp2 = ParserCheckpoint.from_bytes(cp.to_bytes())
+        assert (cp2.states, cp2.stack, cp2.pos, cp2.offset, cp2.mode, cp2.signature) == \
+               (cp.states, cp.stack, cp.pos, cp.offset, cp.mode, cp.signature)
+        # Otro Parser (las mismas tablas) sigue desde el offset guardado
+        again = _parser(spec, T, mode).stream(L.scan(text, cp2.offset), evaluate=mode == 'eval', resume=cp2)
+        assert again == expected
+
+def test_resume_on_packed_tables(load, tmp_path):
+    spec, G, T, L = load('calc.txt')
+    text = _program(20)
+    P = Parser(T)
+    expected, taken = _checkpoints(P, text, L, 'tree', every=25)
+    path = str(tmp_path / 'calc.packed')
+    pack_tables(T, path)
+    packed = PackedTables(path)
+    try:
+        cp = ParserCheckpoint.from_bytes(taken[len(taken) // 2].to_bytes())
+        assert Parser(packed).stream(L.scan(text, cp.offset), resume=cp) == expected
+    finally:
+        packed.close()
+
+def test_resume_rejects_other_tables_and_modes(load):
+    spec, G, T, L = load('calc.txt')
+    text = _program(10)
+    _, taken = _checkpoints(Parser(T), text, L, 'tree', every=10)
+    cp = ParserCheckpoint.from_bytes(taken[0].to_bytes())
+    U = copy.copy(T)
+    U.eliminate_unit_reductions()
+    with pytest.raises(ValueError, match='otras tablas'):
+        Parser(U).stream(L.scan(text, cp.offset), resume=cp)
+    with pytest.raises(ValueError, match='modo'):
+        Parser(T).stream(L.scan(text, cp.offset), evaluate=True, resume=cp)
+    with pytest.raises(ValueError, match='LR1C'):
+        ParserCheckpoint.from_bytes(b'nope' + cp.to_bytes())
+    with pytest.raises(ValueError):
+        ParserCheckpoint.from_bytes(cp.to_bytes()[:-8])
+
+def test_cli_checkpoint_then_resume(tmp_path, capsys):
+    program = tmp_path / 'in.txt'
+    program.write_text(_program(30), encoding='utf-8')
+    cp = tmp_path / 'parse.cp'
+    run_command(['parse', CALC, str(program), '--tree', '--format', 'sexpr'])
+    plain = capsys.readouterr().out
+    run_command(['parse', CALC, str(program), '--tree', '--format', 'sexpr', '--checkpoint', str(cp), '--checkpoint-every', '20'])
+    assert capsys.readouterr().out == plain
+    assert cp.exists() and not os.path.exists(f"{cp}.tmp")
+    run_command(['parse', CALC, str(program), '--tree', '--format', 'sexpr', '--resume', str(cp)])
+    assert capsys.readouterr().out == plain
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+
+import pytest
+
+from lr1 import cli, daemon
+
+STMTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar', 'stmts.txt')
+
+@pytest.fixture
+def sock_dir():
+    # Los sockets Unix tienen un límite corto de ruta: nada de tmp_path
+    d = tempfile.mkdtemp(prefix='lr1-')
+    yield d
+    shutil.rmtree(d, ignore_errors=True)
+
+@pytest.fixture
+def server(sock_dir):
+    path = os.path.join(sock_dir, 'd.sock')
+    t = threading.Thread(target=daemon.serve, args=(path,), daemon=True)
+    t.start()
+    for _ in range(200):
+        if daemon.ping(path):
+            break
+        time.sleep(0.01)
+    yield path
+    if t.is_alive():
+        daemon.stop(path)
+        t.join(5)
+    cli._table_cache = None
+
+def test_socket_is_private_and_stop_removes_it(server):
+    assert stat.S_IMODE(os.stat(server).st_mode) == 0o600
+    daemon.stop(server)
+    for _ in range(200):
+        if not os.path.exists(server):
+            break
+        time.sleep(0.01)
+    assert not os.path.exists(server)
+
+def test_hung_client_does_not_block_others(server, tmp_path):
+    program = tmp_path / 'in.txt'
+    program.write_text('x = 1;\n', encoding='utf-8')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hung:
+        hung.connect(server)  # conecta y nunca envía la línea
+        code, out, err = daemon._request(server, {'argv': ['parse', STMTS, str(program)], 'cwd': str(tmp_path)}, timeout=5.0)
+    assert code == 0, err
+    assert b'Parseo exitoso' in out
+
+def test_try_remote_falls_back_when_daemon_is_unreachable(sock_dir, monkeypatch):
+    # Socket huérfano (el daemon murió sin borrarlo): connect falla, se corre local
+    path = os.path.join(sock_dir, 'stale.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(path)
+    monkeypatch.setenv('LR1_SOCKET', path)
+    monkeypatch.delenv('LR1_NO_DAEMON', raising=False)
+    t0 = time.monotonic()
+    assert daemon.try_remote(['check', STMTS]) is None
+    assert time.monotonic() - t0 < 3
+
+def test_try_remote_does_not_rerun_after_sending(sock_dir, monkeypatch, capsys):
+    # El pedido llegó pero la respuesta no: error, sin correr el comando local
+    path = os.path.join(sock_dir, 'mute.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as mute:
+        mute.bind(path)
+        mute.listen(1)
+        monkeypatch.setenv('LR1_SOCKET', path)
+        monkeypatch.setenv('LR1_DAEMON_TIMEOUT', '0.2')
+        monkeypatch.delenv('LR1_NO_DAEMON', raising=False)
+        assert daemon.try_remote(['check', STMTS]) == 1
+        conn, _ = mute.accept()
+        with conn:
+            assert json.loads(daemon._read_line(conn))['argv'] == ['check', STMTS]
+    assert 'no respondió' in capsys.readouterr().err
@@ -0,0 +1,19 @@
+import pytest
+
+from lr1.differential import run_difftest
+
+@pytest.mark.parametrize('layer,engines', [
+    ('parser', ['slr', 'lalr', 'auto', 'evaluate', 'parallel']),
+    ('lexer', ['parallel']),
+])
+def test_engines_match_reference(layer, engines):
+    result = run_difftest(cases=40, seed=7, layers=[layer], engines=engines)
+    assert result.ok, '\n\n'.join(map(str, result.mismatches))
+    assert result.checks >= 40
+
+def test_evaluate_engine_catches_unnormalized_epsilon(monkeypatch):
+    # Con la clave de ε sin normalizar la acción de S -> ε no se dispara
+    from lr1 import actions
+    monkeypatch.setattr(actions, '_key', lambda lhs, rhs: (lhs, tuple(rhs)))
+    result = run_difftest(cases=40, seed=1, layers=['parser'], engines=['evaluate'])
+    assert [m.engine for m in result.mismatches] == ['evaluate']
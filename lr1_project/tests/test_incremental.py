@@ -0,0 +1,105 @@
+import io
+import random
+import sys
+
+import pytest
+
+from lr1.incremental import IncrementalDocument, IncrementalParser
+from lr1.parser import Parser
+from lr1.serialize import write_binary
+
+def _dump(node) -> bytes:
+    buf = io.BytesIO()
+    write_binary(node, buf)
+    return buf.getvalue()
+
+def _program(n: int) -> str:
+    return ''.join(f"x{i} = a + {i} * (b + c);\n" for i in range(n))
+
+@pytest.fixture(autouse=True)
+def _deep_trees():
+    # Las listas recursivas a izquierda dan árboles de profundidad lineal
+    old = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old, 20000))
+    yield
+    sys.setrecursionlimit(old)
+
+@pytest.mark.parametrize('where', [0.0, 0.5, 1.0])
+def test_edit_reuses_list_spine(load, where):
+    spec, G, T, L = load('stmts.txt')
+    n = 1500
+    text = _program(n)
+    doc = IncrementalDocument(T, L, text)
+    pos = len(text) if where == 1.0 else text.index(f"x{int(n * where)} =")
+    tree = doc.edit(pos, pos, "zz = 1 + 2 * 3;\n")
+    assert _dump(tree) == _dump(Parser(T).parse(L.tokenize(doc.text)))
+    stats = doc.parser.last_stats
+    ntokens = len(doc.lexer.tokens)
+    assert stats['shifted'] + stats['reused_tokens'] == ntokens
+    # Trabajo acotado por la edición (8 tokens nuevos más la sentencia anterior, cuyo ';' se
+    # re-lexea): los ancestros de la lista se copian, no se re-reducen
+    assert stats['shifted'] <= 16
+    assert stats['reductions'] + stats['discarded'] <= 40
+    assert stats['copied'] <= n + 2
+
+def test_replace_delete_and_invalid_intermediate(load):
+    spec, G, T, L = load('stmts.txt')
+    doc = IncrementalDocument(T, L, _program(50))
+    full = lambda: _dump(Parser(T).parse(L.tokenize(doc.text)))
+    pos = doc.text.index('x10 =')
+    assert _dump(doc.edit(pos, pos + 3, 'renamed')) == full()
+    end = doc.text.index('x20 =')
+    assert _dump(doc.edit(pos, end, '')) == full()
+    # Un texto intermedio inválido conserva el árbol y acumula el daño
+    pos = doc.text.index('x30 =')
+    with pytest.raises(SyntaxError):
+        doc.edit(pos, pos, '( ')
+    assert _dump(doc.edit(pos, pos + 2, '')) == full()
+
+def _expr(rng: random.Random, depth: int = 0) -> str:
+    k = rng.random()
+    if depth > 3 or k < 0.4:
+        return str(rng.randrange(20))
+    if k < 0.6:
+        return f"({_expr(rng, depth + 1)})"
+    return f"{_expr(rng, depth + 1)} {rng.choice('+-*')} {_expr(rng, depth + 1)}"
+
+@pytest.mark.parametrize('seed', range(3))
+def test_random_edits_match_full_parse(load, seed):
+    spec, G, T, L = load('calc.txt')
+    rng = random.Random(seed)
+    items = [_expr(rng) for _ in range(20)]
+    doc = IncrementalDocument(T, L, ' + '.join(items))
+    for _ in range(40):
+        k = rng.randrange(len(items))
+        op = rng.random()
+        if op < 0.4:
+            items[k] = _expr(rng)
+        elif op < 0.7 or len(items) == 1:
+            items.insert(k, _expr(rng))
+        else:
+            del items[k]
+        old, new = doc.text, ' + '.join(items)
+        p = 0
+        while p < min(len(old), len(new)) and old[p] == new[p]:
+            p += 1
+        q = 0
+        while q < min(len(old), len(new)) - p and old[-1 - q] == new[-1 - q]:
+            q += 1
+        tree = doc.edit(p, len(old) - q, new[p:len(new) - q])
+        assert doc.text == new
+        assert _dump(tree) == _dump(Parser(T).parse(L.tokenize(new)))
+        stats = doc.parser.last_stats
+        assert stats['shifted'] + stats['reused_tokens'] == len(doc.lexer.tokens)
+
+def test_reparse_error_matches_full_parse(load):
+    spec, G, T, L = load('calc.txt')
+    tokens = L.tokenize('1 + 2 * (3 - 4)')
+    P = IncrementalParser(T)
+    P.parse(tokens)
+    bad = tokens[:3] + [('+', '+')] + tokens[3:]
+    with pytest.raises(SyntaxError) as inc:
+        P.reparse(bad, 3, 3, 4)
+    with pytest.raises(SyntaxError) as ref:
+        Parser(T).parse(bad)
+    assert inc.value.pos == ref.value.pos
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from lr1.cli import run_command
+from lr1.differential import canonical_tree
+from lr1.grammar import Grammar
+from lr1.methods import build_tables
+from lr1.optimize import PASSES, optimize_grammar
+from lr1.parser import Parser
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+def _grammar(start, prods):
+    nts = {A for A, _ in prods}
+    terms = {X for _, rhs in prods for X in rhs if X not in nts}
+    G = Grammar(start, terms, nts)
+    for A, rhs in prods:
+        G.add(A, rhs)
+    return G
+
+def _parse(G, words):
+    return Parser(build_tables(G, 'lr1').tables).parse([(w, w) for w in words])
+
+def test_duplicate_alternatives():
+    G = _grammar('S', [('S', ('a',)), ('S', ('a',)), ('S', ('b',))])
+    opt = optimize_grammar(G)
+    assert opt.duplicates == [('S', ('a',))]
+    assert opt.grammar.productions == [('S', ('a',)), ('S', ('b',))]
+    assert opt.report()['productions'] == (3, 2)
+
+def test_duplicates_with_left_factoring():
+    G = _grammar('S', [('S', ('a', 'b')), ('S', ('a', 'b')), ('S', ('a', 'c'))])
+    opt = optimize_grammar(G, PASSES)
+    assert opt.duplicates == [('S', ('a', 'b'))]
+    for words in (['a', 'b'], ['a', 'c']):
+        tree = opt.restore_tree(_parse(opt.grammar.copy(), words))
+        assert canonical_tree(tree) == canonical_tree(_parse(G.copy(), words))
+
+def test_removed_and_inlined_are_reported_apart():
+    G = _grammar('S', [
+        ('S', ('A', 'x')), ('S', ('y',)),
+        ('A', ('z',)),  # un solo uso: se expande
+        ('B', ('B', 'w')), ('S', ('B',)),  # improductivo
+        ('C', ('w',)),  # inalcanzable
+    ])
+    opt = optimize_grammar(G)
+    assert opt.removed == {'B', 'C'}
+    assert opt.inlined == {'A'}
+    assert 'A' not in opt.grammar.nonterminals
+    tree = opt.restore_tree(_parse(opt.grammar.copy(), ['z', 'x']))
+    assert canonical_tree(tree) == canonical_tree(_parse(_grammar('S', [('S', ('A', 'x')), ('S', ('y',)), ('A', ('z',))]), ['z', 'x']))
+
+def test_report_ignores_augmented_start():
+    G = _grammar('E', [('E', ('E', '+', 'id')), ('E', ('id',))])
+    opt = optimize_grammar(G)
+    build_tables(opt.grammar, 'lr1')  # aumenta opt.grammar en el lugar, como hace la CLI
+    report = opt.report()
+    assert report['nonterminals'] == (1, 1)
+    assert report['productions'] == (2, 2)
+    assert report['states'][0] == report['states'][1]
+
+@pytest.mark.parametrize('name', ['calc.txt', 'expr.txt', 'expr_prec.txt', 'stmts.txt'])
+def test_default_passes_never_grow_bundled_grammars(load, name):
+    spec, G, T, L = load(name)
+    report = optimize_grammar(G.copy()).report()
+    for key in ('nonterminals', 'states', 'action', 'goto'):
+        before, after = report[key]
+        assert after <= before, (key, before, after)
+
+def _report_lines(out: str) -> dict:
+    return {k.strip(): v.strip() for k, v in (line.split(':', 1) for line in out.splitlines() if ' -> ' in line)}
+
+def test_cli_passes(capsys):
+    calc = os.path.join(GRAMMAR_DIR, 'calc.txt')
+    run_command(['build', calc, '--optimize'])
+    assert _report_lines(capsys.readouterr().out)['states'] == '30 -> 30 (+0)'
+    run_command(['build', calc, '--passes', 'useless,inline,factor'])
+    assert _report_lines(capsys.readouterr().out)['states'] == '30 -> 34 (+4)'
+    with pytest.raises(SystemExit) as exc:
+        run_command(['build', calc, '--passes', 'useless,fold'])
+    assert exc.value.code == 2
@@ -0,0 +1,107 @@
+import io
+import os
+import random
+import sys
+
+import pytest
+
+from lr1.cli import run_command
+from lr1.lexer import Lexer
+from lr1.parallel import ParallelParser, ParseErrors, tokenize_file
+from lr1.parser import Parser, ParseError
+from lr1.serialize import write_binary
+
+STMTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar', 'stmts.txt')
+
+def _dump(node) -> bytes:
+    buf = io.BytesIO()
+    write_binary(node, buf)
+    return buf.getvalue()
+
+def _program(n: int, seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    ops = ['a', 'b + c', '(x * 2)', 'y * (z + 1)']
+    return ''.join(f"v{i} = {rnd.choice(ops)} + {i};\n" for i in range(n))
+
+@pytest.fixture(autouse=True)
+def _deep_trees():
+    old = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(old, 20000))
+    yield
+    sys.setrecursionlimit(old)
+
+@pytest.mark.parametrize('build_tree', [True, False])
+def test_parallel_parser_matches_sequential(load, build_tree):
+    spec, G, T, L = load('stmts.txt')
+    tokens = L.tokenize(_program(400))
+    expected = Parser(T, build_tree=build_tree).parse(tokens)
+    with ParallelParser(G, [';'], 'S', workers=2, build_tree=build_tree) as P:
+        got = P.parse(tokens)
+    if build_tree:
+        assert _dump(got) == _dump(expected)
+    else:
+        assert got is None and expected is None
+
+def test_parallel_parser_reports_error_positions(load):
+    spec, G, T, L = load('stmts.txt')
+    tokens = L.tokenize(_program(50) + 'w = ;\n' + _program(50, seed=1) + 'q = 1 +;\n')
+    with pytest.raises(ParseError) as seq:
+        Parser(T).parse(tokens)
+    with ParallelParser(G, [';'], 'S', workers=2) as P:
+        with pytest.raises(ParseErrors) as par:
+            P.parse(tokens)
+    assert len(par.value.errors) == 2
+    assert par.value.errors[0].pos == seq.value.pos
+
+@pytest.mark.parametrize('chunk_size', [7, 64, 1000])
+def test_tokenize_file_matches_lexer(tmp_path, chunk_size):
+    # Comentarios y strings de varias líneas hacen fallar la especulación en el salto de línea
+    rules = [
+        ('COMMENT', r'/\*[\s\S]*?\*/', True),
+        ('str', r'"[^"]*"', False),
+        ('id', r'[^\W\d]\w*', False),
+        ('num', r'\d+', False),
+        ('op', r'[=;+*()]', False),
+        ('WS', r'\s+', True),
+    ]
+    L = Lexer(rules)
+    rnd = random.Random(chunk_size)
+    parts = ['x = 1;\n', 'ñandú = "a\nb";\n', '/* x = 2;\n y = 3; */\n', 'año = (b + 22) * c;\n', '"\n\n"\n']
+    text = ''.join(rnd.choice(parts) for _ in range(300))
+    path = tmp_path / 'in.txt'
+    path.write_text(text, encoding='utf-8')
+    expected = L.tokenize(text)
+    assert tokenize_file(L, str(path), workers=2, chunk_size=chunk_size) == expected
+    with_offsets = tokenize_file(L, str(path), workers=2, chunk_size=chunk_size, offsets=True)
+    data = text.encode('utf-8')
+    assert [(t, lx) for t, lx, _, _ in with_offsets] == expected
+    assert all(data[s:e].decode('utf-8') == lx for _, lx, s, e in with_offsets)
+
+@pytest.mark.parametrize('flags', [['--start', 'S'], ['--unit-elim'], ['--collapse'], ['--eval'], ['--method', 'lalr']])
+def test_cli_sync_rejects_unsupported_flags(tmp_path, capsys, flags):
+    path = tmp_path / 'in.txt'
+    path.write_text('x = 1;\n', encoding='utf-8')
+    with pytest.raises(SystemExit) as exc:
+        run_command(['parse', STMTS, str(path), '--sync', ';', '--sub-start', 'S', *flags])
+    assert exc.value.code == 2
+    assert flags[0] in capsys.readouterr().err
+
+def test_cli_sync_builds_tables_once_and_caches_them(tmp_path, capsys, monkeypatch):
+    from lr1 import cli, parallel
+    path = tmp_path / 'in.txt'
+    path.write_text(_program(60), encoding='utf-8')
+    run_command(['parse', STMTS, str(path), '--tree', '--format', 'sexpr'])
+    plain = capsys.readouterr().out
+
+    def no_rebuild(*a, **kw):
+        raise AssertionError('ParallelParser reconstruyó las tablas')
+    builds = []
+    build_tables = cli._build_tables
+    monkeypatch.setattr(parallel, '_build', no_rebuild)
+    monkeypatch.setattr(cli, '_build_tables', lambda *a, **kw: builds.append(a) or build_tables(*a, **kw))
+    monkeypatch.setattr(cli, '_table_cache', None)
+    cli.enable_table_cache()
+    for _ in range(2):
+        run_command(['parse', STMTS, str(path), '--tree', '--format', 'sexpr', '--sync', ';', '--sub-start', 'S', '--jobs', '2'])
+        assert capsys.readouterr().out == plain
+    assert len(builds) == 1
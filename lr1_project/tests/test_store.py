@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from lr1.grammar_io import load_grammar_file
+from lr1.methods import build_tables
+from lr1.parser import Parser
+from lr1.store import StateStore
+
+GRAMMAR_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'grammar')
+
+def _signature(built):
+    T = built.tables
+    return (list(map(frozenset, T.states)), dict(T.trans.items()),
+            {k: (a.kind, a.value) for k, a in T.ACTION.items()}, T.GOTO,
+            [(c[0], c[1], c[2]) for c in T.conflicts])
+
+@pytest.mark.parametrize('name', ['calc.txt', 'stmts.txt', 'expr_prec.txt'])
+@pytest.mark.parametrize('memory_items', [1, 1_000_000])
+def test_store_matches_memory(name, memory_items):
+    spec, G = load_grammar_file(f"{GRAMMAR_DIR}/{name}")
+    mem = build_tables(G, 'lr1', starts=[G.start])
+    spec, G = load_grammar_file(f"{GRAMMAR_DIR}/{name}")
+    with StateStore(memory_items=memory_items) as store:
+        disk = build_tables(G, 'lr1', starts=[G.start], store=store)
+        assert _signature(disk) == _signature(mem)
+        assert disk.builder.stats['transitions'] == mem.builder.stats['transitions'] == len(store.trans)
+        assert disk.builder.stats['states'] == len(store)
+
+def test_store_tables_parse_like_memory(load):
+    spec, G, T, L = load('stmts.txt')
+    tokens = L.tokenize(''.join(f"x{i} = (a + {i}) * b;\n" for i in range(50)))
+    spec, G2 = load_grammar_file(f"{GRAMMAR_DIR}/stmts.txt")
+    with StateStore(memory_items=8) as store:
+        disk = build_tables(G2, 'lr1', store=store).tables
+        assert Parser(disk).parse(tokens) == Parser(T).parse(tokens)